@@ -45,6 +45,68 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'newsapp.CustomUser'
 DEFAULT_FROM_EMAIL = 'news@example.com'
 
+# Background delivery of approval notifications (see newsapp/delivery.py).
+# WORKER is 'db' to leave jobs for `manage.py run_delivery_workers`, or
+# 'inprocess' to drain the queue from a thread in the web process.
+NEWSAPP_DELIVERY = {
+    'WORKER': 'db',
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 3600,
+    'CONCURRENCY': {
+        'feed': 2,
+        'email': 2,
+        'social': 1,
+    },
+}
+# Posting approved articles to X when TWITTER_BEARER_TOKEN is set (see
+# newsapp/social.py): timeouts in seconds, retries per post, and the
+# circuit breaker that stops posting for RESET_TIMEOUT seconds after
+# FAILURE_THRESHOLD consecutive failures.
+NEWSAPP_SOCIAL = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 60,
+}
+# Subscriber emails are sent one per reader, this many per SMTP batch.
+NEWSAPP_EMAIL_CHUNK_SIZE = 500
+# Daily and weekly digests (`manage.py send_digests`, see newsapp/digest.py)
+# list at most this many articles and newsletters each.
+NEWSAPP_DIGEST_MAX_ITEMS = 50
+# Seconds a user's group names stay in the cache (see newsapp/roles.py).
+NEWSAPP_ROLE_CACHE_TIMEOUT = 300
+# Keyset-paginated listings: default and maximum ?page_size=.
+NEWSAPP_PAGE_SIZE = 20
+NEWSAPP_MAX_PAGE_SIZE = 100
+# Precomputed reader feeds (see newsapp/feed.py). Publishers with more
+# subscribers than the fan-out limit are merged into feeds at read time.
+NEWSAPP_FEED_FANOUT_LIMIT = 10000
+NEWSAPP_FEED_BACKFILL_LIMIT = 1000
+# Delta sync (api/subscribed-articles/sync/): changes above this count make
+# the client refetch its feed; tombstones and watermarks expire after the
+# retention period (prune with `manage.py prune_tombstones`).
+NEWSAPP_SYNC_MAX_CHANGES = 500
+NEWSAPP_SYNC_RETENTION_DAYS = 30
+# Serve article and newsletter pages and the subscribed-articles feed with
+# the async views in newsapp/async_views.py. Only under ASGI.
+NEWSAPP_ASYNC_VIEWS = False
+# Live push of approved articles (api/subscribed-articles/stream/, see
+# newsapp/live.py). With several ASGI workers use
+# 'newsapp.live.RedisBroker' and set REDIS_URL.
+NEWSAPP_LIVE = {
+    'BROKER': 'newsapp.live.InMemoryBroker',
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT': 15,
+}
+# Full-text search backend (see newsapp/search.py): 'auto' picks MySQL
+# FULLTEXT or SQLite FTS5, falling back to the built-in inverted index.
+NEWSAPP_SEARCH_BACKEND = 'auto'
+# Seconds rendered article pages and reader listings stay cached (see
+# newsapp/caching.py); 0 turns fragment caching off.
+NEWSAPP_FRAGMENT_CACHE_TIMEOUT = 300
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -82,14 +144,59 @@ LOGOUT_REDIRECT_URL = 'login'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection details come from DB_* environment variables, defaulting to
+# the local development database.
+#
+# Connections persist for DB_CONN_MAX_AGE seconds (0 closes them after
+# every request) instead of reconnecting and re-authenticating per
+# request, and are checked before reuse so a connection the server dropped
+# is replaced rather than failing the request. Django has no built-in pool
+# for MySQL; to share connections between processes, or under ASGI (where
+# DB_CONN_MAX_AGE should be 0), point DB_HOST/DB_PORT at a pooler such as
+# ProxySQL.
+#
+# Setting DB_REPLICA_HOST adds a 'replica' database that the read-only
+# views read from (see newsapp/routers.py).
+def env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
 DATABASES = {
-   'default': {
-       'ENGINE': 'django.db.backends.mysql',
-       'NAME': 'mynewsapplication',
-       'USER': 'root',
-       'PASSWORD': 'Dc31gfgp',
-       'HOST': '127.0.0.1',
-       'PORT': '3306',
+    'default': {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': os.environ.get('DB_NAME', 'mynewsapplication'),
+        'USER': os.environ.get('DB_USER', 'root'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'Dc31gfgp'),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '3306'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': env_flag('DB_CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+    }
+}
+
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        # Tests read the primary through this alias.
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['newsapp.routers.ReplicaRouter']
+
+# Cached roles, page fragments and their invalidation versions live here.
+# Use a backend shared by all web processes in production, e.g.
+# 'django.core.cache.backends.redis.RedisCache' with LOCATION
+# 'redis://127.0.0.1:6379' or FileBasedCache; with the per-process
+# local-memory cache an edit only invalidates the process that made it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -1,10 +1,45 @@
 from django.contrib import admin
-from .models import Article, Publisher, Newsletter, CustomUser
+from .models import Article, Publisher, Newsletter, CustomUser, DigestRun, DigestShard
+
+
+@admin.register(Article)
+class ArticleAdmin(admin.ModelAdmin):
+    # Article.__str__ shows the author, so join it for the changelist.
+    list_select_related = ('author',)
+
+
+@admin.register(Publisher)
+class PublisherAdmin(admin.ModelAdmin):
+    # Counter columns, so the changelist does no per-row COUNT queries.
+    list_display = ('name', 'subscriber_count', 'article_count', 'fan_out_on_read')
+    readonly_fields = ('subscriber_count', 'article_count')
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(admin.ModelAdmin):
+    list_display = ('username', 'email', 'role', 'follower_count')
+    list_filter = ('role', 'digest')
+    readonly_fields = ('follower_count',)
+
 
-admin.site.register(Article)
-admin.site.register(Publisher)
 admin.site.register(Newsletter)
-admin.site.register(CustomUser)
+
+
+class DigestShardInline(admin.TabularInline):
+    model = DigestShard
+    extra = 0
+    can_delete = False
+    readonly_fields = ('first_id', 'last_id', 'status', 'cursor', 'sent', 'failed',
+                       'last_error', 'started_at', 'finished_at')
+
+
+@admin.register(DigestRun)
+class DigestRunAdmin(admin.ModelAdmin):
+    # Progress of digest mailings; shards are written by send_digests only.
+    list_display = ('period', 'window_end', 'created_at', 'finished_at')
+    list_filter = ('period',)
+    readonly_fields = ('period', 'window_start', 'window_end', 'finished_at')
+    inlines = [DigestShardInline]
 
 
 # Register your models here.
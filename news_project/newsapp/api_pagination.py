@@ -0,0 +1,64 @@
+"""
+DRF pagination for the JSON API, backed by the keyset pagination in
+``newsapp.pagination``.
+"""
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .pagination import InvalidCursor, keyset_paginate, page_size_from
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class backed by keyset_paginate(). Responses look like
+    ``{"next": url, "previous": url, "results": [...]}``.
+    """
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_with(
+            lambda cursor, page_size: keyset_paginate(queryset, cursor, page_size),
+            request,
+        )
+
+    def paginate_with(self, fetch, request):
+        """
+        Paginates with a custom ``fetch(cursor, page_size)`` callable that
+        returns a KeysetPage, e.g. one that merges several sources.
+        """
+        self.request = request
+        try:
+            self.page = fetch(
+                request.query_params.get(self.cursor_query_param),
+                page_size_from(request.query_params),
+            )
+        except InvalidCursor as exc:
+            raise NotFound(str(exc))
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,7 +1,29 @@
 # newsapp/api_urls.py
+from django.conf import settings
 from django.urls import path
-from .api_views import SubscribedArticlesView
+from . import async_views
+from .routers import read_only
+from .api_views import (
+    ArticleDetailView, AutocompleteView, CacheStatsView, PublisherSubscribersView, ReviewQueueView,
+    SearchView, SubscribedArticlesSyncView, SubscribedArticlesView, SubscriptionsView,
+    subscribed_articles_stream,
+)
+
+if getattr(settings, 'NEWSAPP_ASYNC_VIEWS', False):
+    subscribed_articles_view = async_views.subscribed_articles_view
+else:
+    subscribed_articles_view = SubscribedArticlesView.as_view()
 
 urlpatterns = [
-    path('subscribed-articles/', SubscribedArticlesView.as_view(), name='subscribed_articles'),
+    path('subscribed-articles/', read_only(subscribed_articles_view), name='subscribed_articles'),
+    path('subscribed-articles/sync/', SubscribedArticlesSyncView.as_view(), name='subscribed_articles_sync'),
+    path('subscribed-articles/stream/', subscribed_articles_stream, name='subscribed_articles_stream'),
+    path('articles/<int:pk>/', read_only(ArticleDetailView.as_view()), name='api_article_detail'),
+    path('search/', read_only(SearchView.as_view()), name='api_search'),
+    path('subscriptions/', SubscriptionsView.as_view(), name='api_subscriptions'),
+    path('autocomplete/<str:kind>/', read_only(AutocompleteView.as_view()), name='api_autocomplete'),
+    path('publishers/<int:pk>/subscribers/', PublisherSubscribersView.as_view(),
+         name='api_publisher_subscribers'),
+    path('cache-stats/', CacheStatsView.as_view(), name='api_cache_stats'),
+    path('review-queue/', ReviewQueueView.as_view(), name='api_review_queue'),
 ]
@@ -1,23 +1,279 @@
 # newsapp/api_views.py
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.views import APIView
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.permissions import BasePermission, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from .models import Article
-from .serializers import ArticleSerializer
+from rest_framework.views import APIView
+from . import live
+from .approval import approve_many, reject_many
+from .autocomplete import lookup
+from .caching import cache_stats
+from .conditional import ConditionalGetMixin
+from .feed import feed_changes, feed_page, feed_version
+from .models import Article, Newsletter, Publisher
+from .api_pagination import KeysetPagination
+from .pagination import InvalidCursor, page_size_from
+from .roles import has_role
+from .search import search_page
+from .serializers import (
+    ArticleListSerializer, ArticleSerializer, BulkSubscribeSerializer, ReviewSerializer,
+    SearchResultSerializer, SubscriptionsSerializer,
+)
+from .subscriptions import subscribe_readers, subscription_ids, update_subscriptions
+
+
+class IsEditor(BasePermission):
+    """
+    Lets in users with the Editor role.
+    """
 
+    def has_permission(self, request, view):
+        return has_role(request.user, 'Editor')
 
-class SubscribedArticlesView(APIView):
+
+class SubscribedArticlesView(ConditionalGetMixin, APIView):
+    """
+    Returns the approved articles from the publishers and journalists the
+    user subscribes to, newest first, one cursor-paginated page at a time.
+    The feed is read from the user's precomputed FeedEntry rows.
+
+    Articles use the compact list representation; ``?fields=`` selects a
+    subset of its fields and only those columns are loaded. Unchanged
+    feeds are answered with 304 Not Modified.
+    """
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    serializer_class = ArticleListSerializer
+
+    def get_validators(self, request):
+        try:
+            return feed_version(request.user, request.query_params.get('cursor'),
+                                page_size_from(request.query_params))
+        except InvalidCursor:
+            # get() answers with a 404.
+            return None
 
     def get(self, request):
-        user = request.user
-        articles = Article.objects.filter(
-            approved=True
-        ).filter(
-            publisher__in=user.subscribed_publishers.all()
-        ) | Article.objects.filter(
-            approved=True,
-            author__in=user.subscribed_journalists.all()
+        fields = self.serializer_class.requested_fields(request.query_params)
+        load_fields = self.serializer_class.load_fields(fields)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_with(
+            lambda cursor, page_size: feed_page(request.user, cursor, page_size, load_fields),
+            request,
         )
-        serializer = ArticleSerializer(articles.distinct(), many=True)
-        return Response(serializer.data)
+        serializer = self.serializer_class(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class SubscribedArticlesSyncView(APIView):
+    """
+    Delta sync for the subscribed-articles feed. ``?since=`` is the
+    watermark from the previous response; the response lists the articles
+    added to or edited in the feed since then, the ids of articles deleted
+    or withdrawn, and the next watermark. ``reset: true`` asks the client
+    to refetch ``subscribed-articles/`` and sync from the new watermark.
+    ``?fields=`` works as for the feed.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ArticleListSerializer
+
+    def get(self, request):
+        fields = self.serializer_class.requested_fields(request.query_params)
+        load_fields = self.serializer_class.load_fields(fields)
+        try:
+            changes = feed_changes(request.user, request.query_params.get('since'), load_fields)
+        except InvalidCursor:
+            raise NotFound("Invalid watermark.")
+        return Response({
+            'watermark': changes.watermark,
+            'reset': changes.reset,
+            'articles': self.serializer_class(changes.articles, many=True, fields=fields).data,
+            'deleted': changes.deleted,
+        })
+
+
+async def subscribed_articles_stream(request):
+    """
+    Server-Sent Events stream of newly approved articles from the
+    publishers and journalists the user subscribes to (see
+    ``newsapp.live``). Replaces polling ``subscribed-articles/``; after a
+    ``reset`` event or a dropped connection the client catches up through
+    ``subscribed-articles/sync/`` and reconnects. ASGI only: under WSGI a
+    stream would hold a worker thread for its whole lifetime.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Live streams require an ASGI server.", status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse("Authentication required.", status=403)
+
+    publisher_ids = [pk async for pk in user.subscribed_publishers.values_list('pk', flat=True)]
+    journalist_ids = [pk async for pk in user.subscribed_journalists.values_list('pk', flat=True)]
+    response = StreamingHttpResponse(
+        live.stream(live.reader_channels(user.pk, publisher_ids, journalist_ids)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class ArticleDetailView(ConditionalGetMixin, APIView):
+    """
+    Returns one article with its full body. Unapproved articles are only
+    visible to their author and to editors.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_validators(self, request, pk):
+        # Only for articles the user may see: a 304 would tell anyone
+        # that an unpublished article exists, and its version.
+        updated_at = Article.objects.visible_to(request.user).filter(
+            pk=pk).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None
+        return updated_at, updated_at
+
+    def get(self, request, pk):
+        article = get_object_or_404(
+            Article.objects.select_related('author', 'publisher'), pk=pk
+        )
+        if not (article.approved or article.author_id == request.user.pk
+                or has_role(request.user, 'Editor')):
+            raise PermissionDenied("You do not have permission to view this article.")
+        return Response(ArticleSerializer(article).data)
+
+
+class SearchView(ConditionalGetMixin, APIView):
+    """
+    Full-text search over approved articles and newsletters, best match
+    first. ``?q=`` is the query and ``?type=article`` or
+    ``?type=newsletter`` limits the kind of result.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    serializer_class = SearchResultSerializer
+
+    def get_validators(self, request):
+        last_edits = [
+            model.objects.aggregate(updated=Max('updated_at'))['updated']
+            for model in (Article, Newsletter)
+        ]
+        return last_edits, max(filter(None, last_edits), default=None)
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        kinds = request.query_params.get('type')
+        kinds = kinds.split(',') if kinds else None
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_with(
+            lambda cursor, page_size: search_page(query, cursor, page_size, kinds),
+            request,
+        )
+        serializer = self.serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class CacheStatsView(APIView):
+    """
+    Returns fragment cache hits, misses, single-flight waits and hit ratio
+    per fragment, for monitoring. Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class SubscriptionsView(APIView):
+    """
+    The user's subscriptions as ``{"publishers": [...], "journalists": [...]}``.
+    PUT sets either list; only the difference from the current
+    subscriptions is written, and the response adds what was ``added``
+    and ``removed``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(subscription_ids(request.user))
+
+    def put(self, request):
+        if request.user.role == 'journalist':
+            raise PermissionDenied("Journalists cannot subscribe.")
+        serializer = SubscriptionsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = update_subscriptions(
+            request.user,
+            serializer.validated_data.get('publishers'),
+            serializer.validated_data.get('journalists'),
+        )
+        return Response({**subscription_ids(request.user), **changes})
+
+
+class AutocompleteView(APIView):
+    """
+    Type-ahead search for the subscription picker: the publishers or
+    journalists whose name starts with ``?q=``, ignoring case, in name
+    order. Each result is ``{"id": ..., "text": ...}``; ``next`` links
+    to the following page.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, kind):
+        paginator = KeysetPagination()
+        try:
+            page = paginator.paginate_with(
+                lambda cursor, page_size: lookup(kind, request.query_params.get('q', ''),
+                                                 cursor, page_size),
+                request,
+            )
+        except LookupError as exc:
+            raise NotFound(str(exc))
+        return paginator.get_paginated_response(page)
+
+
+class PublisherSubscribersView(APIView):
+    """
+    Subscribes many readers to a publisher in one call, e.g. for
+    onboarding imports. Journalists and unknown ids are skipped; returns
+    how many subscriptions were ``added``. Staff only.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, pk):
+        publisher = get_object_or_404(Publisher, pk=pk)
+        serializer = BulkSubscribeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'added': subscribe_readers(publisher, serializer.validated_data['reader_ids'])})
+
+
+class ReviewQueueView(APIView):
+    """
+    The editors' review queue. GET lists the articles waiting for
+    approval, newest first, one cursor-paginated page at a time. POST
+    ``{"action": "approve" | "reject", "article_ids": [...]}`` decides on
+    many at once and returns the ids that were ``approved`` or
+    ``rejected``; ids that were not waiting are skipped. Editors only.
+    """
+    permission_classes = [IsEditor]
+    pagination_class = KeysetPagination
+    serializer_class = ArticleListSerializer
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(Article.objects.pending_review().for_listing(), request)
+        return paginator.get_paginated_response(self.serializer_class(page, many=True).data)
+
+    def post(self, request):
+        serializer = ReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        article_ids = serializer.validated_data['article_ids']
+        if serializer.validated_data['action'] == 'approve':
+            return Response({'approved': approve_many(article_ids)})
+        return Response({'rejected': reject_many(article_ids)})
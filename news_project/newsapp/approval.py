@@ -0,0 +1,162 @@
+"""
+Article approval and withdrawal.
+
+Subscribers are notified when an article *becomes* approved, not whenever
+an approved article is saved: editing a published article's typo must not
+email every subscriber again. The stored approval is captured before each
+save (``newsapp.signals``) and compared with the saved one; only an
+unapproved -> approved transition queues a PublishEvent, and only once
+the saving transaction commits, so a rolled-back approval never notifies.
+
+Each approval of an article is announced at most once. Its PublishEvent
+carries an idempotency key, ``article:<id>:approval:<n>``, where ``n``
+counts the article's earlier approvals that were withdrawn. Concurrent or
+repeated approvals of the same article compute the same key and share one
+event; approving again after a withdrawal is a new approval with a new
+key. approve() additionally locks the article row, so of two editors
+approving at once only one save sees the transition.
+
+Editors clear the review queue in bulk with approve_many() and
+reject_many(). Those write each batch with one ``UPDATE ... WHERE id IN``,
+which sends no model signals, so approve_many() does what the signal
+handlers would have done once for the whole batch: counters, search
+index, cached pages, publish events with the same idempotency keys, and
+the live push.
+"""
+
+from collections import Counter
+
+from django.db import router, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import caching, counters, live, search
+from .delivery import enqueue_publish_event, enqueue_publish_events
+from .models import Article, PublishEvent, Publisher, SearchTerm
+
+# Articles an editor may approve or reject in one request.
+MAX_BATCH = 500
+
+
+def approval_keys(article_ids):
+    """
+    Returns ``{article_id: key}``, the idempotency keys of the articles'
+    current approvals, in one query.
+    """
+    withdrawn = dict(PublishEvent.objects.filter(
+        article_id__in=article_ids, withdrawn_at__isnull=False,
+    ).values('article_id').annotate(n=Count('*')).values_list('article_id', 'n'))
+    return {pk: f"article:{pk}:approval:{withdrawn.get(pk, 0) + 1}" for pk in article_ids}
+
+
+def approval_key(article):
+    """
+    Returns the idempotency key of the article's current approval.
+    """
+    return approval_keys([article.pk])[article.pk]
+
+
+def approval_change(article):
+    """
+    Returns ``'approved'`` or ``'withdrawn'`` if saving the article would
+    change its stored approval, else None. New articles have no stored
+    approval and never change it.
+    """
+    counters.load_article_state(article)
+    state = article.loaded_state()
+    if state is None or article.pk is None or state['approved'] == article.approved:
+        return None
+    return 'approved' if article.approved else 'withdrawn'
+
+
+def article_approved(article):
+    """
+    Announces an approval once the saving transaction commits: records the
+    PublishEvent for its delivery jobs and pushes the article to live
+    streams.
+    """
+    def announce():
+        event, created = enqueue_publish_event(article, approval_key(article))
+        if created:
+            live.publish_article(article)
+
+    transaction.on_commit(announce, robust=True)
+
+
+def article_withdrawn(article):
+    """
+    Closes the article's current approval so a later approval is announced
+    again.
+    """
+    PublishEvent.objects.filter(
+        article_id=article.pk, withdrawn_at__isnull=True,
+    ).update(withdrawn_at=timezone.now())
+
+
+def approve(article):
+    """
+    Approves the article if it is not approved yet, locking its row so
+    concurrent approvals save it once. Returns True if this call approved
+    it.
+    """
+    with transaction.atomic():
+        stored = Article.objects.select_for_update().values('approved', 'publisher_id').get(pk=article.pk)
+        article.approved = True
+        if stored['approved']:
+            return False
+        # Compare the save with the locked row, not with what the instance
+        # was loaded with.
+        article._loaded_state = stored
+        article.rejected_at = None
+        article.save(update_fields=['approved', 'rejected_at', 'updated_at'])
+    return True
+
+
+def approve_many(article_ids):
+    """
+    Approves the given articles that are not approved yet, rejected ones
+    included, in one UPDATE, and announces each approval once the
+    transaction commits. Returns the ids of the articles this call
+    approved.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        pending = dict(Article.objects.select_for_update().filter(
+            pk__in=article_ids, approved=False,
+        ).values_list('pk', 'publisher_id'))
+        if not pending:
+            return []
+        Article.objects.filter(pk__in=pending).update(approved=True, rejected_at=None, updated_at=now)
+
+        counters.adjust(Publisher, 'article_count', Counter(pending.values()))
+        backend = search.get_backend(router.db_for_write(Article))
+        backend.remove(SearchTerm.KIND_ARTICLE, list(pending))
+        backend.add(SearchTerm.KIND_ARTICLE, list(
+            Article.objects.filter(pk__in=pending).only('pk', 'title', 'content')
+        ))
+        caching.bump_on_commit('articles', *(f'article:{pk}' for pk in pending))
+        announced = enqueue_publish_events(approval_keys(list(pending)))
+
+        def push():
+            for article in Article.objects.filter(pk__in=announced).select_related('author', 'publisher'):
+                live.publish_article(article)
+
+        transaction.on_commit(push, robust=True)
+    return sorted(pending)
+
+
+def reject_many(article_ids):
+    """
+    Rejects the given articles that are still waiting for review, taking
+    them out of the queue. Returns the ids of the articles this call
+    rejected.
+    """
+    with transaction.atomic():
+        pending = list(Article.objects.select_for_update().pending_review().filter(
+            pk__in=article_ids,
+        ).values_list('pk', flat=True))
+        if pending:
+            now = timezone.now()
+            Article.objects.filter(pk__in=pending).update(rejected_at=now, updated_at=now)
+            caching.bump_on_commit(*(f'article:{pk}' for pk in pending))
+    return sorted(pending)
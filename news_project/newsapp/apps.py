@@ -1,7 +1,7 @@
 # newsapp/apps.py
 
 from django.apps import AppConfig
-import logging
+from django.db.models.signals import post_migrate
 
 
 class NewsappConfig(AppConfig):
@@ -9,17 +9,10 @@ class NewsappConfig(AppConfig):
     name = 'newsapp'
 
     def ready(self):
-        import newsapp.signals  # Safe to import here
+        # Connects the model signal handlers. Start-up does no database
+        # work: the role groups are created after migrate instead.
+        import newsapp.signals  # noqa: F401
+        from newsapp.bootstrap import bootstrap_after_migrate
 
-        # Avoid DB queries during migration/initialization
-        try:
-            from django.db.utils import OperationalError, ProgrammingError
-            from django.contrib.auth.models import Group
-
-            roles = ['Reader', 'Editor', 'Journalist']
-            for role in roles:
-                Group.objects.get_or_create(name=role)
-
-        except (OperationalError, ProgrammingError) as e:
-            # Avoid crashing on migrate/makemigrations
-            logging.warning(f"Skipped role creation during app initialization: {e}")
+        post_migrate.connect(bootstrap_after_migrate, sender=self,
+                             dispatch_uid='newsapp.bootstrap_roles')
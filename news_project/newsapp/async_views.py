@@ -0,0 +1,178 @@
+"""
+Async versions of the read-heavy views, for ASGI deployments.
+
+Under ASGI a sync view holds a worker thread for its whole request. These
+views await the database and the cache instead, through Django's async
+ORM (``aiterator``, ``afirst``, ``aaggregate``) and cache API. Only page
+rendering, whose context processors read the session and messages
+synchronously, is handed to a thread.
+
+They behave like their counterparts in ``newsapp.views`` and
+``newsapp.api_views`` and share their fragment cache entries. Setting
+``NEWSAPP_ASYNC_VIEWS`` routes the URLs to them; leave it off under WSGI,
+where every async view would be run in an event loop of its own.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import replace_query_param
+
+from .caching import acached_fragment, aversions
+from .conditional import make_etag, patch_conditional_headers
+from .feed import afeed_page, afeed_version
+from .models import Article, Newsletter
+from .pagination import InvalidCursor, KeysetPage, apaginate_request, page_size_from
+from .roles import arole_names
+from .serializers import ArticleListSerializer
+
+arender = sync_to_async(render)
+
+
+async def _user(request):
+    """
+    Returns the request's user with their roles loaded, and makes it
+    ``request.user`` so templates rendering in a thread reuse it.
+    """
+    user = await request.auser()
+    await arole_names(user)
+    request.user = user
+    return user
+
+
+async def acached_listing(request, fragment, queryset, template, context_name, depends_on):
+    """
+    Async version of ``newsapp.views.cached_listing()``.
+    """
+    async def render_page():
+        page = await apaginate_request(request, queryset)
+        return {
+            'page': KeysetPage([obj.pk for obj in page], page.next_cursor, page.previous_cursor),
+            'html': render_to_string(template, {context_name: page}),
+        }
+
+    parts = (*await aversions(*depends_on), page_size_from(request.GET),
+             request.GET.get('cursor', ''))
+    entry = await acached_fragment(fragment, parts, render_page)
+    return entry['page'], entry['html']
+
+
+async def article_list_view(request):
+    """
+    Async version of ``newsapp.views.article_list_view()``.
+    """
+    user = await _user(request)
+    roles = await arole_names(user)
+    if 'reader' in roles and not roles & {'editor', 'journalist'}:
+        page, html = await acached_listing(
+            request, 'article_list', Article.objects.filter(approved=True).for_listing(),
+            'newsapp/article_items.html', 'articles', ('articles', 'publishers'),
+        )
+        return await arender(request, 'newsapp/article_list.html',
+                             {'articles': page, 'page': page, 'articles_html': html})
+
+    if roles & {'reader', 'editor'}:
+        articles = Article.objects.visible_to(user)
+    elif 'journalist' in roles:
+        articles = Article.objects.filter(author=user)
+    else:
+        return HttpResponseForbidden()
+    page = await apaginate_request(request, articles.for_listing())
+    return await arender(request, 'newsapp/article_list.html', {'articles': page, 'page': page})
+
+
+async def article_detail_view(request, pk):
+    """
+    Async version of ``newsapp.views.article_detail_view()``.
+    """
+    async def render_article():
+        article = await Article.objects.select_related('author', 'publisher').filter(pk=pk).afirst()
+        if article is None:
+            return {}
+        return {
+            'title': article.title,
+            'approved': article.approved,
+            'author_id': article.author_id,
+            'html': render_to_string('newsapp/article_body.html', {'article': article}),
+        }
+
+    user = await _user(request)
+    entry = await acached_fragment(
+        'article', (pk, *await aversions(f'article:{pk}', 'publishers')), render_article
+    )
+    if not entry:
+        raise Http404("No Article matches the given query.")
+    if entry['approved'] or 'editor' in await arole_names(user) or entry['author_id'] == user.pk:
+        return await arender(request, 'newsapp/article_detail.html',
+                             {'article_title': entry['title'], 'article_html': entry['html']})
+    messages.error(request, "You do not have permission to access this page.")
+    return redirect('dashboard')
+
+
+async def newsletter_list_view(request):
+    """
+    Async version of ``newsapp.views.newsletter_list_view()``.
+    """
+    user = await _user(request)
+    roles = await arole_names(user)
+    if roles & {'reader', 'editor'}:
+        page, html = await acached_listing(
+            request, 'newsletter_list', Newsletter.objects.for_listing(),
+            'newsapp/newsletter_items.html', 'newsletters', ('newsletters', 'publishers'),
+        )
+        return await arender(request, 'newsapp/newsletter_list.html',
+                             {'newsletters': page, 'page': page, 'newsletters_html': html})
+
+    if 'journalist' in roles:
+        newsletters = Newsletter.objects.filter(author=user)
+    else:
+        return HttpResponseForbidden()
+    page = await apaginate_request(request, newsletters.for_listing())
+    return await arender(request, 'newsapp/newsletter_list.html',
+                         {'newsletters': page, 'page': page})
+
+
+def _json(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        content_type='application/json')
+
+
+async def subscribed_articles_view(request):
+    """
+    Async version of ``newsapp.api_views.SubscribedArticlesView`` for
+    session-authenticated JSON clients: the same cursor-paginated page,
+    ``?fields=`` selection and conditional GET handling.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _json({'detail': "Authentication credentials were not provided."}, status=403)
+
+    cursor, page_size = request.GET.get('cursor'), page_size_from(request.GET)
+    try:
+        version, last_modified = await afeed_version(user, cursor, page_size)
+    except InvalidCursor as exc:
+        return _json({'detail': str(exc)}, status=404)
+    etag = make_etag(version, request, 'json')
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        fields = ArticleListSerializer.requested_fields(request.GET)
+        page = await afeed_page(user, cursor, page_size, ArticleListSerializer.load_fields(fields))
+
+        def link(cursor):
+            if cursor is None:
+                return None
+            return replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+
+        response = _json({
+            'next': link(page.next_cursor),
+            'previous': link(page.previous_cursor),
+            'results': ArticleListSerializer(page, many=True, fields=fields).data,
+        })
+    if response.status_code in (200, 304):
+        patch_conditional_headers(response, etag, last_modified)
+    return response
@@ -0,0 +1,112 @@
+"""
+Subscriber resolution for notification channels.
+
+The audience of an article is every reader subscribed to its publisher or
+following its author. Only readers are reached, however they subscribed;
+audience_q() and in_audience() hold that rule for the feeds in
+``newsapp.feed`` too. Email, digest and push channels read the audience
+from here, as a stream of plain value tuples in ascending user id order:
+
+- each reader appears once, however many ways they are subscribed: the
+  subscriptions are tested with ``EXISTS`` subqueries rather than by
+  joining or ``UNION``-ing the subscription tables, so there is nothing
+  to deduplicate;
+- rows are fetched in keyset pages (``id > last_id ... LIMIT n``) of
+  ``values_list()`` tuples, never model instances, so memory stays flat
+  however many followers a publisher has. Each page is read with
+  ``iterator()``; paging matters because the MySQL driver buffers a whole
+  result set client-side, so one unbounded query would not stay flat;
+- the id order doubles as a resume cursor: a stream started ``after`` the
+  last id a channel delivered to picks up where it stopped.
+"""
+
+from django.db.models import Exists, OuterRef, Q
+
+from .mailer import DEFAULT_CHUNK_SIZE, Recipient
+from .models import CustomUser
+
+# Stored value of CustomUser.role for readers.
+READER = 'reader'
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistSubscription = CustomUser.subscribed_journalists.through
+
+
+def audience_q(prefix=''):
+    """
+    Returns a Q matching the users notifications and feeds reach, for a
+    queryset reaching users through ``prefix`` (e.g. ``'customuser__'``).
+    """
+    return Q(**{f'{prefix}role': READER})
+
+
+def in_audience(user):
+    """
+    Returns whether notifications and feeds reach ``user``; the Python
+    side of audience_q().
+    """
+    return user.role == READER
+
+
+def subscribers(publisher_ids=(), journalist_ids=()):
+    """
+    Returns a queryset of the readers subscribed to any of
+    ``publisher_ids`` or following any of ``journalist_ids``, each once.
+    """
+    sources = Q()
+    if publisher_ids:
+        sources |= Exists(PublisherSubscription.objects.filter(
+            customuser_id=OuterRef('pk'), publisher_id__in=publisher_ids))
+    if journalist_ids:
+        sources |= Exists(JournalistSubscription.objects.filter(
+            from_customuser_id=OuterRef('pk'), to_customuser_id__in=journalist_ids))
+    if not sources:
+        return CustomUser.objects.none()
+    return CustomUser.objects.filter(sources, audience_q())
+
+
+def article_subscribers(article):
+    """
+    Returns a queryset of the readers subscribed to the article's publisher
+    or following its author.
+    """
+    return subscribers([article.publisher_id], [article.author_id])
+
+
+def stream(queryset, fields, after=None, chunk_size=None):
+    """
+    Yields ``(pk, *fields)`` tuples for the users in ``queryset`` with an
+    id above ``after``, in ascending id order, reading ``chunk_size`` rows
+    per query.
+    """
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    last_id = after or 0
+    rows = queryset.order_by('pk').values_list('pk', *fields)
+    while True:
+        count = 0
+        for row in rows.filter(pk__gt=last_id)[:chunk_size].iterator(chunk_size=chunk_size):
+            count += 1
+            last_id = row[0]
+            yield row
+        if count < chunk_size:
+            return
+
+
+def subscriber_ids(article, after=None, chunk_size=None):
+    """
+    Yields the id of every reader in the article's audience, for channels
+    that address users rather than mailboxes.
+    """
+    for pk, in stream(article_subscribers(article), (), after, chunk_size):
+        yield pk
+
+
+def email_recipients(article, after=None, chunk_size=None):
+    """
+    Yields a Recipient for every reader in the article's audience who has
+    an email address and is emailed per article rather than in a digest
+    (see ``newsapp.digest``).
+    """
+    queryset = article_subscribers(article).filter(digest=CustomUser.DIGEST_NONE).exclude(email='')
+    for row in stream(queryset, ('email', 'username'), after, chunk_size):
+        yield Recipient(*row)
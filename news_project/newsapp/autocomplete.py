@@ -0,0 +1,113 @@
+"""
+Type-ahead lookups for the subscription picker.
+
+The picker never loads the publisher or user tables; it asks for the
+names starting with what the user typed, one page at a time. Names are
+matched case-insensitively with a range condition on the lower-cased
+name, ``lower(name) >= 'abc' AND lower(name) < 'abd'``, which the
+expression indexes on ``Lower('name')`` and ``(role, Lower('username'))``
+answer as an index range scan. MySQL compares the plain columns instead:
+their collations ignore case already, and MariaDB cannot index
+expressions. Pages are keyed on ``(lower(name), id)`` so deep pages cost
+the same as the first.
+"""
+
+import base64
+import binascii
+import json
+
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+
+from .models import CustomUser, Publisher
+from .pagination import DEFAULT_PAGE_SIZE, InvalidCursor, KeysetPage
+
+KINDS = ('publishers', 'journalists')
+MAX_PREFIX_LENGTH = 100
+
+
+def source(kind):
+    """
+    Returns ``(queryset, name_field)`` for an autocomplete kind. Raises
+    LookupError for an unknown kind.
+    """
+    if kind == 'publishers':
+        return Publisher.objects.all(), 'name'
+    if kind == 'journalists':
+        return CustomUser.objects.filter(role='journalist'), 'username'
+    raise LookupError(f"Unknown autocomplete source: {kind!r}")
+
+
+def encode_key(key, pk):
+    """
+    Returns an opaque token pointing at the row with lower-cased name
+    ``key`` and primary key ``pk``.
+    """
+    raw = json.dumps({'k': key, 'i': pk}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_key(token):
+    """
+    Returns ``(key, pk)`` for a token from encode_key().
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        key, pk = payload['k'], int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from exc
+    if not isinstance(key, str):
+        raise InvalidCursor(f"Invalid cursor: {token!r}")
+    return key, pk
+
+
+def prefix_range(prefix):
+    """
+    Returns the ``(lower, upper)`` bounds of the strings starting with
+    ``prefix``: ``upper`` is the prefix with its last character bumped.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def matches(kind, prefix='', cursor=None):
+    """
+    Returns ``(queryset, name_field)``: the ``kind`` rows whose name starts
+    with ``prefix``, ignoring case, after the cursor's row, in name order.
+    """
+    queryset, field = source(kind)
+    if connections[queryset.db].vendor == 'mysql':
+        # Case-insensitive collations already compare the plain column
+        # the way we want, and MariaDB has no expression indexes.
+        queryset = queryset.alias(key=F(field))
+    else:
+        queryset = queryset.alias(key=Lower(field))
+
+    prefix = prefix.strip().lower()[:MAX_PREFIX_LENGTH]
+    if prefix:
+        lower, upper = prefix_range(prefix)
+        queryset = queryset.filter(key__gte=lower, key__lt=upper)
+    if cursor:
+        key, pk = decode_key(cursor)
+        # The plain key bound repeats the tuple comparison so the planner
+        # seeks into the index instead of filtering from the prefix start.
+        queryset = queryset.filter(Q(key__gt=key) | Q(pk__gt=pk), key__gte=key)
+    return queryset.order_by('key', 'pk'), field
+
+
+def lookup(kind, prefix='', cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Returns a KeysetPage of ``{'id': ..., 'text': ...}`` dicts for the
+    ``kind`` rows ('publishers' or 'journalists') whose name starts with
+    ``prefix``, ignoring case, in name order. Raises LookupError for an
+    unknown kind and InvalidCursor for a bad cursor.
+    """
+    queryset, field = matches(kind, prefix, cursor)
+    rows = list(queryset.values_list('pk', field)[:page_size + 1])
+    page = [{'id': pk, 'text': text} for pk, text in rows[:page_size]]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = page[-1]
+        next_cursor = encode_key(last['text'].lower(), last['id'])
+    return KeysetPage(page, next_cursor)
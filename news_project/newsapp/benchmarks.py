@@ -0,0 +1,1117 @@
+"""
+Performance benchmarks for the newsapp hot paths.
+
+Each benchmark is a function registered with ``@benchmark`` and run through
+``python manage.py benchmark <name>``. Benchmarks return a dict of figures
+which the command prints; they never touch production data unless they
+say so in their help text.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+BENCHMARKS = {}
+BENCH_ALIAS = 'benchmark'
+
+
+def benchmark(name, help, arguments=()):
+    """
+    Registers a benchmark function under ``name``. ``arguments`` is a list
+    of ``(flags, kwargs)`` pairs passed to ``add_argument`` for the
+    benchmark's sub-command.
+    """
+    def register(func):
+        BENCHMARKS[name] = {'func': func, 'help': help, 'arguments': arguments}
+        return func
+    return register
+
+
+class Timer:
+    """
+    Context manager measuring wall-clock time in seconds.
+    """
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.started
+
+
+class QueryCounter:
+    """
+    Context manager counting the queries run on ``connection``. Unlike
+    CaptureQueriesContext it keeps no log, so the count is not capped by
+    the connection's ``queries_log`` on long runs.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.wrapper = self.connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wrapper.__exit__(*exc_info)
+
+
+@contextmanager
+def bench_database(path):
+    """
+    Registers a SQLite database at ``path`` under the ``benchmark`` alias,
+    migrates it and yields the alias. The file is kept so large fixtures
+    can be reused between runs.
+    """
+    from django.core.management import call_command
+    from django.db import connections
+
+    connections.databases[BENCH_ALIAS] = {
+        **connections.databases['default'],
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'OPTIONS': {},
+    }
+    try:
+        call_command('migrate', database=BENCH_ALIAS, verbosity=0)
+        yield BENCH_ALIAS
+    finally:
+        connections[BENCH_ALIAS].close()
+        del connections[BENCH_ALIAS]
+        del connections.databases[BENCH_ALIAS]
+
+
+def ensure_article_fixture(alias, articles, publishers=10, journalists=100, batch_size=5000):
+    """
+    Fills the benchmark database with ``articles`` approved articles spread
+    over a few publishers and journalists, one minute apart. Does nothing
+    if the fixture already has that many articles.
+    """
+    from django.db import connections
+
+    from .models import Article, CustomUser, Publisher
+
+    existing = Article.objects.using(alias).count()
+    if existing >= articles:
+        return existing
+
+    publisher_ids = list(Publisher.objects.using(alias).values_list('pk', flat=True))
+    if not publisher_ids:
+        Publisher.objects.using(alias).bulk_create(
+            [Publisher(name=f"Publisher {i}") for i in range(publishers)]
+        )
+        publisher_ids = list(Publisher.objects.using(alias).values_list('pk', flat=True))
+
+    author_ids = list(CustomUser.objects.using(alias).filter(
+        role='journalist').values_list('pk', flat=True))
+    if not author_ids:
+        CustomUser.objects.using(alias).bulk_create([
+            CustomUser(username=f"journalist{i}", role='journalist',
+                       email=f"journalist{i}@example.com")
+            for i in range(journalists)
+        ])
+        author_ids = list(CustomUser.objects.using(alias).filter(
+            role='journalist').values_list('pk', flat=True))
+
+    for start in range(existing, articles, batch_size):
+        stop = min(start + batch_size, articles)
+        Article.objects.using(alias).bulk_create([
+            Article(
+                title=f"Article {i}",
+                summary=f"Summary of article {i}",
+                content=f"Body of article {i}. " * 20,
+                approved=True,
+                author_id=author_ids[i % len(author_ids)],
+                publisher_id=publisher_ids[i % len(publisher_ids)],
+            )
+            for i in range(start, stop)
+        ])
+
+    # bulk_create stamps every row with "now"; spread them out so ordering
+    # by created_at is realistic.
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "UPDATE newsapp_article "
+            "SET created_at = datetime('2020-01-01', '+' || id || ' minutes')"
+        )
+    return articles
+
+
+@benchmark(
+    'mail',
+    help="Send personalised notifications to synthetic subscribers.",
+    arguments=[
+        (['--recipients'], {'type': int, 'default': 100_000}),
+        (['--chunk-size'], {'type': int, 'default': None}),
+        (['--backend'], {
+            'default': 'django.core.mail.backends.locmem.EmailBackend',
+            'help': "Email backend path, e.g. the SMTP backend pointed at a "
+                    "local debugging server (python -m aiosmtpd -n).",
+        }),
+        (['--host'], {'default': 'localhost'}),
+        (['--port'], {'type': int, 'default': 8025}),
+    ],
+)
+def bench_mail(recipients, chunk_size, backend, host, port):
+    from django.core import mail
+    from django.core.mail import get_connection
+
+    from .mailer import MassMailer, Recipient
+
+    mail.outbox = []
+    connection = get_connection(backend)
+    if hasattr(connection, 'host'):
+        connection.host, connection.port = host, port
+
+    stream = (
+        Recipient(i, f"reader{i}@example.com", f"reader{i}")
+        for i in range(1, recipients + 1)
+    )
+    mailer = MassMailer(chunk_size=chunk_size, connection=connection)
+    report = mailer.send(
+        stream,
+        lambda r: ("New Article Published", f"Hi {r.name},\n\nBenchmark article."),
+    )
+    mail.outbox = []
+    results = report.as_dict()
+    results['failed_recipients'] = len(results['failed_recipients'])
+    return results
+
+
+@benchmark(
+    'pagination',
+    help="Compare keyset and OFFSET pagination deep into a large SQLite archive.",
+    arguments=[
+        (['--articles'], {'type': int, 'default': 1_000_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--page-size'], {'type': int, 'default': 20}),
+        (['--pages'], {'default': '1,10,100,1000,10000',
+                       'help': "Comma-separated page numbers to time."}),
+        (['--repeat'], {'type': int, 'default': 20}),
+    ],
+)
+def bench_pagination(articles, db, page_size, pages, repeat):
+    from .models import Article
+    from .pagination import encode_cursor, keyset_paginate
+
+    results = {}
+    with bench_database(db) as alias:
+        with Timer() as setup:
+            ensure_article_fixture(alias, articles)
+        results['fixture_seconds'] = round(setup.elapsed, 2)
+
+        queryset = Article.objects.using(alias).filter(approved=True).defer('content')
+        ordered = queryset.order_by('-created_at', '-pk')
+        for page in (int(p) for p in pages.split(',')):
+            offset = (page - 1) * page_size
+            if page > 1:
+                anchor = ordered.values('created_at', 'pk')[offset - 1]
+                cursor = encode_cursor(anchor['created_at'], anchor['pk'])
+            else:
+                cursor = None
+
+            with Timer() as keyset:
+                for _ in range(repeat):
+                    list(keyset_paginate(queryset, cursor, page_size))
+            with Timer() as offset_timer:
+                for _ in range(repeat):
+                    list(ordered[offset:offset + page_size])
+
+            results[f'page_{page}_keyset_ms'] = round(keyset.elapsed / repeat * 1000, 3)
+            results[f'page_{page}_offset_ms'] = round(offset_timer.elapsed / repeat * 1000, 3)
+    return results
+
+
+@benchmark(
+    'serialization',
+    help="Compare payload size and time of full and compact feed serialization.",
+    arguments=[
+        (['--articles'], {'type': int, 'default': 10_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--fields'], {'default': None,
+                        'help': "Also time a sparse fieldset, e.g. id,title."}),
+    ],
+)
+def bench_serialization(articles, db, fields):
+    from rest_framework import serializers
+    from rest_framework.renderers import JSONRenderer
+
+    from .feed import project_articles
+    from .models import Article
+    from .serializers import ArticleListSerializer
+
+    class FullArticleSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Article
+            fields = '__all__'
+
+    def measure(queryset, serializer):
+        with Timer() as timer:
+            payload = JSONRenderer().render(serializer(list(queryset), many=True).data)
+        return len(payload), round(timer.elapsed * 1000, 1)
+
+    results = {}
+    with bench_database(db) as alias:
+        ensure_article_fixture(alias, articles)
+        base = Article.objects.using(alias).order_by('-created_at', '-pk')
+
+        size, ms = measure(base[:articles], FullArticleSerializer)
+        results['full_bytes'], results['full_ms'] = size, ms
+
+        compact = project_articles(base, ArticleListSerializer.load_fields())
+        size, ms = measure(compact[:articles], ArticleListSerializer)
+        results['compact_bytes'], results['compact_ms'] = size, ms
+
+        if fields:
+            names = fields.split(',')
+            sparse = project_articles(base, ArticleListSerializer.load_fields(names))
+            size, ms = measure(
+                sparse[:articles],
+                lambda rows, many: ArticleListSerializer(rows, many=many, fields=names),
+            )
+            results['sparse_bytes'], results['sparse_ms'] = size, ms
+    return results
+
+
+@benchmark(
+    'search',
+    help="Time full-text search queries against a large SQLite archive.",
+    arguments=[
+        (['--articles'], {'type': int, 'default': 1_000_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--backend'], {'default': 'auto',
+                         'help': "'auto' or the dotted path of a search backend."}),
+        (['--queries'], {'default': '123456|article 42|body article',
+                         'help': "Pipe-separated queries: rare, mixed and common terms."}),
+        (['--page-size'], {'type': int, 'default': 20}),
+        (['--repeat'], {'type': int, 'default': 20}),
+        (['--reindex'], {'action': 'store_true',
+                         'help': "Rebuild the index even if it is already filled."}),
+    ],
+)
+def bench_search(articles, db, backend, queries, page_size, repeat, reindex):
+    from django.db.models import Q
+    from django.test import override_settings
+
+    from .models import Article
+    from .search import get_backend, query_terms, search_page
+
+    results = {}
+    with bench_database(db) as alias, override_settings(NEWSAPP_SEARCH_BACKEND=backend):
+        ensure_article_fixture(alias, articles)
+        engine = get_backend(alias)
+        results['backend'] = type(engine).__name__
+        if reindex or engine.is_empty():
+            with Timer() as indexing:
+                results['indexed'] = engine.rebuild()
+            results['index_seconds'] = round(indexing.elapsed, 2)
+
+        for query in queries.split('|'):
+            with Timer() as timer:
+                for _ in range(repeat):
+                    page = search_page(query, page_size=page_size, using=alias)
+            results[f'{query!r}_ms'] = round(timer.elapsed / repeat * 1000, 3)
+            results[f'{query!r}_hits'] = len(page)
+
+            # The unindexed LIKE scan search would otherwise need.
+            like = Q()
+            for term in query_terms(query):
+                like |= Q(title__icontains=term) | Q(content__icontains=term)
+            with Timer() as timer:
+                list(Article.objects.using(alias).filter(like, approved=True)
+                     .defer('content')[:page_size])
+            results[f'{query!r}_like_ms'] = round(timer.elapsed * 1000, 3)
+    return results
+
+
+@benchmark(
+    'live',
+    help="Hold many idle live streams on one event loop and time pushes to them.",
+    arguments=[
+        (['--connections'], {'type': int, 'default': 5000}),
+        (['--publishers'], {'type': int, 'default': 100,
+                            'help': "Connections are spread over this many publisher channels."}),
+        (['--messages'], {'type': int, 'default': 20}),
+        (['--slow'], {'type': int, 'default': 500,
+                      'help': "Connections that never read, to show queues stay bounded."}),
+    ],
+)
+def bench_live(connections, publishers, messages, slow):
+    """
+    Measures what one ASGI worker pays per open stream (broker entry,
+    bounded queue, generator and task; not kernel socket buffers) and how
+    long an approval takes to reach every connection. Messages are
+    published from another thread, as approvals committed in sync views
+    are.
+    """
+    import asyncio
+    import threading
+    import tracemalloc
+
+    from . import live
+
+    async def run():
+        results = {}
+        received = [0]
+        all_received = asyncio.Event()
+        expected = [0]
+
+        async def reader(channels):
+            async for chunk in live.stream(channels, heartbeat=15):
+                if chunk.startswith(b'event: article'):
+                    received[0] += 1
+                    if received[0] == expected[0]:
+                        all_received.set()
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        with Timer() as connecting:
+            tasks = [
+                asyncio.create_task(reader(live.reader_channels(i, [i % publishers], [])))
+                for i in range(connections)
+            ]
+            await asyncio.sleep(0.1)
+        idle = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        results['connect_seconds'] = round(connecting.elapsed, 3)
+        results['idle_kib_per_connection'] = round(idle / connections / 1024, 2)
+
+        message = live.format_event('article', {'id': 1, 'title': 'x' * 80})
+        channels = [f'publisher:{i}' for i in range(publishers)]
+        expected[0] = connections * messages
+        with Timer() as pushing:
+            publisher = threading.Thread(
+                target=lambda: [live.get_broker().publish(channels, message) for _ in range(messages)]
+            )
+            publisher.start()
+            await asyncio.wait_for(all_received.wait(), 60)
+            publisher.join()
+        results['deliveries'] = received[0]
+        results['push_ms_per_message'] = round(pushing.elapsed / messages * 1000, 3)
+
+        tracemalloc.start()
+        stalled = [live.get_broker().subscribe(['publisher:0']) for _ in range(slow)]
+        queue_size = live.live_setting('QUEUE_SIZE')
+        for _ in range(queue_size * 3):
+            live.get_broker().publish(['publisher:0'], message)
+        await asyncio.sleep(0.1)
+        results['slow_max_queued'] = max((s.queue.qsize() for s in stalled), default=0)
+        results['slow_reset'] = sum(s.overflowed for s in stalled)
+        results['slow_kib_per_connection'] = round(
+            tracemalloc.get_traced_memory()[0] / max(slow, 1) / 1024, 2)
+        tracemalloc.stop()
+        for subscription in stalled:
+            subscription.close()
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        results['open_after_disconnect'] = live.get_broker().stats()['connections']
+        return results
+
+    previous, live._broker = live._broker, live.InMemoryBroker()
+    try:
+        return asyncio.run(run())
+    finally:
+        live._broker = previous
+
+
+class BenchmarkRouter:
+    """
+    Database router sending every query to the benchmark database, for
+    benchmarks that go through views.
+    """
+
+    def db_for_read(self, model, **hints):
+        return BENCH_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return BENCH_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+@benchmark(
+    'async_views',
+    help="Compare concurrent throughput of the sync and async read views under ASGI.",
+    arguments=[
+        (['--articles'], {'type': int, 'default': 100_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--concurrency'], {'type': int, 'default': 50}),
+        (['--requests'], {'type': int, 'default': 500,
+                          'help': "Requests per page and mode."}),
+        (['--cache'], {'action': 'store_true',
+                       'help': "Keep the fragment cache on (off by default so pages hit the database)."}),
+    ],
+)
+def bench_async_views(articles, db, concurrency, requests, cache):
+    """
+    Sends concurrent GETs straight into Django's ASGI application, as
+    uvicorn would, once with NEWSAPP_ASYNC_VIEWS off and once on, and
+    reports requests per second and the peak number of threads.
+    """
+    import asyncio
+    import importlib
+    import threading
+
+    from django.conf import settings
+    from django.contrib.auth.models import Group
+    from django.core.asgi import get_asgi_application
+    from django.test import Client, override_settings
+    from django.urls import clear_url_caches, reverse
+
+    from . import api_urls, urls
+    from .models import Article, CustomUser, Publisher
+
+    def reload_urls():
+        for module in (api_urls, urls, importlib.import_module(settings.ROOT_URLCONF)):
+            importlib.reload(module)
+        clear_url_caches()
+
+    async def get(app, path, cookie):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        requested = asyncio.Event()
+        status = []
+
+        async def receive():
+            if not requested.is_set():
+                requested.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await app(scope, receive, send)
+        return status[0]
+
+    async def load(app, path, cookie):
+        limit = asyncio.Semaphore(concurrency)
+        peak = [threading.active_count()]
+        done = asyncio.Event()
+
+        async def sample():
+            while not done.is_set():
+                peak[0] = max(peak[0], threading.active_count())
+                await asyncio.sleep(0.01)
+
+        async def one():
+            async with limit:
+                return await get(app, path, cookie)
+
+        sampler = asyncio.create_task(sample())
+        with Timer() as timer:
+            statuses = await asyncio.gather(*(one() for _ in range(requests)))
+        done.set()
+        await sampler
+        failed = [status for status in statuses if status != 200]
+        if failed:
+            raise RuntimeError(f"{path} answered {failed[0]}")
+        return requests / timer.elapsed, peak[0]
+
+    results = {}
+    overrides = override_settings(
+        DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter'],
+        ALLOWED_HOSTS=['testserver'],
+        **({} if cache else {'NEWSAPP_FRAGMENT_CACHE_TIMEOUT': 0}),
+    )
+    with bench_database(db) as alias, overrides:
+        ensure_article_fixture(alias, articles)
+        reader, created = CustomUser.objects.get_or_create(
+            username='bench_reader', defaults={'role': 'reader'})
+        if created:
+            reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+            reader.subscribed_publishers.add(*Publisher.objects.order_by('pk')[:3])
+        client = Client()
+        client.force_login(reader)
+        cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in client.cookies.items())
+        article_pk = Article.objects.order_by('-pk').values_list('pk', flat=True).first()
+
+        try:
+            for mode in ('sync', 'async'):
+                with override_settings(NEWSAPP_ASYNC_VIEWS=mode == 'async'):
+                    reload_urls()
+                    app = get_asgi_application()
+                    for name, args in (('article_list', ()), ('article_detail', (article_pk,)),
+                                       ('newsletter_list', ()), ('subscribed_articles', ())):
+                        rps, threads = asyncio.run(load(app, reverse(name, args=args), cookie))
+                        results[f'{name}_{mode}_rps'] = round(rps, 1)
+                        results[f'{name}_{mode}_peak_threads'] = threads
+        finally:
+            reload_urls()
+    return results
+
+
+@benchmark(
+    'subscriptions',
+    help="Time subscribing thousands of users to a publisher, one by one and in bulk.",
+    arguments=[
+        (['--users'], {'type': int, 'default': 10_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--naive-sample'], {'type': int, 'default': 1_000,
+                              'help': "Users subscribed one by one; the figure is scaled up."}),
+        (['--backfill'], {'type': int, 'default': 20,
+                          'help': "Articles copied into each new subscriber's feed."}),
+    ],
+)
+def bench_subscriptions(users, db, naive_sample, backfill):
+    from django.test import override_settings
+
+    from .models import CustomUser, FeedEntry, Publisher
+    from .subscriptions import subscribe_readers, update_subscriptions
+
+    results = {}
+    overrides = override_settings(
+        DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter'],
+        NEWSAPP_FEED_BACKFILL_LIMIT=backfill,
+    )
+    with bench_database(db) as alias, overrides:
+        ensure_article_fixture(alias, 10_000)
+        readers = CustomUser.objects.filter(username__startswith='bench_import_')
+        missing = users - readers.count()
+        if missing > 0:
+            start = readers.count()
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench_import_{i}', role='reader')
+                for i in range(start, start + missing)
+            ], batch_size=5000)
+        reader_ids = list(readers.order_by('pk').values_list('pk', flat=True)[:users])
+        publisher = Publisher.objects.order_by('pk').first()
+        through = CustomUser.subscribed_publishers.through
+
+        def reset():
+            through.objects.filter(publisher=publisher, customuser_id__in=reader_ids).delete()
+            FeedEntry.objects.filter(reader_id__in=reader_ids).delete()
+            Publisher.objects.filter(pk=publisher.pk).update(fan_out_on_read=False)
+            publisher.fan_out_on_read = False
+
+        reset()
+        sample = CustomUser.objects.filter(pk__in=reader_ids[:naive_sample])
+        with Timer() as timer:
+            for reader in sample:
+                reader.subscribed_publishers.add(publisher)
+        results['one_by_one_seconds'] = round(timer.elapsed * users / max(naive_sample, 1), 2)
+
+        reset()
+        with Timer() as timer:
+            results['bulk_added'] = subscribe_readers(publisher, reader_ids)
+        results['bulk_seconds'] = round(timer.elapsed, 2)
+
+        sample = list(CustomUser.objects.filter(pk__in=reader_ids[:naive_sample]))
+        with Timer() as timer:
+            for reader in sample:
+                update_subscriptions(reader, [publisher.pk], [])
+        results['unchanged_update_ms'] = round(timer.elapsed / len(sample) * 1000, 3)
+        with Timer() as timer:
+            for reader in sample:
+                reader.subscribed_publishers.set([publisher.pk])
+                reader.subscribed_journalists.set([])
+        results['unchanged_set_ms'] = round(timer.elapsed / len(sample) * 1000, 3)
+        reset()
+    return results
+
+
+@benchmark(
+    'subscription_page',
+    help="Measure the subscriptions page and its type-ahead lookups against many journalists.",
+    arguments=[
+        (['--journalists'], {'type': int, 'default': 20_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--repeat'], {'type': int, 'default': 20}),
+    ],
+)
+def bench_subscription_page(journalists, db, repeat):
+    """
+    Renders the subscriptions page with the type-ahead picker and, for
+    comparison, the same form with one checkbox per publisher and user,
+    then times prefix lookups through the autocomplete endpoint.
+    """
+    from django import forms
+    from django.contrib.auth.models import Group
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from .models import CustomUser, Publisher
+
+    results = {}
+    overrides = override_settings(
+        DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter'],
+        ALLOWED_HOSTS=['testserver'],
+    )
+    with bench_database(db) as alias, overrides:
+        ensure_article_fixture(alias, 1_000)
+        existing = CustomUser.objects.filter(username__startswith='bench_journalist_')
+        missing = journalists - existing.count()
+        if missing > 0:
+            start = existing.count()
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench_journalist_{i}', role='journalist')
+                for i in range(start, start + missing)
+            ], batch_size=5000)
+        reader, created = CustomUser.objects.get_or_create(
+            username='bench_reader', defaults={'role': 'reader'})
+        if created:
+            reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+            reader.subscribed_publishers.add(*Publisher.objects.order_by('pk')[:3])
+        results['users'] = CustomUser.objects.count()
+
+        client = Client()
+        client.force_login(reader)
+        url = reverse('subscriptions')
+        with Timer() as timer:
+            for _ in range(repeat):
+                response = client.get(url)
+        results['page_bytes'] = len(response.content)
+        results['page_ms'] = round(timer.elapsed / repeat * 1000, 2)
+
+        class CheckboxForm(forms.ModelForm):
+            class Meta:
+                model = CustomUser
+                fields = ['subscribed_publishers', 'subscribed_journalists']
+                widgets = {
+                    'subscribed_publishers': forms.CheckboxSelectMultiple,
+                    'subscribed_journalists': forms.CheckboxSelectMultiple,
+                }
+
+        with Timer() as timer:
+            html = str(CheckboxForm(instance=reader))
+        results['checkbox_form_bytes'] = len(html)
+        results['checkbox_form_ms'] = round(timer.elapsed * 1000, 2)
+
+        lookup_url = reverse('api_autocomplete', args=['journalists'])
+        with Timer() as timer:
+            for i in range(repeat):
+                response = client.get(lookup_url, {'q': f'bench_journalist_{i}', 'page_size': 10})
+        results['lookup_ms'] = round(timer.elapsed / repeat * 1000, 2)
+        results['lookup_results'] = len(response.json()['results'])
+    return results
+
+
+COLD_START_PROBE = """
+import sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+setup = time.perf_counter() - started
+from django.db import connections
+print(setup, int(any(c.connection is not None for c in connections.all(initialized_only=True))),
+      int('rest_framework' in sys.modules), int('requests' in sys.modules))
+"""
+
+
+@benchmark(
+    'cold_start',
+    help="Time worker boot (django.setup() plus the WSGI app) and `manage.py check` in fresh processes.",
+    arguments=[
+        (['--repeat'], {'type': int, 'default': 5}),
+    ],
+)
+def bench_cold_start(repeat):
+    """
+    Starts fresh interpreters with the current settings module, as a
+    gunicorn worker or management command would, and reports median
+    timings, whether start-up touched the database and which heavy
+    libraries it imported.
+    """
+    import statistics
+    import subprocess
+    import sys
+
+    from django.conf import settings
+
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    cwd = settings.BASE_DIR
+
+    boots, checks = [], []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_PROBE], env=env, cwd=cwd,
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        boots.append(float(output[0]))
+        db_used, drf_loaded, requests_loaded = map(int, output[1:4])
+
+        with Timer() as timer:
+            subprocess.run([sys.executable, 'manage.py', 'check'], env=env, cwd=cwd,
+                           check=True, capture_output=True)
+        checks.append(timer.elapsed)
+
+    return {
+        'worker_boot_ms': round(statistics.median(boots) * 1000, 1),
+        'check_ms': round(statistics.median(checks) * 1000, 1),
+        'boot_opens_db_connection': bool(db_used),
+        'boot_imports_rest_framework': bool(drf_loaded),
+        'boot_imports_requests': bool(requests_loaded),
+    }
+
+
+@benchmark(
+    'connections',
+    help="Compare request latency with per-request and persistent database connections under concurrent load.",
+    arguments=[
+        (['--articles'], {'type': int, 'default': 10_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--threads'], {'type': int, 'default': 8}),
+        (['--requests'], {'type': int, 'default': 1_000,
+                          'help': "Requests per mode."}),
+        (['--connect-ms'], {'type': float, 'default': 2.0,
+                            'help': "Delay added to every new connection, standing in for the TCP "
+                                    "and authentication handshake of a networked database."}),
+    ],
+)
+def bench_connections(articles, db, threads, requests, connect_ms):
+    """
+    Sends GETs for an article page through Django's WSGI handler from a
+    pool of threads, as a threaded WSGI server would, once with
+    CONN_MAX_AGE = 0 and once with persistent connections, and reports
+    latency percentiles and connections opened per request.
+    """
+    import statistics
+    from concurrent.futures import ThreadPoolExecutor
+    from unittest import mock
+
+    from django.contrib.auth.models import Group
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+    from django.test import Client, RequestFactory, override_settings
+    from django.urls import reverse
+
+    from .models import Article, CustomUser, Publisher
+
+    opened = []
+    get_new_connection = DatabaseWrapper.get_new_connection
+
+    def connect(self, conn_params):
+        opened.append(1)
+        time.sleep(connect_ms / 1000)
+        return get_new_connection(self, conn_params)
+
+    results = {}
+    overrides = override_settings(
+        DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter'],
+        ALLOWED_HOSTS=['testserver'],
+    )
+    with bench_database(db) as alias, overrides:
+        ensure_article_fixture(alias, articles)
+        reader, created = CustomUser.objects.get_or_create(
+            username='bench_reader', defaults={'role': 'reader'})
+        if created:
+            reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+            reader.subscribed_publishers.add(*Publisher.objects.order_by('pk')[:3])
+        client = Client()
+        client.force_login(reader)
+        cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in client.cookies.items())
+        path = reverse('article_detail', args=[Article.objects.order_by('-pk').values_list('pk', flat=True)[0]])
+        handler = WSGIHandler()
+
+        def get(_):
+            environ = RequestFactory(HTTP_COOKIE=cookie).get(path).environ
+            with Timer() as timer:
+                response = handler(environ, lambda status, headers: None)
+                b''.join(response)
+                # Fires request_finished, which closes expired connections.
+                response.close()
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} answered {response.status_code}")
+            return timer.elapsed
+
+        with mock.patch.object(DatabaseWrapper, 'get_new_connection', connect):
+            for mode, max_age in (('per_request', 0), ('persistent', 600)):
+                connections.databases[alias].update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=bool(max_age))
+                opened.clear()
+                with ThreadPoolExecutor(threads) as pool:
+                    latencies = sorted(pool.map(get, range(requests)))
+                    # Each pool thread keeps its own connection; close them.
+                    pool.map(lambda _: connections.close_all(), range(threads))
+                results[f'{mode}_p50_ms'] = round(statistics.median(latencies) * 1000, 2)
+                results[f'{mode}_p95_ms'] = round(latencies[int(len(latencies) * 0.95)] * 1000, 2)
+                results[f'{mode}_connections_per_request'] = round(len(opened) / requests, 3)
+    return results
+
+
+@benchmark(
+    'audience',
+    help="Compare memory and time of resolving an article's email audience by loading users and by streaming values.",
+    arguments=[
+        (['--readers'], {'type': int, 'default': 200_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--chunk-size'], {'type': int, 'default': 500}),
+    ],
+)
+def bench_audience(readers, db, chunk_size):
+    """
+    Subscribes ``readers`` readers to one publisher and a tenth as many to
+    another, half of them also following the article's author, then
+    resolves each article's audience by loading user instances and through
+    newsapp.audience, reporting peak Python memory. A flat stream peaks at
+    the same size for both publishers.
+    """
+    import tracemalloc
+
+    from django.db.models import Q
+    from django.test import override_settings
+
+    from .audience import email_recipients
+    from .models import Article, CustomUser, Publisher
+
+    results = {}
+    with bench_database(db) as alias, override_settings(
+            DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter']):
+        ensure_article_fixture(alias, 10_000)
+        users = CustomUser.objects.filter(username__startswith='bench_audience_')
+        existing = users.count()
+        if existing < readers:
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench_audience_{i}', role='reader',
+                           email=f'bench_audience_{i}@example.com')
+                for i in range(existing, readers)
+            ], batch_size=5000)
+        reader_ids = list(users.order_by('pk').values_list('pk', flat=True)[:readers])
+        large, small = Publisher.objects.order_by('pk')[:2]
+        for publisher, count in ((large, readers), (small, readers // 10)):
+            article = Article.objects.filter(publisher=publisher).order_by('pk').first()
+            publisher_rows = CustomUser.subscribed_publishers.through
+            publisher_rows.objects.bulk_create([
+                publisher_rows(customuser_id=pk, publisher_id=publisher.pk) for pk in reader_ids[:count]
+            ], batch_size=5000, ignore_conflicts=True)
+            follower_rows = CustomUser.subscribed_journalists.through
+            follower_rows.objects.bulk_create([
+                follower_rows(from_customuser_id=pk, to_customuser_id=article.author_id)
+                for pk in reader_ids[:count:2]
+            ], batch_size=5000, ignore_conflicts=True)
+
+            def load_instances():
+                subscribed = CustomUser.objects.filter(
+                    Q(subscribed_publishers=article.publisher_id) | Q(subscribed_journalists=article.author_id),
+                    role='reader',
+                ).distinct()
+                return sum(1 for user in list(subscribed) if user.email)
+
+            def stream_values():
+                return sum(1 for _ in email_recipients(article, chunk_size=chunk_size))
+
+            for mode, resolve in (('instances', load_instances), ('stream', stream_values)):
+                tracemalloc.start()
+                with Timer() as timer:
+                    recipients = resolve()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results[f'{mode}_{count}_recipients'] = recipients
+                results[f'{mode}_{count}_seconds'] = round(timer.elapsed, 2)
+                results[f'{mode}_{count}_peak_mb'] = round(peak / 2 ** 20, 2)
+    return results
+
+
+@benchmark(
+    'digest',
+    help="Time sending daily digests in one process and in a process pool.",
+    arguments=[
+        (['--readers'], {'type': int, 'default': 100_000}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+        (['--processes'], {'type': int, 'default': os.cpu_count() or 1}),
+    ],
+)
+def bench_digest(readers, db, processes):
+    """
+    Sends a daily digest of the article fixture's last day to ``readers``
+    readers following three publishers each, through the dummy email
+    backend, once inline and once sharded over ``processes`` processes,
+    and reports readers mailed per second.
+    """
+    from datetime import timedelta
+
+    from django.test import override_settings
+
+    from .digest import send_digests
+    from .models import Article, CustomUser, DigestRun, Publisher
+
+    results = {}
+    overrides = override_settings(
+        DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter'],
+        EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend',
+    )
+    with bench_database(db) as alias, overrides:
+        ensure_article_fixture(alias, 10_000)
+        users = CustomUser.objects.filter(username__startswith='bench_digest_')
+        existing = users.count()
+        if existing < readers:
+            CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench_digest_{i}', role='reader', digest='daily',
+                           email=f'bench_digest_{i}@example.com')
+                for i in range(existing, readers)
+            ], batch_size=5000)
+            publisher_ids = list(Publisher.objects.order_by('pk').values_list('pk', flat=True))
+            through = CustomUser.subscribed_publishers.through
+            new_ids = users.order_by('pk').values_list('pk', flat=True)[existing:]
+            through.objects.bulk_create([
+                through(customuser_id=pk, publisher_id=publisher_ids[(pk + offset) % len(publisher_ids)])
+                for pk in new_ids for offset in (0, 3, 7)
+            ], batch_size=5000, ignore_conflicts=True)
+        # The fixture's articles are dated in the past; end the window
+        # just after the newest one.
+        end = Article.objects.order_by('-created_at').values_list('created_at', flat=True)[0]
+        end += timedelta(minutes=1)
+
+        for mode, workers in (('inline', 1), ('pool', processes)):
+            DigestRun.objects.filter(window_end=end).delete()
+            with Timer() as timer:
+                run, shards = send_digests('daily', end, processes=workers, shards=workers * 4)
+            sent = sum(shard['sent'] for shard in shards)
+            results[f'{mode}_processes'] = workers
+            results[f'{mode}_sent'] = sent
+            results[f'{mode}_seconds'] = round(timer.elapsed, 2)
+            results[f'{mode}_readers_per_second'] = round(sent / timer.elapsed)
+        DigestRun.objects.filter(window_end=end).delete()
+    return results
+
+
+@benchmark(
+    'social',
+    help="Time posting to a local stub of the X API with a new connection per post and pooled.",
+    arguments=[
+        (['--posts'], {'type': int, 'default': 200}),
+        (['--handshake-ms'], {'type': float, 'default': 20.0}),
+    ],
+)
+def bench_social(posts, handshake_ms):
+    """
+    Posts ``posts`` times to a local stub API that stalls every new
+    connection for ``handshake_ms`` (standing in for the TCP and TLS
+    handshakes with the real API), once with a bare ``requests.post`` per
+    post and once through a SocialClient, and reports milliseconds per post
+    and connections opened.
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import requests
+
+    from .social import SocialClient
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; without this, delayed
+        # ACKs stall every response on a kept-alive connection.
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            self.server.connections += 1
+            time.sleep(handshake_ms / 1000)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            payload = json.dumps({'data': {'id': '1'}}).encode()
+            self.send_response(201)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/2/tweets'
+    client = SocialClient('token', url)
+
+    def unpooled(text):
+        requests.post(url, json={'text': text}, headers={'Authorization': "Bearer token"},
+                      timeout=(3.05, 10)).raise_for_status()
+
+    results = {}
+    try:
+        for mode, post in (('unpooled', unpooled), ('pooled', client.post)):
+            server.connections = 0
+            with Timer() as timer:
+                for i in range(posts):
+                    post(f"Benchmark post {i}")
+            results[f'{mode}_ms_per_post'] = round(timer.elapsed * 1000 / posts, 2)
+            results[f'{mode}_connections'] = server.connections
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+@benchmark(
+    'review',
+    help="Time approving a morning's review queue one article at a time and in bulk.",
+    arguments=[
+        (['--articles'], {'type': int, 'default': 300}),
+        (['--db'], {'default': os.path.join('/tmp', 'newsapp_bench.sqlite3')}),
+    ],
+)
+def bench_review(articles, db):
+    """
+    Submits ``articles`` articles and approves them with one approve()
+    per article, as the old approve button did, then submits as many again
+    and approves them with one approve_many() call. Reports seconds and
+    queries for each. The benchmark's articles are deleted afterwards.
+    """
+    from django.db import connections
+    from django.test import override_settings
+
+    from .approval import approve, approve_many
+    from .models import Article, CustomUser, Publisher
+
+    results = {}
+    overrides = override_settings(
+        DATABASE_ROUTERS=['newsapp.benchmarks.BenchmarkRouter'],
+        NEWSAPP_DELIVERY={'WORKER': 'db'},
+    )
+    with bench_database(db) as alias, overrides:
+        ensure_article_fixture(alias, 10_000)
+        author = CustomUser.objects.filter(role='journalist').first()
+        publisher = Publisher.objects.first()
+
+        def submit():
+            Article.objects.bulk_create([
+                Article(title=f"Bench review {i}", content="Submitted for review.",
+                        author=author, publisher=publisher)
+                for i in range(articles)
+            ])
+            return list(Article.objects.filter(title__startswith='Bench review ', approved=False))
+
+        def one_by_one(pending):
+            for article in pending:
+                approve(article)
+
+        def in_bulk(pending):
+            approve_many([article.pk for article in pending])
+
+        try:
+            for mode, run in (('single', one_by_one), ('bulk', in_bulk)):
+                pending = submit()
+                with QueryCounter(connections[alias]) as queries, Timer() as timer:
+                    run(pending)
+                results[f'{mode}_seconds'] = round(timer.elapsed, 3)
+                results[f'{mode}_queries'] = queries.count
+                Article.objects.filter(title__startswith='Bench review ').delete()
+        finally:
+            Article.objects.filter(title__startswith='Bench review ').delete()
+    return results
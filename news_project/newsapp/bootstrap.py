@@ -0,0 +1,154 @@
+"""
+Role and permission bootstrapping.
+
+The Reader, Editor and Journalist groups and their permissions are set up
+once per database, after ``migrate``, by a ``post_migrate`` handler that
+NewsappConfig connects. Nothing here runs when a process starts, so
+workers and management commands boot without touching the database. A
+data migration would not do: on a fresh database Django creates model
+permissions in ``post_migrate`` too, after every migration has run.
+
+ROLE_PERMISSIONS declares each role's permissions. Bootstrapping compares
+it with the database and writes only the difference, in a fixed number of
+queries however many roles and permissions there are: one for the groups,
+one for the permissions, one for the current assignments, then at most
+one INSERT and one DELETE on the group-permission table. Running it again
+changes nothing; ``manage.py bootstrap_roles --dry-run`` shows what it
+would change.
+"""
+
+from collections import defaultdict
+
+from django.contrib.auth.models import Group, Permission
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+# Role -> the exact set of permissions its group has, as
+# 'app_label.codename'. Permissions granted to these groups by hand are
+# removed on the next bootstrap.
+ROLE_PERMISSIONS = {
+    'Reader': (),
+    'Editor': (
+        'newsapp.view_article', 'newsapp.change_article', 'newsapp.delete_article',
+        'newsapp.view_newsletter', 'newsapp.change_newsletter', 'newsapp.delete_newsletter',
+    ),
+    'Journalist': (
+        'newsapp.add_article', 'newsapp.change_article', 'newsapp.delete_article',
+        'newsapp.view_article', 'newsapp.can_publish_article',
+        'newsapp.add_newsletter', 'newsapp.change_newsletter', 'newsapp.delete_newsletter',
+        'newsapp.view_newsletter', 'newsapp.can_publish_newsletter',
+    ),
+}
+
+ROLES = tuple(ROLE_PERMISSIONS)
+
+
+class RoleChanges:
+    """
+    The difference between ROLE_PERMISSIONS and a database: groups to
+    create, permissions to grant and revoke per group (as
+    'app_label.codename'), and declared permissions that do not exist.
+    """
+
+    def __init__(self, created_groups, granted, revoked, missing):
+        self.created_groups = created_groups
+        self.granted = granted
+        self.revoked = revoked
+        self.missing = missing
+
+    def __bool__(self):
+        return bool(self.created_groups or self.granted or self.revoked)
+
+    def lines(self):
+        """
+        Returns the changes as human-readable lines, e.g. for a dry run.
+        """
+        lines = [f"+ group {name}" for name in self.created_groups]
+        for role in ROLES:
+            lines += [f"+ {role}: {name}" for name in self.granted.get(role, ())]
+            lines += [f"- {role}: {name}" for name in self.revoked.get(role, ())]
+        lines += [f"! missing permission {name}" for name in self.missing]
+        return lines
+
+
+def _load_permissions(using, names):
+    """
+    Returns ``{'app_label.codename': pk}`` for the existing permissions
+    among ``names``, in one query.
+    """
+    app_labels = {name.split('.', 1)[0] for name in names}
+    codenames = {name.split('.', 1)[1] for name in names}
+    rows = Permission.objects.using(using).filter(
+        content_type__app_label__in=app_labels, codename__in=codenames,
+    ).values_list('pk', 'content_type__app_label', 'codename')
+    found = {f'{app_label}.{codename}': pk for pk, app_label, codename in rows}
+    return {name: pk for name, pk in found.items() if name in names}
+
+
+def bootstrap_roles(using=DEFAULT_DB_ALIAS, dry_run=False):
+    """
+    Makes the role groups and their permissions match ROLE_PERMISSIONS,
+    writing only the difference. Returns the RoleChanges; with
+    ``dry_run`` nothing is written.
+    """
+    with transaction.atomic(using=using):
+        return _bootstrap_roles(using, dry_run)
+
+
+def _bootstrap_roles(using, dry_run):
+    groups = dict(Group.objects.using(using).filter(name__in=ROLES).values_list('name', 'pk'))
+    created_groups = [role for role in ROLES if role not in groups]
+    if created_groups and not dry_run:
+        Group.objects.using(using).bulk_create([Group(name=role) for role in created_groups])
+        groups.update(Group.objects.using(using).filter(
+            name__in=created_groups).values_list('name', 'pk'))
+
+    declared = {name for names in ROLE_PERMISSIONS.values() for name in names}
+    permission_ids = _load_permissions(using, declared)
+    permission_names = {pk: name for name, pk in permission_ids.items()}
+
+    # Current assignments: group id -> {permission id: through row id}.
+    through = Group.permissions.through
+    current = defaultdict(dict)
+    for row_id, group_id, permission_id in through.objects.using(using).filter(
+            group_id__in=groups.values()).values_list('pk', 'group_id', 'permission_id'):
+        current[group_id][permission_id] = row_id
+
+    granted, revoked, additions, removals = {}, {}, [], []
+    for role, names in ROLE_PERMISSIONS.items():
+        group_id = groups.get(role)
+        wanted = {permission_ids[name] for name in names if name in permission_ids}
+        have = current[group_id]
+        if wanted - have.keys():
+            granted[role] = sorted(permission_names[pk] for pk in wanted - have.keys())
+            additions += [through(group_id=group_id, permission_id=pk) for pk in wanted - have.keys()]
+        if have.keys() - wanted:
+            revoked[role] = have.keys() - wanted
+            removals += [have[pk] for pk in have.keys() - wanted]
+
+    if revoked:
+        # Permissions granted by hand are not among the declared ones;
+        # their names are only looked up when there are some.
+        rows = Permission.objects.using(using).filter(
+            pk__in=set().union(*revoked.values()),
+        ).values_list('pk', 'content_type__app_label', 'codename')
+        names = {pk: f'{app_label}.{codename}' for pk, app_label, codename in rows}
+        revoked = {role: sorted(names[pk] for pk in pks) for role, pks in revoked.items()}
+
+    if not dry_run:
+        if additions:
+            through.objects.using(using).bulk_create(additions)
+        if removals:
+            through.objects.using(using).filter(pk__in=removals).delete()
+
+    return RoleChanges(created_groups, granted, revoked, sorted(declared - permission_ids.keys()))
+
+
+def bootstrap_after_migrate(sender, using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    """
+    ``post_migrate`` handler running bootstrap_roles() on the migrated
+    database.
+    """
+    changes = bootstrap_roles(using)
+    if verbosity >= 2:
+        for line in changes.lines():
+            print(f"  {line}")
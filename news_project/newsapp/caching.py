@@ -0,0 +1,221 @@
+"""
+Rendered-fragment cache for article pages and reader listings.
+
+Fragments are kept in the default Django cache (locmem, file-based or
+Redis) under keys that embed the versions of the data they show. The
+``post_save``/``post_delete`` handlers in ``newsapp.signals`` bump those
+versions whenever an article, newsletter or publisher changes, so a
+stale fragment is never read again and simply expires. Writers bump once
+their transaction commits (bump_on_commit()): a request rendering between
+an earlier bump and the commit would still read the old rows and cache
+them under the new version.
+
+Versions are atomic cache counters rather than ``updated_at`` values:
+reading ``updated_at`` would cost the query the cache is there to save,
+and timestamps written by concurrent saves can go backwards.
+
+A miss is rendered by one request at a time (single flight); concurrent
+requests for the same fragment wait briefly for that result instead of
+all hitting the database. Hits, misses and waits are counted per
+fragment, see cache_stats().
+
+Async views use the ``a``-prefixed versions, which share keys, locks and
+counters with the sync ones.
+"""
+
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+DEFAULT_TIMEOUT = 300
+# Seconds a render may hold a fragment's lock, and how long (polling
+# every LOCK_POLL seconds) other requests wait for it before rendering
+# the fragment themselves.
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+
+FRAGMENTS = ('article', 'article_list', 'newsletter_list')
+STATS = ('hits', 'misses', 'waits')
+
+
+def fragment_timeout():
+    """
+    Returns how long rendered fragments are kept, in seconds. Zero or less
+    turns fragment caching off.
+    """
+    return getattr(settings, 'NEWSAPP_FRAGMENT_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _version_key(name):
+    return f"newsapp:version:{name}"
+
+
+def versions(*names):
+    """
+    Returns the current version of each named piece of data, e.g.
+    ``'articles'`` or ``'article:42'``.
+    """
+    keys = [_version_key(name) for name in names]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        # Start unknown versions at the current time in milliseconds so a
+        # version evicted from the cache never restarts at a number whose
+        # fragments may still be cached.
+        cache.add(key, int(time.time() * 1000), None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+async def aversions(*names):
+    """
+    Async version of versions().
+    """
+    keys = [_version_key(name) for name in names]
+    found = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        await cache.aadd(key, int(time.time() * 1000), None)
+    if missing:
+        found.update(await cache.aget_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def bump(*names):
+    """
+    Moves the named versions forward, invalidating every fragment that
+    depends on them.
+    """
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            versions(name)
+
+
+def bump_on_commit(*names, using=None):
+    """
+    Bumps the named versions once the current transaction on ``using``
+    commits, or straight away outside a transaction.
+    """
+    transaction.on_commit(lambda: bump(*names), using=using, robust=True)
+
+
+def _count(fragment, stat):
+    key = f"newsapp:fragment-stats:{fragment}:{stat}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def _fragment_key(fragment, parts):
+    return ':'.join(str(part) for part in ('newsapp:fragment', fragment, *parts))
+
+
+def cached_fragment(fragment, parts, render):
+    """
+    Returns the value ``render()`` produces for the fragment identified by
+    ``fragment`` and ``parts``, from the cache when possible. ``parts``
+    must include the versions the fragment depends on. Values must be
+    picklable and not None.
+    """
+    timeout = fragment_timeout()
+    if timeout <= 0:
+        return render()
+
+    key = _fragment_key(fragment, parts)
+    value = cache.get(key)
+    if value is not None:
+        _count(fragment, 'hits')
+        return value
+
+    lock = f"{key}:lock"
+    locked = cache.add(lock, 1, LOCK_TIMEOUT)
+    if not locked:
+        _count(fragment, 'waits')
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+
+    _count(fragment, 'misses')
+    try:
+        value = render()
+        cache.set(key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return value
+
+
+async def _acount(fragment, stat):
+    key = f"newsapp:fragment-stats:{fragment}:{stat}"
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+async def acached_fragment(fragment, parts, render):
+    """
+    Async version of cached_fragment(); ``render`` is a coroutine function.
+    Waiting for another render sleeps without blocking the event loop.
+    """
+    timeout = fragment_timeout()
+    if timeout <= 0:
+        return await render()
+
+    key = _fragment_key(fragment, parts)
+    value = await cache.aget(key)
+    if value is not None:
+        await _acount(fragment, 'hits')
+        return value
+
+    lock = f"{key}:lock"
+    locked = await cache.aadd(lock, 1, LOCK_TIMEOUT)
+    if not locked:
+        await _acount(fragment, 'waits')
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL)
+            value = await cache.aget(key)
+            if value is not None:
+                return value
+
+    await _acount(fragment, 'misses')
+    try:
+        value = await render()
+        await cache.aset(key, value, timeout)
+    finally:
+        if locked:
+            await cache.adelete(lock)
+    return value
+
+
+def cache_stats():
+    """
+    Returns hit, miss and wait counts and the hit ratio of each fragment.
+    """
+    counts = cache.get_many([
+        f"newsapp:fragment-stats:{fragment}:{stat}" for fragment in FRAGMENTS for stat in STATS
+    ])
+    stats = {}
+    for fragment in FRAGMENTS:
+        figures = {
+            stat: counts.get(f"newsapp:fragment-stats:{fragment}:{stat}", 0) for stat in STATS
+        }
+        lookups = figures['hits'] + figures['misses']
+        figures['hit_ratio'] = figures['hits'] / lookups if lookups else 0.0
+        stats[fragment] = figures
+    return stats
@@ -0,0 +1,93 @@
+"""
+HTTP conditional GET for the JSON API.
+
+Polling clients send back the ``ETag`` and ``Last-Modified`` of the last
+response they saw. ConditionalGetMixin lets a view describe its current
+state with a few cheap queries (aggregates, version counters) and answers
+``304 Not Modified`` from those alone, before any rows are loaded or
+serialized.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(version, request, format):
+    """
+    Returns the quoted ETag for a response described by ``version`` to
+    ``request`` rendered in ``format``.
+    """
+    raw = repr((version, request.get_full_path(), format))
+    return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+
+def patch_conditional_headers(response, etag, last_modified):
+    """
+    Adds the validators and caching headers to a 200 or 304 response.
+    ``last_modified`` is a Unix timestamp or None.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Responses depend on the user: let clients keep them but make
+    # them revalidate, and keep shared caches from mixing users.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+
+
+class ConditionalResponse(Exception):
+    """
+    Raised from ``initial()`` to short-circuit a view with a bodiless
+    response (304 Not Modified or 412 Precondition Failed).
+    """
+
+    def __init__(self, status_code):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for APIViews that adds ETag and Last-Modified headers and answers
+    ``If-None-Match``/``If-Modified-Since`` without running the view.
+
+    Views implement get_validators() returning ``(version, last_modified)``
+    or None to skip the check. ``version`` is any repr-able value that
+    changes whenever the response would; the ETag also covers the URL and
+    the negotiated format. ``last_modified`` is a datetime or None.
+    Validators are computed after authentication and permission checks.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            return
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return
+
+        version, last_modified = validators
+        self.etag = make_etag(version, request, request.accepted_renderer.format)
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            raise ConditionalResponse(response.status_code)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return Response(status=exc.status_code)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (200, 304):
+            patch_conditional_headers(response, etag, self.last_modified)
+        return response
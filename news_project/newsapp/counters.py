@@ -0,0 +1,187 @@
+"""
+Denormalised counters: subscribers and approved articles per publisher,
+followers per journalist.
+
+Pages and admin lists read the counter columns instead of counting the
+subscription tables and articles on every render. The columns are kept
+up to date from model signals with single ``UPDATE ... SET n = n + k``
+statements, so concurrent changes never overwrite each other, and
+``manage.py reconcile_counters`` recounts them periodically to repair
+drift from writes that bypass signals (``QuerySet.update()``, raw SQL,
+cascading deletes of the other side).
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import Article, CustomUser, Publisher
+
+BATCH_SIZE = 1_000
+
+PUBLISHER_SUBSCRIPTIONS = CustomUser.subscribed_publishers.through
+JOURNALIST_SUBSCRIPTIONS = CustomUser.subscribed_journalists.through
+
+
+def adjust(model, field, deltas):
+    """
+    Adds ``deltas[pk]`` to ``field`` of each ``model`` row, one UPDATE per
+    distinct delta. Counters never go below zero.
+    """
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, Value(0))}
+        )
+
+
+def subscriptions_changed(through, source, target, field, instance, action, reverse, pk_set):
+    """
+    Applies an ``m2m_changed`` signal of a subscription table to the
+    targets' ``field``. ``source`` and ``target`` name the through table's
+    reader and target columns.
+
+    Additions count ``pk_set``, which Django limits to the rows actually
+    inserted. Removals and clears look up the existing rows before they go,
+    as ``pk_set`` may name rows that never existed.
+    """
+    target_model = through._meta.get_field(target).related_model
+    deltas = {}
+    if action == 'post_add':
+        deltas = {instance.pk: len(pk_set)} if reverse else dict.fromkeys(pk_set, 1)
+    elif action == 'pre_remove':
+        if reverse:
+            removed = through.objects.filter(**{target: instance.pk, f'{source}__in': pk_set}).count()
+            deltas = {instance.pk: -removed}
+        else:
+            removed = through.objects.filter(**{source: instance.pk, f'{target}__in': pk_set})
+            deltas = dict.fromkeys(removed.values_list(target, flat=True), -1)
+    elif action == 'pre_clear':
+        if reverse:
+            target_model.objects.filter(pk=instance.pk).update(**{field: 0})
+        else:
+            removed = through.objects.filter(**{source: instance.pk})
+            deltas = dict.fromkeys(removed.values_list(target, flat=True), -1)
+    adjust(target_model, field, deltas)
+
+
+def _counted_publisher(state):
+    """
+    Returns the publisher whose article count includes an article in the
+    given ``{'approved': ..., 'publisher_id': ...}`` state, or None.
+    """
+    if state and state['approved']:
+        return state['publisher_id']
+    return None
+
+
+def load_article_state(article):
+    """
+    Makes sure the article knows its stored approval and publisher before
+    it is saved, reading them from the database when it was not loaded
+    with them.
+    """
+    if article.pk is None or article.loaded_state() is not None:
+        return
+    stored = Article.objects.filter(pk=article.pk).values('approved', 'publisher_id').first()
+    article._loaded_state = stored or {'approved': False, 'publisher_id': None}
+
+
+def article_saved(article, created):
+    """
+    Moves the article between publishers' article counts when its
+    approval or publisher changed.
+    """
+    before = None if created else _counted_publisher(article.loaded_state())
+    after = article.publisher_id if article.approved else None
+    if before != after:
+        adjust(Publisher, 'article_count', {before: -1, after: 1})
+    article.remember_state()
+
+
+def article_deleted(article):
+    """
+    Takes a deleted approved article out of its publisher's count.
+    """
+    if article.approved:
+        adjust(Publisher, 'article_count', {article.publisher_id: -1})
+
+
+def user_deleted(user):
+    """
+    Takes a user about to be deleted out of the counts of the publishers
+    and journalists they follow. Their subscription rows go in a cascade
+    that sends no ``m2m_changed`` signals.
+    """
+    publisher_ids = PUBLISHER_SUBSCRIPTIONS.objects.filter(
+        customuser_id=user.pk).values_list('publisher_id', flat=True)
+    adjust(Publisher, 'subscriber_count', dict.fromkeys(publisher_ids, -1))
+    journalist_ids = JOURNALIST_SUBSCRIPTIONS.objects.filter(
+        from_customuser_id=user.pk).values_list('to_customuser_id', flat=True)
+    adjust(CustomUser, 'follower_count', dict.fromkeys(journalist_ids, -1))
+
+
+def _recount(queryset, field, counts, batch_size, dry_run):
+    """
+    Compares ``field`` of the rows in ``queryset`` with ``counts(pks)``, a
+    function returning ``{pk: actual}`` for a batch of pks, and fixes the
+    rows that drifted. Each batch is locked while it is compared so
+    concurrent increments are not lost. Returns the number of rows fixed.
+    """
+    fixed = 0
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        with transaction.atomic():
+            stored = dict(queryset.model.objects.select_for_update().filter(
+                pk__in=batch).values_list('pk', field))
+            actual = counts(batch)
+            drifted = defaultdict(list)
+            for pk, value in stored.items():
+                if value != actual.get(pk, 0):
+                    drifted[actual.get(pk, 0)].append(pk)
+            if not dry_run:
+                for value, drifted_pks in drifted.items():
+                    queryset.model.objects.filter(pk__in=drifted_pks).update(**{field: value})
+        fixed += sum(map(len, drifted.values()))
+    return fixed
+
+
+def _grouped_counts(queryset, column):
+    return dict(queryset.values(column).annotate(n=Count('*')).values_list(column, 'n'))
+
+
+def reconcile(batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Recounts every counter from the source tables and corrects the ones
+    that drifted. Returns ``{counter: rows fixed}``; with ``dry_run`` the
+    rows are only counted.
+    """
+    return {
+        'publisher subscribers': _recount(
+            Publisher.objects.all(), 'subscriber_count',
+            lambda pks: _grouped_counts(
+                PUBLISHER_SUBSCRIPTIONS.objects.filter(publisher_id__in=pks), 'publisher_id'),
+            batch_size, dry_run,
+        ),
+        'publisher articles': _recount(
+            Publisher.objects.all(), 'article_count',
+            lambda pks: _grouped_counts(
+                Article.objects.filter(approved=True, publisher_id__in=pks), 'publisher_id'),
+            batch_size, dry_run,
+        ),
+        # Only journalists are followed, but a stale count may linger on a
+        # user whose role changed.
+        'journalist followers': _recount(
+            CustomUser.objects.filter(Q(role='journalist') | Q(follower_count__gt=0)),
+            'follower_count',
+            lambda pks: _grouped_counts(
+                JOURNALIST_SUBSCRIPTIONS.objects.filter(to_customuser_id__in=pks), 'to_customuser_id'),
+            batch_size, dry_run,
+        ),
+    }
@@ -0,0 +1,512 @@
+"""
+Background delivery queue for article publish events.
+
+Approving an article only records a PublishEvent and one DeliveryJob per
+channel, once per approval (see ``newsapp.approval``); the slow work
+(filling reader feeds, emailing subscribers, posting to X) is done later
+by delivery workers. Workers can run:
+
+- out of process, via ``python manage.py run_delivery_workers``, or
+- in process, in a daemon thread started on demand when
+  ``NEWSAPP_DELIVERY['WORKER']`` is set to ``'inprocess'``.
+
+Failed jobs are retried with exponential backoff and jitter, and each
+channel has its own concurrency limit.
+"""
+
+import logging
+import random
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, F, Min
+from django.utils import timezone
+
+from . import social
+from .audience import email_recipients
+from .feed import fan_out_article
+from .mailer import MassMailer
+from .models import DeliveryChannel, DeliveryJob, PublishEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_SETTINGS = {
+    # 'db' leaves jobs for run_delivery_workers, 'inprocess' drains them
+    # from a daemon thread inside the web process.
+    'WORKER': 'db',
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 3600,
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL': 1.0,
+    'CONCURRENCY': {
+        'feed': 2,
+        'email': 2,
+        'social': 1,
+    },
+}
+
+
+def delivery_setting(name):
+    """
+    Returns a delivery setting, falling back to DEFAULT_DELIVERY_SETTINGS.
+    """
+    configured = getattr(settings, 'NEWSAPP_DELIVERY', {})
+    return configured.get(name, DEFAULT_DELIVERY_SETTINGS[name])
+
+
+def channel_concurrency(channel):
+    """
+    Returns the maximum number of jobs that may run at once for a channel.
+    """
+    limits = dict(DEFAULT_DELIVERY_SETTINGS['CONCURRENCY'])
+    limits.update(delivery_setting('CONCURRENCY'))
+    return max(1, int(limits.get(channel, 1)))
+
+
+class RetryLater(Exception):
+    """
+    Raised by a channel handler when its job cannot run yet, e.g. because
+    the remote service is rate limiting or down. The job is rescheduled
+    ``delay`` seconds later without counting as a failed attempt.
+    """
+
+    def __init__(self, message, delay):
+        super().__init__(message)
+        self.delay = delay
+
+
+class PermanentFailure(Exception):
+    """
+    Raised by a channel handler when its job failed in a way retrying will
+    not fix, e.g. the remote service rejected the request. The job is
+    marked failed straight away.
+    """
+
+
+class LeaseExpired(Exception):
+    """
+    Raised when a running job finds its lease was taken away, i.e. it was
+    requeued (and maybe claimed again) by another worker. The run stops
+    without recording anything, so it cannot undo the newer run's work.
+    """
+
+
+# Channel handlers
+
+def deliver_email(job):
+    """
+    Emails every subscriber of the job's article publisher or author, one
+    personalised message each, resuming after ``job.cursor`` on retries.
+    """
+    article = job.event.article
+    subject = f"New Article Published: {article.title}"
+
+    def render(recipient):
+        return subject, f"Hi {recipient.name},\n\n{article.title}\n\n{article.content}"
+
+    def checkpoint(cursor):
+        # Every checkpoint renews the lease too, so a long send is not taken
+        # for a dead worker and handed to another one mid-run.
+        renewed = timezone.now()
+        if not leased(job).update(cursor=cursor, started_at=renewed):
+            raise LeaseExpired(f"lease lost after recipient {job.cursor}")
+        job.cursor, job.started_at = cursor, renewed
+
+    mailer = MassMailer()
+    report = mailer.send(
+        email_recipients(article, job.cursor, mailer.chunk_size),
+        render,
+        cursor=job.cursor,
+        checkpoint=checkpoint,
+    )
+    job.metrics = report.as_dict()
+
+
+def deliver_social(job):
+    """
+    Posts the job's article to X (formerly Twitter) if a bearer token is
+    configured, through the process's SocialClient. A post X rejects fails
+    the job for good; while X is unavailable the job is put back without
+    using up an attempt, and a post that kept failing is retried with the
+    usual backoff.
+    """
+    client = social.get_client()
+    if client is None:
+        return
+
+    article = job.event.article
+    metrics = Counter()
+    try:
+        client.post(f"New article published: {article.title} by {article.author.username}",
+                    metrics=metrics)
+    except social.Unavailable as exc:
+        raise RetryLater(str(exc), exc.retry_after) from exc
+    except social.Rejected as exc:
+        raise PermanentFailure(str(exc)) from exc
+    finally:
+        job.metrics = dict(metrics)
+
+
+def deliver_feed(job):
+    """
+    Copies the job's article into the precomputed feed of every subscriber.
+    """
+    job.metrics = {'entries': fan_out_article(job.event.article)}
+
+
+CHANNEL_HANDLERS = {
+    'feed': deliver_feed,
+    'email': deliver_email,
+    'social': deliver_social,
+}
+
+
+# Producer side
+
+def enqueue_publish_event(article, idempotency_key=None):
+    """
+    Records a publish event for an approved article and queues one delivery
+    job per channel. An event with the same ``idempotency_key`` is reused
+    and nothing new is queued. Returns ``(event, created)``.
+    """
+    with transaction.atomic():
+        if idempotency_key is None:
+            event, created = PublishEvent.objects.create(article=article), True
+        else:
+            event, created = PublishEvent.objects.get_or_create(
+                idempotency_key=idempotency_key, defaults={'article': article},
+            )
+        if created:
+            DeliveryJob.objects.bulk_create([
+                DeliveryJob(event=event, channel=channel)
+                for channel in CHANNEL_HANDLERS
+            ])
+
+    if created and delivery_setting('WORKER') == 'inprocess':
+        transaction.on_commit(start_inprocess_worker)
+    return event, created
+
+
+def enqueue_publish_events(idempotency_keys):
+    """
+    Bulk version of enqueue_publish_event() for ``{article_id: key}``:
+    records the events whose keys are new and their delivery jobs with one
+    INSERT each. Returns the article ids that got a new event.
+    """
+    with transaction.atomic():
+        existing = set(PublishEvent.objects.filter(
+            idempotency_key__in=idempotency_keys.values(),
+        ).values_list('idempotency_key', flat=True))
+        new = {pk: key for pk, key in idempotency_keys.items() if key not in existing}
+        if not new:
+            return []
+        PublishEvent.objects.bulk_create([
+            PublishEvent(article_id=pk, idempotency_key=key) for pk, key in new.items()
+        ])
+        # Not every backend returns primary keys from a bulk INSERT.
+        event_ids = PublishEvent.objects.filter(
+            idempotency_key__in=new.values(),
+        ).values_list('pk', flat=True)
+        DeliveryJob.objects.bulk_create([
+            DeliveryJob(event_id=event_id, channel=channel)
+            for event_id in event_ids for channel in CHANNEL_HANDLERS
+        ])
+
+    if delivery_setting('WORKER') == 'inprocess':
+        transaction.on_commit(start_inprocess_worker)
+    return list(new)
+
+
+# Consumer side
+
+def backoff_delay(attempts):
+    """
+    Returns the retry delay in seconds after the given number of failed
+    attempts: exponential growth, capped, with full jitter.
+    """
+    base = delivery_setting('BACKOFF_BASE')
+    ceiling = min(delivery_setting('BACKOFF_MAX'), base * (2 ** max(attempts - 1, 0)))
+    return random.uniform(base / 2, max(ceiling, base / 2))
+
+
+def leased(job):
+    """
+    Returns a queryset matching ``job`` only while the current run still
+    holds its lease: the job is running and was last claimed or renewed at
+    ``job.started_at``.
+    """
+    return DeliveryJob.objects.filter(
+        pk=job.pk,
+        status=DeliveryJob.STATUS_RUNNING,
+        started_at=job.started_at,
+    )
+
+
+def requeue_expired_jobs():
+    """
+    Puts jobs whose worker died mid-run (lease expired) back in the queue.
+    Handlers doing long work renew the lease as they go. Returns the number
+    of jobs requeued.
+    """
+    expired = timezone.now() - timedelta(seconds=delivery_setting('LEASE_SECONDS'))
+    return DeliveryJob.objects.filter(
+        status=DeliveryJob.STATUS_RUNNING,
+        started_at__lt=expired,
+    ).update(status=DeliveryJob.STATUS_PENDING, started_at=None)
+
+
+def claim_jobs(channel, limit=None):
+    """
+    Atomically claims up to ``limit`` due jobs for a channel, never exceeding
+    the channel's concurrency limit across all workers. Returns the claimed
+    jobs, already marked as running.
+    """
+    with transaction.atomic():
+        # Claims for a channel take turns on its DeliveryChannel row, so no
+        # other claim can add running jobs until this one commits. Only the
+        # jobs actually claimed are read and locked, however long the
+        # backlog is.
+        DeliveryChannel.objects.select_for_update().get_or_create(name=channel)
+        running = DeliveryJob.objects.filter(
+            channel=channel,
+            status=DeliveryJob.STATUS_RUNNING,
+        ).count()
+        slots = channel_concurrency(channel) - running
+        if limit is not None:
+            slots = min(slots, limit)
+        if slots <= 0:
+            return []
+
+        now = timezone.now()
+        due = DeliveryJob.objects.filter(
+            channel=channel,
+            status=DeliveryJob.STATUS_PENDING,
+            available_at__lte=now,
+        ).order_by('available_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+
+        jobs = list(due[:slots])
+        if not jobs:
+            return []
+
+        DeliveryJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=DeliveryJob.STATUS_RUNNING,
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        for job in jobs:
+            job.status = DeliveryJob.STATUS_RUNNING
+            job.started_at = now
+            job.attempts += 1
+    return jobs
+
+
+def run_job(job):
+    """
+    Runs a claimed job through its channel handler and records the outcome,
+    scheduling a retry with backoff on failure. Nothing is recorded if the
+    job's lease expired while it ran.
+    """
+    handler = CHANNEL_HANDLERS[job.channel]
+    try:
+        job.event = PublishEvent.objects.select_related(
+            'article__author', 'article__publisher'
+        ).get(pk=job.event_id)
+        handler(job)
+    except LeaseExpired as exc:
+        logger.warning("Delivery job %s (%s) stopped: %s", job.pk, job.channel, exc)
+        return job
+    except RetryLater as exc:
+        logger.info("Delivery job %s (%s) deferred for %.0fs: %s",
+                    job.pk, job.channel, exc.delay, exc)
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        job.status = DeliveryJob.STATUS_PENDING
+        job.available_at = timezone.now() + timedelta(seconds=exc.delay + random.uniform(0, 1))
+        job.attempts -= 1
+    except PermanentFailure as exc:
+        logger.warning("Delivery job %s (%s) failed for good on attempt %s: %s",
+                       job.pk, job.channel, job.attempts, exc)
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        job.status = DeliveryJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+    except Exception as exc:
+        logger.warning("Delivery job %s (%s) failed on attempt %s: %s",
+                       job.pk, job.channel, job.attempts, exc)
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        if job.attempts >= delivery_setting('MAX_ATTEMPTS'):
+            job.status = DeliveryJob.STATUS_FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = DeliveryJob.STATUS_PENDING
+            job.available_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+    else:
+        job.status = DeliveryJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.last_error = ''
+    # Only record the outcome while this run still holds the lease; if
+    # the job was requeued meanwhile, the newer run owns its state.
+    job.updated_at = timezone.now()
+    fields = ['status', 'attempts', 'available_at', 'finished_at', 'last_error',
+              'cursor', 'metrics', 'updated_at']
+    if not leased(job).update(**{name: getattr(job, name) for name in fields}):
+        logger.warning("Delivery job %s (%s) lost its lease; outcome %s not recorded",
+                       job.pk, job.channel, job.status)
+    return job
+
+
+def run_pending(channels=None):
+    """
+    Claims and runs every currently due job in the calling thread, one
+    channel at a time. Returns the number of jobs processed.
+    """
+    processed = 0
+    for channel in channels or CHANNEL_HANDLERS:
+        while True:
+            jobs = claim_jobs(channel)
+            if not jobs:
+                break
+            for job in jobs:
+                run_job(job)
+                processed += 1
+    return processed
+
+
+def _run_job_in_thread(job):
+    """
+    Runs a job from a worker pool thread, keeping the thread's DB connection
+    healthy between jobs.
+    """
+    close_old_connections()
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+class DeliveryWorker:
+    """
+    Polls the queue and runs jobs on one thread pool per channel, sized to
+    the channel's concurrency limit.
+    """
+
+    def __init__(self, channels=None, poll_interval=None):
+        self.channels = list(channels or CHANNEL_HANDLERS)
+        self.poll_interval = poll_interval or delivery_setting('POLL_INTERVAL')
+        self.pools = {
+            channel: ThreadPoolExecutor(
+                max_workers=channel_concurrency(channel),
+                thread_name_prefix=f"delivery-{channel}",
+            )
+            for channel in self.channels
+        }
+        self.in_flight = {channel: set() for channel in self.channels}
+        self._stop = threading.Event()
+
+    def stop(self):
+        """
+        Asks the worker loop to exit after the current poll.
+        """
+        self._stop.set()
+
+    def poll(self):
+        """
+        Claims as many jobs as each channel has free local slots and submits
+        them to that channel's pool. Returns the number of jobs submitted.
+        """
+        submitted = 0
+        requeue_expired_jobs()
+        for channel in self.channels:
+            in_flight = self.in_flight[channel]
+            in_flight.difference_update({f for f in in_flight if f.done()})
+            free = channel_concurrency(channel) - len(in_flight)
+            if free <= 0:
+                continue
+            for job in claim_jobs(channel, limit=free):
+                in_flight.add(self.pools[channel].submit(_run_job_in_thread, job))
+                submitted += 1
+        return submitted
+
+    def run(self, idle_exit=False):
+        """
+        Runs the poll loop until stopped. With ``idle_exit`` the loop returns
+        once the queue is empty and nothing is in flight.
+        """
+        try:
+            while not self._stop.is_set():
+                submitted = self.poll()
+                busy = any(self.in_flight[channel] for channel in self.channels)
+                if idle_exit and not submitted and not busy:
+                    break
+                if not submitted:
+                    self._stop.wait(self.poll_interval)
+        finally:
+            for pool in self.pools.values():
+                pool.shutdown(wait=True)
+            close_old_connections()
+
+
+_inprocess_worker = None
+_inprocess_lock = threading.Lock()
+
+
+def start_inprocess_worker():
+    """
+    Starts a daemon thread that drains the queue inside the current process.
+    The thread exits when the queue is idle and is restarted on the next
+    enqueue.
+    """
+    global _inprocess_worker
+    with _inprocess_lock:
+        if _inprocess_worker is not None and _inprocess_worker.is_alive():
+            return _inprocess_worker
+        worker = DeliveryWorker()
+        _inprocess_worker = threading.Thread(
+            target=worker.run,
+            kwargs={'idle_exit': True},
+            name='delivery-inprocess',
+            daemon=True,
+        )
+        _inprocess_worker.start()
+        return _inprocess_worker
+
+
+# Monitoring
+
+def queue_stats(recent=timedelta(hours=1)):
+    """
+    Returns per-channel queue depth and latency figures:
+
+    - pending / running / failed job counts,
+    - ``oldest_pending_seconds``: how long the oldest due job has waited,
+    - ``avg_latency_seconds``: mean enqueue-to-finish time of jobs
+      completed within ``recent``.
+    """
+    now = timezone.now()
+    stats = {}
+    for channel in CHANNEL_HANDLERS:
+        jobs = DeliveryJob.objects.filter(channel=channel)
+        counts = {
+            status: jobs.filter(status=status).count()
+            for status in (DeliveryJob.STATUS_PENDING,
+                           DeliveryJob.STATUS_RUNNING,
+                           DeliveryJob.STATUS_FAILED)
+        }
+        oldest = jobs.filter(status=DeliveryJob.STATUS_PENDING).aggregate(
+            oldest=Min('created_at')
+        )['oldest']
+        avg_latency = jobs.filter(
+            status=DeliveryJob.STATUS_DONE,
+            finished_at__gte=now - recent,
+        ).aggregate(latency=Avg(F('finished_at') - F('created_at')))['latency']
+        stats[channel] = {
+            **counts,
+            'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+            'avg_latency_seconds': avg_latency.total_seconds() if avg_latency else 0.0,
+        }
+    return stats
@@ -0,0 +1,319 @@
+"""
+Daily and weekly digests.
+
+Readers who chose a digest (``CustomUser.digest``) get one email per day
+or week listing the approved articles and the newsletters published in
+that window by the publishers and journalists they follow, instead of an
+email per article. Digests are sent by ``manage.py send_digests``.
+
+A mailing is a DigestRun for one period and window, split into DigestShard
+ranges of reader ids that are sent independently, in a pool of worker
+processes. Each shard walks its readers in keyset batches, loading their
+subscriptions for the whole batch in two queries, and checkpoints the id
+of the last reader mailed after every mail chunk. A crashed run is resumed
+by running the same window again: finished shards are skipped and the
+others pick up after their cursor. At most the chunk in flight when a run
+died is sent twice.
+
+The window's articles and newsletters are loaded once per process, and
+each one is rendered once. So is each combination of followed sources: a
+reader's digest only fills their name and that listing into the cached
+digest template.
+"""
+
+import heapq
+import logging
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.template.loader import get_template, render_to_string
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .mailer import MailReport, MassMailer, Recipient
+from .models import Article, CustomUser, DigestRun, DigestShard, Newsletter, PublishEvent
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {
+    CustomUser.DIGEST_DAILY: ('day', timedelta(days=1)),
+    CustomUser.DIGEST_WEEKLY: ('week', timedelta(days=7)),
+}
+DEFAULT_BATCH_SIZE = 1_000
+DEFAULT_MAX_ITEMS = 50
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistSubscription = CustomUser.subscribed_journalists.through
+
+# A rendered article or newsletter; items sort newest first on
+# ``(created_at, kind, pk)``.
+DigestItem = namedtuple('DigestItem', ['created_at', 'kind', 'pk', 'text'])
+
+
+def max_items():
+    """
+    Returns the number of items listed in one digest; the rest are counted.
+    """
+    return getattr(settings, 'NEWSAPP_DIGEST_MAX_ITEMS', DEFAULT_MAX_ITEMS)
+
+
+def window(period, end=None):
+    """
+    Returns the ``(start, end)`` of the period's window ending at ``end``,
+    by default at the most recent local midnight.
+    """
+    if end is None:
+        end = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return end - PERIODS[period][1], end
+
+
+def digest_readers(period):
+    """
+    Returns a queryset of the readers with an email address who get the
+    period's digest.
+    """
+    return CustomUser.objects.filter(role='reader', digest=period).exclude(email='')
+
+
+class DigestContent:
+    """
+    The articles and newsletters published in a window, rendered once and
+    grouped by publisher and by author.
+
+    Readers following the same sources get the same listing, so listings
+    are rendered once per combination of sources, up to
+    ``MAX_LISTINGS`` combinations.
+    """
+
+    MAX_LISTINGS = 10_000
+
+    def __init__(self, start, end, limit=None):
+        self.limit = limit or max_items()
+        self.by_publisher = defaultdict(list)
+        self.by_author = defaultdict(list)
+        self._listings = {}
+        announced = PublishEvent.objects.filter(
+            article=OuterRef('pk'), created_at__gte=start, created_at__lt=end,
+        )
+        articles = Article.objects.filter(approved=True).filter(
+            Q(created_at__gte=start, created_at__lt=end) | Exists(announced),
+        ).select_related('author', 'publisher').only(
+            'title', 'summary', 'content', 'created_at', 'author__username', 'publisher__name',
+        )
+        newsletters = Newsletter.objects.filter(
+            created_at__gte=start, created_at__lt=end,
+        ).select_related('author', 'publisher').only(
+            'title', 'content', 'created_at', 'author__username', 'publisher__name',
+        )
+        for kind, queryset in (('article', articles), ('newsletter', newsletters)):
+            for obj in queryset.iterator(chunk_size=DEFAULT_BATCH_SIZE):
+                text = render_to_string('newsapp/email/digest_item.txt', {
+                    'kind': kind,
+                    'title': obj.title,
+                    'summary': getattr(obj, 'summary', None) or Truncator(obj.content).words(30),
+                    'publisher': obj.publisher.name,
+                    'author': obj.author.username,
+                }).strip()
+                item = DigestItem(obj.created_at, kind, obj.pk, text)
+                self.by_publisher[obj.publisher_id].append(item)
+                self.by_author[obj.author_id].append(item)
+        for items in (*self.by_publisher.values(), *self.by_author.values()):
+            items.sort(reverse=True)
+
+    def __bool__(self):
+        return bool(self.by_publisher)
+
+    def items_for(self, publisher_ids, journalist_ids):
+        """
+        Returns ``(items, total)``: the newest ``limit`` items from the
+        given publishers and journalists, each once, and how many there are
+        in all.
+        """
+        sources = [self.by_publisher[pk] for pk in publisher_ids if pk in self.by_publisher]
+        sources += [self.by_author[pk] for pk in journalist_ids if pk in self.by_author]
+        if not sources:
+            return [], 0
+        items, seen = [], set()
+        for item in heapq.merge(*sources, reverse=True):
+            if (item.kind, item.pk) not in seen:
+                seen.add((item.kind, item.pk))
+                items.append(item)
+                if len(items) == self.limit:
+                    break
+        total = len(set().union(*[((item.kind, item.pk) for item in source) for source in sources]))
+        return items, total
+
+    def listing(self, publisher_ids, journalist_ids):
+        """
+        Returns ``(text, total)``: the rendered items_for() the given
+        sources, and how many items there are in all.
+        """
+        key = (frozenset(publisher_ids), frozenset(journalist_ids))
+        listing = self._listings.get(key)
+        if listing is None:
+            items, total = self.items_for(publisher_ids, journalist_ids)
+            listing = ''.join(f'{item.text}\n\n' for item in items), total
+            if len(self._listings) >= self.MAX_LISTINGS:
+                self._listings.clear()
+            self._listings[key] = listing
+        return listing
+
+
+def start_run(period, end=None, shards=1):
+    """
+    Returns the DigestRun of the period's window ending at ``end``,
+    creating it with up to ``shards`` equal id ranges of the period's
+    readers if it does not exist yet.
+    """
+    start, end = window(period, end)
+    with transaction.atomic():
+        run, created = DigestRun.objects.get_or_create(
+            period=period, window_end=end, defaults={'window_start': start},
+        )
+        if created:
+            ids = digest_readers(period).order_by('pk').values_list('pk', flat=True)
+            first, last = ids.first(), ids.last()
+            if first is not None:
+                step = -(-(last - first + 1) // max(1, shards))
+                DigestShard.objects.bulk_create([
+                    DigestShard(run=run, first_id=low, last_id=min(low + step - 1, last))
+                    for low in range(first, last + 1, step)
+                ])
+    return run
+
+
+def reader_batches(period, first_id, last_id, after=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yields lists of ``(Recipient, publisher_ids, journalist_ids)`` for the
+    period's readers with ids in ``(after, last_id]``, in id order, three
+    queries per batch.
+    """
+    last_seen = max(first_id - 1, after or 0)
+    readers = digest_readers(period).filter(pk__lte=last_id).order_by('pk')
+    while True:
+        rows = list(readers.filter(pk__gt=last_seen).values_list('pk', 'email', 'username')[:batch_size])
+        if not rows:
+            return
+        ids = [row[0] for row in rows]
+        publishers, journalists = defaultdict(list), defaultdict(list)
+        for reader_id, publisher_id in PublisherSubscription.objects.filter(
+                customuser_id__in=ids).values_list('customuser_id', 'publisher_id'):
+            publishers[reader_id].append(publisher_id)
+        for reader_id, journalist_id in JournalistSubscription.objects.filter(
+                from_customuser_id__in=ids).values_list('from_customuser_id', 'to_customuser_id'):
+            journalists[reader_id].append(journalist_id)
+        yield [(Recipient(*row), publishers[row[0]], journalists[row[0]]) for row in rows]
+        last_seen = ids[-1]
+
+
+# The content of the run a pool worker is sending, loaded by its first
+# shard and reused by the rest.
+_worker_content = {}
+
+
+def _send_shard_in_worker(shard_id, batch_size):
+    shard = DigestShard.objects.select_related('run').get(pk=shard_id)
+    run = shard.run
+    if run.pk not in _worker_content:
+        _worker_content.clear()
+        _worker_content[run.pk] = DigestContent(run.window_start, run.window_end)
+    return send_shard(shard_id, batch_size, content=_worker_content[run.pk])
+
+
+def send_shard(shard_id, batch_size=DEFAULT_BATCH_SIZE, content=None, connection=None):
+    """
+    Sends the digests of one shard, resuming after its cursor, and returns
+    ``{'shard': ..., 'status': ..., 'sent': ..., 'failed': ...}``.
+    ``content`` is the run's DigestContent, loaded if not given. Errors are
+    recorded on the shard, which a later run resumes.
+    """
+    shard = DigestShard.objects.select_related('run').get(pk=shard_id)
+    run = shard.run
+    DigestShard.objects.filter(pk=shard.pk).update(
+        status=DigestShard.STATUS_RUNNING, started_at=timezone.now(), last_error='',
+    )
+    template = get_template('newsapp/email/digest.txt')
+    period_name = PERIODS[run.period][0]
+    digests = {}
+
+    def recipients():
+        nonlocal content
+        content = content or DigestContent(run.window_start, run.window_end)
+        if not content:
+            return
+        for batch in reader_batches(run.period, shard.first_id, shard.last_id, shard.cursor, batch_size):
+            for recipient, publisher_ids, journalist_ids in batch:
+                text, total = content.listing(publisher_ids, journalist_ids)
+                if total:
+                    digests[recipient.id] = (text, total)
+                    yield recipient
+
+    def render(recipient):
+        text, total = digests.pop(recipient.id)
+        body = template.render({
+            'name': recipient.name,
+            'period': period_name,
+            'window_end': run.window_end,
+            'listing': text,
+            'more': max(0, total - content.limit),
+        })
+        return f"Your {run.get_period_display().lower()}: {total} new", body
+
+    report = MailReport(shard.cursor)
+
+    def checkpoint(cursor):
+        DigestShard.objects.filter(pk=shard.pk).update(
+            cursor=cursor, sent=shard.sent + report.sent, failed=shard.failed + report.failed,
+        )
+
+    status = DigestShard.STATUS_DONE
+    try:
+        MassMailer(connection=connection).send(
+            recipients(), render, cursor=shard.cursor, checkpoint=checkpoint, report=report,
+        )
+    except Exception as exc:
+        logger.exception("Digest shard %s failed after reader %s", shard.pk, report.cursor)
+        status = DigestShard.STATUS_FAILED
+        DigestShard.objects.filter(pk=shard.pk).update(last_error=f"{type(exc).__name__}: {exc}")
+    DigestShard.objects.filter(pk=shard.pk).update(
+        status=status, cursor=report.cursor,
+        sent=shard.sent + report.sent, failed=shard.failed + report.failed,
+        finished_at=timezone.now() if status == DigestShard.STATUS_DONE else None,
+    )
+    return {'shard': shard.pk, 'status': status,
+            'sent': shard.sent + report.sent, 'failed': shard.failed + report.failed}
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def send_digests(period, end=None, processes=1, shards=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Sends the period's digests for the window ending at ``end``, resuming
+    the window's run if it was started before, and returns
+    ``(run, results)`` with send_shard()'s result for every shard sent.
+    With more than one process, shards are sent from a process pool.
+    Only one mailing of a period should run at a time.
+    """
+    run = start_run(period, end, shards or processes * 4)
+    shard_ids = list(run.shards.exclude(status=DigestShard.STATUS_DONE)
+                     .order_by('first_id').values_list('pk', flat=True))
+    if processes > 1 and len(shard_ids) > 1:
+        # Forked workers must not share the parent's database sockets.
+        connections.close_all()
+        with ProcessPoolExecutor(min(processes, len(shard_ids)), initializer=_init_worker) as pool:
+            results = list(pool.map(_send_shard_in_worker, shard_ids, [batch_size] * len(shard_ids)))
+    else:
+        content = DigestContent(run.window_start, run.window_end) if shard_ids else None
+        results = [send_shard(shard_id, batch_size, content) for shard_id in shard_ids]
+    if not run.shards.exclude(status=DigestShard.STATUS_DONE).exists():
+        DigestRun.objects.filter(pk=run.pk, finished_at__isnull=True).update(finished_at=timezone.now())
+        run.refresh_from_db()
+    return run, results
@@ -0,0 +1,438 @@
+"""
+Precomputed subscription feeds (fan-out-on-write).
+
+Each reader's feed is materialised as FeedEntry rows:
+
+- when an article is approved, one entry is written for every reader
+  subscribed to its publisher or following its author (the same audience
+  as its notifications, see ``newsapp.audience``);
+- when a reader subscribes, recent articles from the new source are
+  backfilled; when they unsubscribe, entries they can no longer reach are
+  pruned.
+
+Publishers with more than NEWSAPP_FEED_FANOUT_LIMIT subscribers are marked
+``fan_out_on_read``; their articles are not copied into every feed but
+merged in when a feed page is read.
+
+Clients that already hold a feed poll feed_changes() with a watermark and
+get back only what was added, edited or removed since (delta sync).
+Removals come from ArticleTombstone rows written when an approved article
+is deleted or withdrawn.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from .audience import audience_q, in_audience
+from .models import Article, ArticleTombstone, CustomUser, FeedEntry, Publisher
+from .pagination import (
+    akeyset_paginate, decode_watermark, encode_watermark, keyset_paginate, merge_pages,
+)
+
+DEFAULT_FANOUT_LIMIT = 10_000
+DEFAULT_BACKFILL_LIMIT = 1_000
+DEFAULT_SYNC_MAX_CHANGES = 500
+DEFAULT_SYNC_RETENTION_DAYS = 30
+BATCH_SIZE = 1_000
+# Delta sync re-reads this much history before each watermark: rows are
+# stamped when they are saved but only become visible when their
+# transaction commits, so a poll in between must not skip past them.
+SYNC_OVERLAP = timedelta(seconds=10)
+
+PublisherSubscription = CustomUser.subscribed_publishers.through
+JournalistSubscription = CustomUser.subscribed_journalists.through
+
+# Inside deferred_backfill(): readers to backfill, keyed by
+# ``(publisher_ids, journalist_ids)``.
+_deferred_backfills = ContextVar('newsapp_deferred_backfills', default=None)
+
+
+def fanout_limit():
+    """
+    Returns the subscriber count above which a publisher fans out on read.
+    """
+    return getattr(settings, 'NEWSAPP_FEED_FANOUT_LIMIT', DEFAULT_FANOUT_LIMIT)
+
+
+def backfill_limit():
+    """
+    Returns how many recent articles a new subscription copies into a feed.
+    """
+    return getattr(settings, 'NEWSAPP_FEED_BACKFILL_LIMIT', DEFAULT_BACKFILL_LIMIT)
+
+
+def _write_entries(pairs):
+    """
+    Bulk-inserts ``(reader_id, article)`` pairs in batches, skipping
+    entries that already exist. Returns the number of pairs written.
+    """
+    written = 0
+    batch = []
+    for reader_id, article in pairs:
+        batch.append(FeedEntry(reader_id=reader_id, article_id=article.pk,
+                               created_at=article.created_at))
+        if len(batch) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+
+def fan_out_article(article):
+    """
+    Writes a feed entry for the article into the feed of every subscriber
+    of its publisher and every follower of its author. Publishers above the
+    fan-out limit are switched to fan-out-on-read and skipped.
+    Returns the number of entries written.
+    """
+    follower_ids = JournalistSubscription.objects.filter(
+        audience_q('from_customuser__'), to_customuser_id=article.author_id
+    ).values_list('from_customuser_id', flat=True)
+    reader_ids = follower_ids
+
+    publisher = article.publisher
+    if not publisher.fan_out_on_read:
+        subscriber_ids = PublisherSubscription.objects.filter(
+            audience_q('customuser__'), publisher_id=publisher.pk
+        ).values_list('customuser_id', flat=True)
+        if subscriber_ids.count() > fanout_limit():
+            Publisher.objects.filter(pk=publisher.pk).update(fan_out_on_read=True)
+            publisher.fan_out_on_read = True
+        else:
+            reader_ids = subscriber_ids.union(follower_ids)
+
+    return _write_entries(
+        (reader_id, article)
+        for reader_id in reader_ids.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def backfill(reader_ids, publisher_ids=(), journalist_ids=()):
+    """
+    Adds the most recent approved articles from the given publishers and
+    journalists to the readers' feeds; users outside the audience are
+    skipped. Fan-out-on-read publishers are skipped since their articles
+    are merged in at read time. Inside deferred_backfill() the work is
+    only recorded.
+    """
+    pending = _deferred_backfills.get()
+    if pending is not None:
+        pending[tuple(sorted(publisher_ids)), tuple(sorted(journalist_ids))].update(reader_ids)
+        return 0
+
+    sources = Q()
+    if publisher_ids:
+        sources |= Q(publisher_id__in=publisher_ids, publisher__fan_out_on_read=False)
+    if journalist_ids:
+        sources |= Q(author_id__in=journalist_ids)
+    if not sources:
+        return 0
+
+    reader_ids = list(reader_ids)
+    reader_ids = [
+        pk
+        for start in range(0, len(reader_ids), BATCH_SIZE)
+        for pk in CustomUser.objects.filter(
+            audience_q(), pk__in=reader_ids[start:start + BATCH_SIZE],
+        ).values_list('pk', flat=True)
+    ]
+    if not reader_ids:
+        return 0
+
+    articles = list(
+        Article.objects.filter(sources, approved=True)
+        .order_by('-created_at', '-pk')
+        .only('pk', 'created_at')[:backfill_limit()]
+    )
+    return _write_entries(
+        (reader_id, article) for reader_id in reader_ids for article in articles
+    )
+
+
+@contextmanager
+def deferred_backfill():
+    """
+    Collects the backfills requested inside the block, e.g. by the
+    subscription signal handlers during a bulk import, and runs them when
+    the block exits without an error: after the block's transactions
+    have committed, and once per combination of sources for all the
+    readers that asked for it.
+    """
+    pending = defaultdict(set)
+    token = _deferred_backfills.set(pending)
+    try:
+        yield
+    finally:
+        _deferred_backfills.reset(token)
+    for (publisher_ids, journalist_ids), reader_ids in pending.items():
+        backfill(sorted(reader_ids), publisher_ids, journalist_ids)
+
+
+def prune_publishers(reader_ids, publisher_ids=None):
+    """
+    Removes entries that came from the given publishers (all publishers if
+    ``None``, i.e. the relation was cleared) unless the reader still
+    follows the article's author. One DELETE per batch of readers.
+    """
+    still_followed = JournalistSubscription.objects.filter(
+        from_customuser_id=OuterRef('reader_id'), to_customuser_id=OuterRef('article__author_id'),
+    )
+    for start in range(0, len(reader_ids), BATCH_SIZE):
+        dropped = FeedEntry.objects.filter(reader_id__in=reader_ids[start:start + BATCH_SIZE])
+        if publisher_ids is not None:
+            dropped = dropped.filter(article__publisher_id__in=publisher_ids)
+        dropped.exclude(Exists(still_followed)).delete()
+
+
+def prune_journalists(reader_ids, journalist_ids=None):
+    """
+    Removes entries written by the given journalists (all journalists if
+    ``None``) unless the reader still subscribes to the article's
+    publisher. One DELETE per batch of readers.
+    """
+    still_subscribed = PublisherSubscription.objects.filter(
+        customuser_id=OuterRef('reader_id'), publisher_id=OuterRef('article__publisher_id'),
+    )
+    for start in range(0, len(reader_ids), BATCH_SIZE):
+        dropped = FeedEntry.objects.filter(reader_id__in=reader_ids[start:start + BATCH_SIZE])
+        if journalist_ids is not None:
+            dropped = dropped.filter(article__author_id__in=journalist_ids)
+        dropped.exclude(Exists(still_subscribed)).delete()
+
+
+def rebuild_feed(reader_id):
+    """
+    Drops and recomputes one reader's feed from their subscriptions.
+    Returns the number of entries written.
+    """
+    reader = CustomUser.objects.get(pk=reader_id)
+    FeedEntry.objects.filter(reader_id=reader_id).delete()
+    return backfill(
+        [reader_id],
+        list(reader.subscribed_publishers.values_list('pk', flat=True)),
+        list(reader.subscribed_journalists.values_list('pk', flat=True)),
+    )
+
+
+def sync_max_changes():
+    """
+    Returns the number of changes above which delta sync tells the client
+    to refetch its whole feed instead.
+    """
+    return getattr(settings, 'NEWSAPP_SYNC_MAX_CHANGES', DEFAULT_SYNC_MAX_CHANGES)
+
+
+def sync_retention():
+    """
+    Returns how long tombstones are kept, and so how old a watermark may be.
+    """
+    return timedelta(days=getattr(settings, 'NEWSAPP_SYNC_RETENTION_DAYS',
+                                  DEFAULT_SYNC_RETENTION_DAYS))
+
+
+def record_tombstones(article_ids, reason):
+    """
+    Records that the given articles left every feed, for delta sync.
+    """
+    ArticleTombstone.objects.bulk_create(
+        [ArticleTombstone(article_id=pk, reason=reason) for pk in article_ids],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def prune_tombstones(before=None):
+    """
+    Deletes tombstones older than ``before`` (default: the sync retention
+    period ago). Returns the number deleted.
+    """
+    if before is None:
+        before = timezone.now() - sync_retention()
+    deleted, _ = ArticleTombstone.objects.filter(deleted_at__lt=before).delete()
+    return deleted
+
+
+def project_articles(queryset, fields=None, prefix='', extra=()):
+    """
+    Restricts an article queryset (or one reaching articles through
+    ``prefix``, e.g. ``'article__'``) to the given article fields, joining
+    only the relations those fields traverse. ``extra`` lists fields of the
+    queryset's own model to keep. ``None`` loads everything with author and
+    publisher joined.
+    """
+    if fields is None:
+        return queryset.select_related(f'{prefix}author', f'{prefix}publisher')
+
+    fields = ['id', 'created_at', *fields]
+    related = sorted({field.split('__')[0] for field in fields if '__' in field})
+    if related:
+        queryset = queryset.select_related(*(prefix + name for name in related))
+    return queryset.only(*extra, *(prefix + field for field in fields))
+
+
+def _feed_entries(user, fields):
+    return project_articles(
+        FeedEntry.objects.filter(reader=user).select_related('article'),
+        fields,
+        prefix='article__',
+        extra=('created_at', 'article'),
+    )
+
+
+def _read_time_articles(read_time_publishers, fields):
+    return project_articles(
+        Article.objects.filter(approved=True, publisher_id__in=read_time_publishers),
+        fields,
+    )
+
+
+def _read_time_publishers(user):
+    """
+    Returns the ids of the fan-out-on-read publishers whose articles are
+    merged into the user's feed: none for users outside the audience, as
+    fan_out_article() writes them no entries either.
+    """
+    if not in_audience(user):
+        return Publisher.objects.none().values_list('pk', flat=True)
+    return user.subscribed_publishers.filter(fan_out_on_read=True).values_list('pk', flat=True)
+
+
+def feed_page(user, cursor=None, page_size=20, fields=None):
+    """
+    Returns a KeysetPage of the articles in the user's feed: one indexed
+    range scan over their FeedEntry rows, merged with articles from any
+    fan-out-on-read publishers they subscribe to. ``fields`` limits the
+    article columns loaded (see project_articles()).
+    """
+    entries = keyset_paginate(_feed_entries(user, fields), cursor, page_size, id_field='article_id')
+    entries.object_list = [entry.article for entry in entries]
+
+    read_time_publishers = list(_read_time_publishers(user))
+    if not read_time_publishers:
+        return entries
+
+    merged = keyset_paginate(_read_time_articles(read_time_publishers, fields), cursor, page_size)
+    return merge_pages([entries, merged], cursor, page_size)
+
+
+async def afeed_page(user, cursor=None, page_size=20, fields=None):
+    """
+    Async version of feed_page().
+    """
+    entries = await akeyset_paginate(
+        _feed_entries(user, fields), cursor, page_size, id_field='article_id'
+    )
+    entries.object_list = [entry.article for entry in entries]
+
+    read_time_publishers = [pk async for pk in _read_time_publishers(user)]
+    if not read_time_publishers:
+        return entries
+
+    merged = await akeyset_paginate(
+        _read_time_articles(read_time_publishers, fields), cursor, page_size
+    )
+    return merge_pages([entries, merged], cursor, page_size)
+
+
+class FeedChanges:
+    """
+    The result of a delta sync: ``articles`` added to or edited in the
+    feed, ``deleted`` article ids to drop, and the ``watermark`` to send
+    next time. ``reset`` means the changes could not be computed (no,
+    expired or pre-subscription-change watermark, or too many changes);
+    the client should refetch the feed and sync from ``watermark``.
+    """
+
+    def __init__(self, watermark, articles=(), deleted=(), reset=False):
+        self.watermark = watermark
+        self.articles = list(articles)
+        self.deleted = list(deleted)
+        self.reset = reset
+
+
+def feed_changes(user, since=None, fields=None):
+    """
+    Returns the FeedChanges in the user's feed since the watermark token
+    ``since``. The cost follows the number of changes, not the size of
+    the feed: entries come from the ``(reader, added_at)`` index, edits
+    from the ``updated_at`` index and removals from the tombstone log.
+    Raises InvalidCursor for a malformed watermark.
+    """
+    now = timezone.now()
+    watermark = encode_watermark(now)
+    if since is None:
+        return FeedChanges(watermark, reset=True)
+
+    moment = decode_watermark(since)
+    # Subscription changes backfill and prune entries without leaving a
+    # trace in the log; they bump the user's updated_at instead.
+    if moment < now - sync_retention() or (user.updated_at and user.updated_at > moment):
+        return FeedChanges(watermark, reset=True)
+
+    window = moment - SYNC_OVERLAP
+    limit = sync_max_changes()
+
+    added = FeedEntry.objects.filter(reader=user, added_at__gt=window).values_list(
+        'article_id', flat=True
+    )
+    in_feed = Exists(FeedEntry.objects.filter(reader=user, article=OuterRef('pk')))
+    read_time_publishers = _read_time_publishers(user)
+    edited = Article.objects.filter(approved=True, updated_at__gt=window).filter(
+        in_feed | Q(publisher_id__in=read_time_publishers)
+    ).values_list('pk', flat=True)
+    deleted = ArticleTombstone.objects.filter(deleted_at__gt=window).values_list(
+        'article_id', flat=True
+    )
+
+    changed_ids = set(added[:limit + 1]) | set(edited[:limit + 1])
+    deleted_ids = set(deleted[:limit + 1])
+    if len(changed_ids) + len(deleted_ids) > limit:
+        return FeedChanges(watermark, reset=True)
+
+    articles = project_articles(
+        Article.objects.filter(pk__in=changed_ids, approved=True), fields
+    ).order_by('-created_at', '-pk') if changed_ids else []
+    # An article withdrawn and re-approved inside the window is current.
+    deleted_ids -= changed_ids
+    return FeedChanges(watermark, articles, sorted(deleted_ids))
+
+
+def _feed_validators(user, page, last_removal):
+    edits = [article.updated_at for article in page]
+    version = ([article.pk for article in page], max(edits, default=None),
+               page.next_cursor, page.previous_cursor, user.updated_at)
+    last_modified = max(filter(None, (*edits, last_removal, user.updated_at)), default=None)
+    return version, last_modified
+
+
+def feed_version(user, cursor=None, page_size=20):
+    """
+    Returns ``(version, last_modified)`` validators for one page of the
+    user's feed, from the keys and ``updated_at`` of the articles on it:
+    articles added to, edited on or removed from the page, and
+    subscription changes (which bump the user's ``updated_at``), all
+    change them. The cost follows the page size, not the feed size.
+    ``last_modified`` also moves when any article is withdrawn or deleted,
+    as a removal leaves nothing on the page to date it by. Raises
+    InvalidCursor for a malformed cursor.
+    """
+    page = feed_page(user, cursor, page_size, fields=('updated_at',))
+    last_removal = ArticleTombstone.objects.aggregate(deleted=Max('deleted_at'))['deleted']
+    return _feed_validators(user, page, last_removal)
+
+
+async def afeed_version(user, cursor=None, page_size=20):
+    """
+    Async version of feed_version().
+    """
+    page = await afeed_page(user, cursor, page_size, fields=('updated_at',))
+    last_removal = (await ArticleTombstone.objects.aaggregate(deleted=Max('deleted_at')))['deleted']
+    return _feed_validators(user, page, last_removal)
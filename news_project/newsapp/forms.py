@@ -1,6 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import reverse
 from .models import CustomUser, Article, Newsletter
+from .subscriptions import update_subscriptions
 
 
 # Custom user creation with role selection
@@ -48,17 +50,64 @@ class NewsletterForm(forms.ModelForm):
         fields = ['title', 'content', 'publisher']
 
 
+class AutocompleteSelectMultiple(forms.SelectMultiple):
+    """
+    Multiple select that renders only the selected options. Further
+    options are found by type-ahead against the autocomplete endpoint for
+    ``kind``, so the page does not grow with the number of choices.
+    """
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse('api_autocomplete', args=[self.kind])
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if pk]
+        if not selected:
+            return []
+        field = self.choices.field
+        options = [
+            self.create_option(name, field.prepare_value(obj), field.label_from_instance(obj),
+                               True, index, attrs=attrs)
+            for index, obj in enumerate(self.choices.queryset.filter(pk__in=selected))
+        ]
+        return [(None, options, 0)]
+
+
 class SubscriptionForm(forms.ModelForm):
     """
     Form used by Reader users to subscribe to publishers and journalists.
 
-    Provides multiple choice options via checkboxes for selecting subscriptions.
+    Subscriptions are picked by type-ahead; only the current subscriptions
+    are rendered and only the submitted ids are looked up when validating.
+    Saving applies only the difference to the current subscriptions and
+    only writes the user row when the digest choice changed; the
+    subscription changes are kept in ``changes``.
     """
 
     class Meta:
         model = CustomUser
-        fields = ['subscribed_publishers', 'subscribed_journalists']
+        fields = ['subscribed_publishers', 'subscribed_journalists', 'digest']
         widgets = {
-            'subscribed_publishers': forms.CheckboxSelectMultiple,
-            'subscribed_journalists': forms.CheckboxSelectMultiple,
+            'subscribed_publishers': AutocompleteSelectMultiple('publishers'),
+            'subscribed_journalists': AutocompleteSelectMultiple('journalists'),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['subscribed_journalists'].queryset = CustomUser.objects.filter(role='journalist')
+
+    def save(self, commit=True):
+        self.changes = update_subscriptions(
+            self.instance,
+            [publisher.pk for publisher in self.cleaned_data['subscribed_publishers']],
+            [journalist.pk for journalist in self.cleaned_data['subscribed_journalists']],
+        )
+        if 'digest' in self.changed_data:
+            self.instance.save(update_fields=['digest', 'updated_at'])
+        return self.instance
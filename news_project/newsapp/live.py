@@ -0,0 +1,326 @@
+"""
+Server push of newly approved articles (Server-Sent Events).
+
+Readers keep one ``text/event-stream`` connection open instead of polling
+the subscribed-articles feed. Each connection subscribes to a channel per
+publisher and journalist the reader follows (``publisher:<id>``,
+``author:<id>``) plus its own ``reader:<id>`` channel. When an approval
+commits, the article is serialised and encoded once and the same bytes
+are handed to every matching connection.
+
+The broker is pluggable through ``NEWSAPP_LIVE['BROKER']``:
+
+- InMemoryBroker (default) delivers within one process, which is enough
+  for a single ASGI worker that also serves the approving requests;
+- RedisBroker relays messages through Redis pub/sub so every worker sees
+  every approval (requires the ``redis`` package).
+
+Every connection has a bounded queue. A client that reads too slowly to
+keep up is sent a ``reset`` event and disconnected rather than buffered
+without limit; like a client reconnecting after a network drop, it
+catches up through delta sync (``subscribed-articles/sync/``) using the
+watermark in the last event id it saw. Idle connections get a comment
+line every ``HEARTBEAT`` seconds so proxies keep them open and dead
+clients are noticed.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .pagination import encode_watermark
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIVE_SETTINGS = {
+    'BROKER': 'newsapp.live.InMemoryBroker',
+    'REDIS_URL': 'redis://localhost:6379/0',
+    # Messages buffered per connection before a slow client is reset.
+    'QUEUE_SIZE': 100,
+    # Seconds between keep-alive comments on an idle connection.
+    'HEARTBEAT': 15,
+}
+
+KEEPALIVE = b': keepalive\n\n'
+
+
+def live_setting(name):
+    """
+    Returns a live push setting, falling back to DEFAULT_LIVE_SETTINGS.
+    """
+    configured = getattr(settings, 'NEWSAPP_LIVE', {})
+    return configured.get(name, DEFAULT_LIVE_SETTINGS[name])
+
+
+def format_event(event, data, event_id=None):
+    """
+    Returns one Server-Sent Event as bytes. ``data`` is JSON-encoded.
+    """
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def reset_event():
+    """
+    Returns the event telling a client to resync through delta sync and
+    reconnect.
+    """
+    return format_event('reset', {}, encode_watermark(timezone.now()))
+
+
+class Subscription:
+    """
+    One connection's bounded queue of encoded events. Created and read on
+    the connection's event loop; the broker feeds it through deliver().
+    """
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, message):
+        """
+        Queues an encoded event. Must run on the subscription's loop. A full
+        queue marks the subscription as overflowed; its reader is woken
+        with a reset event in place of the oldest message.
+        """
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(reset_event())
+
+    async def get(self, timeout):
+        """
+        Returns the next encoded event, or None if none arrived within
+        ``timeout`` seconds.
+        """
+        if not self.queue.empty():
+            # Skip wait_for(), which wraps every call in a new task.
+            return self.queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Base class for pub/sub brokers. subscribe() and unsubscribe() are
+    called from the event loop serving the connection; publish() may be
+    called from any thread.
+    """
+
+    def subscribe(self, channels, maxsize=None):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def publish(self, channels, message):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class InMemoryBroker(Broker):
+    """
+    Delivers messages to the subscriptions of this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._subscriptions = 0
+        self._overflows = 0
+
+    def subscribe(self, channels, maxsize=None):
+        subscription = Subscription(self, channels, maxsize or live_setting('QUEUE_SIZE'))
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+            self._subscriptions += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+            self._subscriptions -= 1
+            self._overflows += subscription.overflowed
+
+    def publish(self, channels, message):
+        """
+        Hands ``message`` to every subscription on any of ``channels``,
+        once per subscription. Returns the number of subscriptions reached.
+        """
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+
+        by_loop = {}
+        for subscription in targets:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver_all, subscriptions, message)
+            except RuntimeError:
+                # The loop has shut down; its connections are gone.
+                pass
+        return len(targets)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'connections': self._subscriptions,
+                'channels': len(self._channels),
+                'overflows': self._overflows,
+            }
+
+
+def _deliver_all(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Relays every message through one Redis pub/sub channel so all worker
+    processes deliver it to their own connections.
+    """
+    redis_channel = 'newsapp:live'
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured("RedisBroker requires the 'redis' package.") from exc
+        self._url = live_setting('REDIS_URL')
+        self._client = redis.Redis.from_url(self._url)
+        self._listeners = {}
+
+    def subscribe(self, channels, maxsize=None):
+        subscription = super().subscribe(channels, maxsize)
+        loop = subscription.loop
+        if loop not in self._listeners:
+            self._listeners[loop] = loop.create_task(self._listen())
+        return subscription
+
+    def publish(self, channels, message):
+        payload = json.dumps({'channels': list(channels), 'message': message.decode()})
+        return self._client.publish(self.redis_channel, payload)
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self._url)
+        async with client.pubsub() as pubsub:
+            await pubsub.subscribe(self.redis_channel)
+            async for raw in pubsub.listen():
+                if raw['type'] != 'message':
+                    continue
+                try:
+                    payload = json.loads(raw['data'])
+                    InMemoryBroker.publish(self, payload['channels'], payload['message'].encode())
+                except (ValueError, KeyError):
+                    logger.warning("Ignoring malformed live message: %r", raw['data'])
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Returns the process-wide broker named by ``NEWSAPP_LIVE['BROKER']``.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(live_setting('BROKER'))()
+    return _broker
+
+
+def reader_channels(reader_id, publisher_ids, journalist_ids):
+    """
+    Returns the channels a reader's stream listens on.
+    """
+    return [
+        f'reader:{reader_id}',
+        *(f'publisher:{pk}' for pk in publisher_ids),
+        *(f'author:{pk}' for pk in journalist_ids),
+    ]
+
+
+def publish_article(article):
+    """
+    Pushes an approved article to the streams of readers subscribed to its
+    publisher or following its author. The event id is a delta-sync
+    watermark. Returns the broker's publish() result: connections reached
+    in process, or Redis subscribers for RedisBroker.
+    """
+    from .serializers import ArticleListSerializer
+
+    message = format_event(
+        'article', ArticleListSerializer(article).data, encode_watermark(timezone.now())
+    )
+    return get_broker().publish(
+        [f'publisher:{article.publisher_id}', f'author:{article.author_id}'], message
+    )
+
+
+def reset_readers(reader_ids):
+    """
+    Sends a reset event to the given readers' streams, e.g. after their
+    subscriptions changed, so they reconnect with the new channels.
+    """
+    if reader_ids:
+        get_broker().publish([f'reader:{pk}' for pk in reader_ids], reset_event())
+
+
+async def stream(channels, heartbeat=None, maxsize=None):
+    """
+    Yields the encoded events for one connection: a ``ready`` event
+    carrying the current watermark, then published events, with
+    keep-alive comments when idle. Stops after a reset event.
+    """
+    heartbeat = heartbeat or live_setting('HEARTBEAT')
+    subscription = get_broker().subscribe(channels, maxsize)
+    try:
+        yield format_event('ready', {}, encode_watermark(timezone.now()))
+        while True:
+            message = await subscription.get(heartbeat)
+            if message is None:
+                yield KEEPALIVE
+                continue
+            yield message
+            if message.startswith(b'event: reset\n'):
+                return
+    finally:
+        subscription.close()
@@ -0,0 +1,165 @@
+"""
+Batched, per-recipient email delivery.
+
+Every subscriber gets their own personalised message, so addresses are
+never exposed to other readers. Messages are sent in bounded chunks with
+a single reused backend connection from ``get_connection()`` (the same
+mechanism ``send_mass_mail`` uses). A bad address only costs its own
+message: the rest of the chunk carries on after it. A cursor (the last
+recipient id sent) is checkpointed after every chunk so an interrupted run
+can resume where it stopped.
+"""
+
+import logging
+import time
+from collections import namedtuple
+from itertools import islice
+from smtplib import SMTPServerDisconnected
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# A single addressee. ``id`` must increase monotonically across the
+# recipient stream; it is what the resume cursor records.
+Recipient = namedtuple('Recipient', ['id', 'email', 'name'])
+
+
+class MailReport:
+    """
+    Outcome of a mass-mail run: counts, failed addresses, the final cursor
+    and throughput.
+    """
+
+    def __init__(self, cursor=None):
+        self.sent = 0
+        self.failed = 0
+        self.chunks = 0
+        self.failed_recipients = []
+        self.cursor = cursor
+        self.elapsed = 0.0
+
+    @property
+    def messages_per_second(self):
+        """
+        Returns delivered messages per second of wall-clock time.
+        """
+        if not self.elapsed:
+            return 0.0
+        return self.sent / self.elapsed
+
+    def as_dict(self):
+        """
+        Returns the report as a JSON-serialisable dict.
+        """
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'chunks': self.chunks,
+            'cursor': self.cursor,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'messages_per_second': round(self.messages_per_second, 1),
+            'failed_recipients': self.failed_recipients,
+        }
+
+
+def chunked(iterable, size):
+    """
+    Yields lists of at most ``size`` items from ``iterable``.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class MassMailer:
+    """
+    Sends one message per recipient in chunks over a single connection.
+
+    ``render`` is called with a Recipient and must return a
+    ``(subject, body)`` pair. ``checkpoint`` (optional) is called with the
+    new cursor after each chunk so callers can persist progress.
+    """
+
+    # Keep at most this many failed addresses on the report.
+    MAX_FAILED_RECIPIENTS = 100
+
+    def __init__(self, chunk_size=None, connection=None, from_email=None):
+        self.chunk_size = chunk_size or getattr(
+            settings, 'NEWSAPP_EMAIL_CHUNK_SIZE', DEFAULT_CHUNK_SIZE
+        )
+        self.connection = connection or get_connection()
+        self.from_email = from_email or getattr(
+            settings, "DEFAULT_FROM_EMAIL", "news@example.com"
+        )
+
+    def send(self, recipients, render, cursor=None, checkpoint=None, report=None):
+        """
+        Delivers a message to every recipient whose id is above ``cursor``
+        and returns a MailReport. Pass ``report`` to have a MailReport of
+        your own filled in, e.g. to read the counts from ``checkpoint``.
+        """
+        report = report or MailReport(cursor)
+        started = time.perf_counter()
+
+        if cursor is not None:
+            recipients = (r for r in recipients if r.id > cursor)
+
+        self.connection.open()
+        try:
+            for chunk in chunked(recipients, self.chunk_size):
+                self._send_chunk(chunk, render, report)
+                report.chunks += 1
+                report.cursor = chunk[-1].id
+                if checkpoint is not None:
+                    checkpoint(report.cursor)
+        finally:
+            self.connection.close()
+            report.elapsed = time.perf_counter() - started
+
+        logger.info("Mass mail finished: %s sent, %s failed in %.2fs (%.1f msg/s)",
+                    report.sent, report.failed, report.elapsed,
+                    report.messages_per_second)
+        return report
+
+    def _message(self, recipient, render):
+        subject, body = render(recipient)
+        return EmailMessage(subject, body, self.from_email, [recipient.email])
+
+    def _send_chunk(self, chunk, render, report):
+        """
+        Sends a chunk through the shared connection. If a message fails, it
+        is recorded and the rest of the chunk continues from the next
+        recipient, so nothing is sent twice and nothing is skipped.
+        """
+        pending = [r for r in chunk if r.email]
+        while pending:
+            attempted = []
+
+            def tracked():
+                for recipient in pending:
+                    attempted.append(recipient)
+                    yield self._message(recipient, render)
+
+            try:
+                report.sent += self.connection.send_messages(tracked()) or 0
+                return
+            except Exception as exc:
+                if not attempted:
+                    raise
+                failed = attempted[-1]
+                report.sent += len(attempted) - 1
+                report.failed += 1
+                if len(report.failed_recipients) < self.MAX_FAILED_RECIPIENTS:
+                    report.failed_recipients.append(failed.email)
+                logger.warning("Failed to email recipient %s: %s", failed.id, exc)
+                if isinstance(exc, (SMTPServerDisconnected, ConnectionError, TimeoutError)):
+                    self.connection.close()
+                    self.connection.open()
+                pending = pending[len(attempted):]
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    """
+    Runs one of the registered newsapp performance benchmarks and prints
+    its figures.
+    """
+    help = "Run a newsapp performance benchmark (see newsapp/benchmarks.py)."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for name, spec in sorted(BENCHMARKS.items()):
+            subparser = subparsers.add_parser(name, help=spec['help'])
+            for flags, kwargs in spec['arguments']:
+                subparser.add_argument(*flags, **kwargs)
+
+    def handle(self, *args, **options):
+        name = options['benchmark']
+        spec = BENCHMARKS[name]
+        arg_names = [
+            flags[0].lstrip('-').replace('-', '_') for flags, _ in spec['arguments']
+        ]
+        results = spec['func'](**{arg: options[arg] for arg in arg_names})
+
+        self.stdout.write(self.style.SUCCESS(f"Benchmark: {name}"))
+        for key, value in results.items():
+            self.stdout.write(f"  {key}: {value}")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from newsapp.bootstrap import bootstrap_roles
+
+
+class Command(BaseCommand):
+    """
+    Makes the role groups and their permissions match
+    ``newsapp.bootstrap.ROLE_PERMISSIONS``. ``migrate`` already does this;
+    the command is for checking or repairing a database.
+    """
+    help = "Create the role groups and sync their permissions, or show the changes with --dry-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="Database to bootstrap.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only show what would change.",
+        )
+
+    def handle(self, *args, **options):
+        changes = bootstrap_roles(options['database'], dry_run=options['dry_run'])
+        for line in changes.lines():
+            self.stdout.write(line)
+        if not changes:
+            self.stdout.write(self.style.SUCCESS("Roles are up to date."))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run; nothing was changed."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Roles updated."))
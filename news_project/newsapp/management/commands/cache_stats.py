@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.caching import cache_stats
+
+
+class Command(BaseCommand):
+    """
+    Reports how well the page fragment cache is doing.
+    """
+    help = "Print fragment cache hits, misses, single-flight waits and hit ratio."
+
+    def handle(self, *args, **options):
+        for fragment, stats in cache_stats().items():
+            self.stdout.write(
+                f"{fragment}: hits={stats['hits']} misses={stats['misses']} "
+                f"waits={stats['waits']} hit_ratio={stats['hit_ratio']:.1%}"
+            )
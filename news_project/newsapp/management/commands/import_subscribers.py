@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from newsapp.models import Publisher
+from newsapp.subscriptions import BATCH_SIZE, subscribe_readers
+
+
+class Command(BaseCommand):
+    """
+    Subscribes a list of readers to a publisher, for onboarding imports.
+    """
+    help = "Subscribe the user ids listed in a file (one per line, '-' for stdin) to a publisher."
+
+    def add_arguments(self, parser):
+        parser.add_argument('publisher_id', type=int)
+        parser.add_argument('file', help="File of user ids, one per line, or '-' for stdin.")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of users subscribed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            publisher = Publisher.objects.get(pk=options['publisher_id'])
+        except Publisher.DoesNotExist:
+            raise CommandError(f"Publisher {options['publisher_id']} does not exist.")
+
+        if options['file'] == '-':
+            lines = sys.stdin.read().split()
+        else:
+            with open(options['file']) as handle:
+                lines = handle.read().split()
+        try:
+            reader_ids = [int(line) for line in lines]
+        except ValueError as exc:
+            raise CommandError(f"Invalid user id: {exc}")
+
+        added = subscribe_readers(publisher, reader_ids, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Subscribed {added} of {len(reader_ids)} users to {publisher.name}."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.feed import prune_tombstones
+
+
+class Command(BaseCommand):
+    """
+    Deletes delta-sync tombstones older than the retention period.
+    """
+    help = "Delete article tombstones older than NEWSAPP_SYNC_RETENTION_DAYS."
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
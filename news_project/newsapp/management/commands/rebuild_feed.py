@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.feed import rebuild_feed
+from newsapp.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Recomputes precomputed reader feeds from current subscriptions.
+    """
+    help = "Rebuild FeedEntry rows for all readers, or only the given user ids."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids',
+            nargs='*',
+            type=int,
+            help="Only rebuild the feeds of these users.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of users loaded per batch.",
+        )
+
+    def handle(self, *args, **options):
+        readers = CustomUser.objects.exclude(role='journalist').order_by('pk')
+        if options['user_ids']:
+            readers = readers.filter(pk__in=options['user_ids'])
+
+        rebuilt = entries = 0
+        for reader_id in readers.values_list('pk', flat=True).iterator(
+                chunk_size=options['batch_size']):
+            entries += rebuild_feed(reader_id)
+            rebuilt += 1
+            if rebuilt % options['batch_size'] == 0:
+                self.stdout.write(f"Rebuilt {rebuilt} feeds ({entries} entries)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} feeds ({entries} entries)."))
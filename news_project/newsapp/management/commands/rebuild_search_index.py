@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from newsapp.search import get_backend
+
+
+class Command(BaseCommand):
+    """
+    Re-indexes every approved article and newsletter for full-text search.
+    """
+    help = "Rebuild the full-text search index from the current articles and newsletters."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of documents indexed per batch.",
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to index.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        indexed = backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} documents with {type(backend).__name__}."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.counters import BATCH_SIZE, reconcile
+
+
+class Command(BaseCommand):
+    """
+    Recounts the denormalised subscriber, article and follower counters
+    and fixes the ones that drifted. Meant to run periodically, e.g. from
+    cron, and after bulk changes that bypass model signals.
+    """
+    help = "Recount publisher subscriber/article counts and journalist follower counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of rows compared and locked per batch.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many counters drifted.",
+        )
+
+    def handle(self, *args, **options):
+        fixed = reconcile(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = "drifted" if options['dry_run'] else "fixed"
+        for counter, rows in fixed.items():
+            self.stdout.write(f"{counter}: {rows} {verb}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(fixed.values())} counters {verb}."))
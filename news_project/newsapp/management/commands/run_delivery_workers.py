@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from newsapp.delivery import CHANNEL_HANDLERS, DeliveryWorker, queue_stats, run_pending
+
+
+class Command(BaseCommand):
+    """
+    Runs the background delivery workers that send publish-event email and
+    social notifications, or reports queue depth and latency.
+    """
+    help = "Run delivery workers for queued publish events, or report queue stats."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--channel',
+            action='append',
+            dest='channels',
+            choices=sorted(CHANNEL_HANDLERS),
+            help="Only process this channel. May be given more than once.",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Process every currently due job, then exit.",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help="Seconds to sleep between polls of an empty queue.",
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help="Print queue depth and latency per channel and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        if options['once']:
+            processed = run_pending(options['channels'])
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)."))
+            self.print_stats()
+            return
+
+        worker = DeliveryWorker(options['channels'], options['interval'])
+        self.stdout.write("Delivery workers running. Press Ctrl+C to stop.")
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
+            self.stdout.write("Stopping delivery workers.")
+        except Exception as exc:
+            raise CommandError(f"Delivery worker crashed: {exc}") from exc
+
+    def print_stats(self):
+        for channel, stats in queue_stats().items():
+            self.stdout.write(
+                f"{channel}: pending={stats['pending']} running={stats['running']} "
+                f"failed={stats['failed']} "
+                f"oldest_pending={stats['oldest_pending_seconds']:.1f}s "
+                f"avg_latency={stats['avg_latency_seconds']:.1f}s"
+            )
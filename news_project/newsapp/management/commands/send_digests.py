@@ -0,0 +1,65 @@
+import os
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from newsapp.digest import DEFAULT_BATCH_SIZE, PERIODS, send_digests
+from newsapp.models import DigestShard
+
+
+class Command(BaseCommand):
+    """
+    Sends the daily or weekly digests of a window, split into reader id
+    ranges sent from a pool of processes. Meant to run from cron after
+    midnight; running it again for the same window resumes an interrupted
+    mailing.
+    """
+    help = "Send daily or weekly digests of new articles and newsletters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', choices=sorted(PERIODS))
+        parser.add_argument(
+            '--end',
+            help="Local date (YYYY-MM-DD) whose midnight ends the window. Defaults to today.",
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Worker processes sending shards.",
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            help="Reader id ranges to split a new mailing into. Defaults to four per process.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Readers loaded per query.",
+        )
+
+    def handle(self, *args, **options):
+        end = None
+        if options['end']:
+            try:
+                day = datetime.strptime(options['end'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid --end date: {options['end']!r}")
+            end = timezone.make_aware(datetime.combine(day, time.min))
+
+        run, results = send_digests(
+            options['period'], end, processes=max(1, options['processes']),
+            shards=options['shards'], batch_size=options['batch_size'],
+        )
+        for result in results:
+            self.stdout.write(
+                f"shard {result['shard']}: {result['status']} "
+                f"sent={result['sent']} failed={result['failed']}"
+            )
+        unfinished = run.shards.exclude(status=DigestShard.STATUS_DONE).count()
+        if unfinished:
+            raise CommandError(f"{run}: {unfinished} shard(s) unfinished; run again to resume.")
+        self.stdout.write(self.style.SUCCESS(f"{run}: all {run.shards.count()} shard(s) sent."))
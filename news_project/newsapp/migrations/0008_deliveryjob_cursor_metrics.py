@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0007_publishevent_deliveryjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryjob',
+            name='cursor',
+            field=models.BigIntegerField(blank=True, help_text='Id of the last recipient handled, so a retry resumes after it.', null=True),
+        ),
+        migrations.AddField(
+            model_name='deliveryjob',
+            name='metrics',
+            field=models.JSONField(blank=True, default=dict, help_text='Delivery figures from the last run (sent, failed, messages/s).'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0008_deliveryjob_cursor_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsletter',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-created_at', '-id'], name='article_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsletter',
+            index=models.Index(fields=['-created_at', '-id'], name='newsletter_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0009_listing_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='fan_out_on_read',
+            field=models.BooleanField(default=False, help_text="Set for publishers with too many subscribers to copy each article into every reader's feed; their articles are merged into feeds at read time instead."),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(help_text="Copy of the article's created_at, so a feed page is one index range scan.")),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='newsapp.article')),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reader', '-created_at', '-article'], name='feedentry_reader_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reader', 'article'), name='feedentry_reader_article_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:21
+
+from django.db import migrations, models
+from django.db.models import Q
+
+# Approved articles are what readers list. Where the backend supports
+# partial indexes (PostgreSQL, SQLite) a small index over just those rows
+# serves the listing; MySQL ignores index conditions, so there the
+# (approved, created_at, id) composite index does the job instead.
+PUBLISHED_INDEX = models.Index(
+    fields=['-created_at', '-id'],
+    condition=Q(approved=True),
+    name='article_published_idx',
+)
+
+
+def add_published_index(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        schema_editor.add_index(apps.get_model('newsapp', 'Article'), PUBLISHED_INDEX)
+
+
+def remove_published_index(apps, schema_editor):
+    if schema_editor.connection.features.supports_partial_indexes:
+        schema_editor.remove_index(apps.get_model('newsapp', 'Article'), PUBLISHED_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0010_feedentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='role',
+            field=models.CharField(choices=[('reader', 'Reader'), ('editor', 'Editor'), ('journalist', 'Journalist')], db_index=True, help_text="Defines the user's role: reader, editor, or journalist.", max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['approved', '-created_at', '-id'], name='article_approved_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['approved', 'publisher', '-created_at', '-id'], name='article_approved_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['approved', 'author', '-created_at', '-id'], name='article_approved_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='article_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsletter',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='newsletter_author_created_idx'),
+        ),
+        migrations.RunPython(add_published_index, remove_published_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+# Native full-text indexes where the database has them (see
+# newsapp/search.py); other databases use the SearchTerm table.
+MYSQL_FULLTEXT = [
+    ('newsapp_article', 'article_fulltext_idx'),
+    ('newsapp_newsletter', 'newsletter_fulltext_idx'),
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        for table, name in MYSQL_FULLTEXT:
+            schema_editor.execute(f"CREATE FULLTEXT INDEX {name} ON {table} (title, content)")
+    elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        schema_editor.execute("CREATE VIRTUAL TABLE newsapp_search_fts USING fts5(title, body)")
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE newsapp_search_fts_vocab USING fts5vocab(newsapp_search_fts, 'row')"
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        for table, name in MYSQL_FULLTEXT:
+            schema_editor.execute(f"DROP INDEX {name} ON {table}")
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS newsapp_search_fts_vocab")
+        schema_editor.execute("DROP TABLE IF EXISTS newsapp_search_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0011_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('article', 'Article'), ('newsletter', 'Newsletter')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('weight', models.FloatField(help_text='Damped, title-boosted frequency of the term in the document.')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='searchterm_document_idx')],
+                'constraints': [models.UniqueConstraint(fields=('term', 'kind', 'object_id'), name='searchterm_posting_uniq')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
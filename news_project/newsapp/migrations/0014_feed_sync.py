@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0013_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_id', models.PositiveBigIntegerField(help_text='Primary key of the article; not a foreign key since the article may be gone.')),
+                ('reason', models.CharField(choices=[('deleted', 'Deleted'), ('withdrawn', 'Withdrawn')], max_length=16)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='added_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the article entered the feed; delta sync reports entries added since a watermark.'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['reader', 'added_at'], name='feedentry_reader_added_idx'),
+        ),
+    ]
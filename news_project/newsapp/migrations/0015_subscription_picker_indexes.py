@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:27
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('newsapp', '0014_feed_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(models.F('role'), django.db.models.functions.text.Lower('username'), name='user_role_username_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'username'], name='user_role_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='publisher_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['name'], name='publisher_name_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, column):
+    """
+    Returns a subquery counting the ``queryset`` rows whose ``column``
+    matches the outer row.
+    """
+    return Coalesce(Subquery(
+        queryset.filter(**{column: OuterRef('pk')}).order_by()
+        .values(column).annotate(n=Count('*')).values('n')
+    ), 0)
+
+
+def count_existing(apps, schema_editor):
+    Publisher = apps.get_model('newsapp', 'Publisher')
+    CustomUser = apps.get_model('newsapp', 'CustomUser')
+    Article = apps.get_model('newsapp', 'Article')
+    publisher_subscriptions = CustomUser.subscribed_publishers.through
+    journalist_subscriptions = CustomUser.subscribed_journalists.through
+    db_alias = schema_editor.connection.alias
+
+    Publisher.objects.using(db_alias).update(
+        subscriber_count=_count(publisher_subscriptions.objects.all(), 'publisher_id'),
+        article_count=_count(Article.objects.filter(approved=True), 'publisher_id'),
+    )
+    CustomUser.objects.using(db_alias).filter(role='journalist').update(
+        follower_count=_count(journalist_subscriptions.objects.all(), 'to_customuser_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0015_subscription_picker_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of readers following the user (as a journalist), maintained by newsapp.counters.'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='article_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of approved articles, maintained by newsapp.counters.'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='subscriber_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of subscribed readers, maintained by newsapp.counters.'),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0016_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publishevent',
+            name='idempotency_key',
+            field=models.CharField(help_text='Identifies the approval the event announces, so it is announced once.', max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='publishevent',
+            name='withdrawn_at',
+            field=models.DateTimeField(blank=True, help_text='When the article was withdrawn after this approval.', null=True),
+        ),
+    ]
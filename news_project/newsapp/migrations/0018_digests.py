@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('newsapp', '0017_publish_event_idempotency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('daily', 'Daily digest'), ('weekly', 'Weekly digest')], max_length=10)),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DigestShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('cursor', models.BigIntegerField(blank=True, help_text='Id of the last reader handled, so a rerun resumes after it.', null=True)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='digest',
+            field=models.CharField(blank=True, choices=[('', 'An email per article'), ('daily', 'Daily digest'), ('weekly', 'Weekly digest')], default='', help_text='How the user (as a reader) is emailed about new articles and newsletters: one email each, or a daily or weekly digest.', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['digest', 'id'], name='user_digest_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='digestrun',
+            constraint=models.UniqueConstraint(fields=('period', 'window_end'), name='digest_run_window_unique'),
+        ),
+        migrations.AddField(
+            model_name='digestshard',
+            name='run',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='newsapp.digestrun'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0018_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='rejected_at',
+            field=models.DateTimeField(blank=True, help_text='When an editor turned the article down. Editing it submits it again.', null=True),
+        ),
+    ]
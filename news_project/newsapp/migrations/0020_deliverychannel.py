@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-17 05:05
+
+from django.db import migrations, models
+
+
+def create_channels(apps, schema_editor):
+    DeliveryChannel = apps.get_model('newsapp', 'DeliveryChannel')
+    DeliveryChannel.objects.using(schema_editor.connection.alias).bulk_create([
+        DeliveryChannel(name=name) for name in ('feed', 'email', 'social')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0019_article_rejected_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryChannel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+            ],
+        ),
+        migrations.RunPython(create_channels, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,65 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
+from django.utils import timezone
 
 
-class Publisher(models.Model):
+class CounterFieldsMixin:
+    """
+    Keeps ordinary saves of existing rows from writing the denormalised
+    ``counter_fields``. Those are only changed by the F() updates in
+    ``newsapp.counters``; writing back the value loaded with the instance
+    would undo increments made since.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class Publisher(CounterFieldsMixin, models.Model):
     """
     Represents a content publisher entity which can be associated with articles and newsletters.
     """
     name = models.CharField(max_length=100)
+    fan_out_on_read = models.BooleanField(
+        default=False,
+        help_text="Set for publishers with too many subscribers to copy each "
+                  "article into every reader's feed; their articles are merged "
+                  "into feeds at read time instead."
+    )
+    subscriber_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of subscribed readers, maintained by newsapp.counters."
+    )
+    article_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of approved articles, maintained by newsapp.counters."
+    )
     updated_at = models.DateTimeField(auto_now=True)
 
+    counter_fields = ('subscriber_count', 'article_count')
+
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix lookups for the subscription picker:
+            # on lower(name) where the database supports expression
+            # indexes, on the case-insensitively collated column on MySQL.
+            models.Index(Lower('name'), name='publisher_name_prefix_idx'),
+            models.Index(fields=['name'], name='publisher_name_idx'),
+        ]
+
     def __str__(self):
         """
         Returns the string representation of the publisher.
@@ -17,7 +67,7 @@ class Publisher(models.Model):
         return self.name
 
 
-class CustomUser(AbstractUser):
+class CustomUser(CounterFieldsMixin, AbstractUser):
     """
     Custom user model with support for different roles (Reader, Editor, Journalist)
     and subscription relationships to publishers and journalists.
@@ -31,6 +81,7 @@ class CustomUser(AbstractUser):
     role = models.CharField(
         max_length=10,
         choices=ROLE_CHOICES,
+        db_index=True,
         help_text="Defines the user's role: reader, editor, or journalist."
     )
 
@@ -49,8 +100,46 @@ class CustomUser(AbstractUser):
         help_text="Journalists that the user (as a reader) is subscribed to."
     )
 
+    follower_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of readers following the user (as a journalist), "
+                  "maintained by newsapp.counters."
+    )
+
+    DIGEST_NONE = ''
+    DIGEST_DAILY = 'daily'
+    DIGEST_WEEKLY = 'weekly'
+
+    DIGEST_CHOICES = (
+        (DIGEST_NONE, 'An email per article'),
+        (DIGEST_DAILY, 'Daily digest'),
+        (DIGEST_WEEKLY, 'Weekly digest'),
+    )
+
+    digest = models.CharField(
+        max_length=10,
+        choices=DIGEST_CHOICES,
+        blank=True,
+        default=DIGEST_NONE,
+        help_text="How the user (as a reader) is emailed about new articles "
+                  "and newsletters: one email each, or a daily or weekly digest."
+    )
+
     updated_at = models.DateTimeField(auto_now=True)
 
+    counter_fields = ('follower_count',)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Journalist prefix lookups for the subscription picker (see
+            # Publisher for why there are two).
+            models.Index(models.F('role'), Lower('username'), name='user_role_username_prefix_idx'),
+            models.Index(fields=['role', 'username'], name='user_role_username_idx'),
+            # Digest shards walk a period's readers by id range.
+            models.Index(fields=['digest', 'id'], name='user_digest_idx'),
+        ]
+
     def publisher(self):
         """
         Returns the Publisher instance linked to this user, if any.
@@ -67,9 +156,47 @@ class CustomUser(AbstractUser):
         is_new = self.pk is None
         super().save(*args, **kwargs)
 
-        if self.role == 'journalist':
-            self.subscribed_publishers.clear()
-            self.subscribed_journalists.clear()
+        # New users have nothing to clear, and clearing an empty relation
+        # would still fire the feed-pruning m2m_changed handlers.
+        if self.role == 'journalist' and not is_new:
+            if self.subscribed_publishers.exists():
+                self.subscribed_publishers.clear()
+            if self.subscribed_journalists.exists():
+                self.subscribed_journalists.clear()
+
+
+class ArticleQuerySet(models.QuerySet):
+    """
+    Shared article querysets for views and API endpoints, so every listing
+    loads what its templates and serializers touch in a fixed number of
+    queries.
+    """
+
+    def visible_to(self, user):
+        """
+        Articles the user may open: everything for editors, otherwise
+        approved articles plus the user's own.
+        """
+        from .roles import has_role
+
+        if has_role(user, 'Editor'):
+            return self.all()
+        if not user.is_authenticated:
+            return self.filter(approved=True)
+        return self.filter(models.Q(approved=True) | models.Q(author=user))
+
+    def for_listing(self):
+        """
+        Joins author and publisher (shown on every row and in __str__) and
+        skips the article body.
+        """
+        return self.select_related('author', 'publisher').defer('content')
+
+    def pending_review(self):
+        """
+        Articles waiting for an editor: neither approved nor rejected.
+        """
+        return self.filter(approved=False, rejected_at__isnull=True)
 
 
 class Article(models.Model):
@@ -81,6 +208,11 @@ class Article(models.Model):
     content = models.TextField()
     summary = models.CharField(max_length=500, blank=True, null=True)
     approved = models.BooleanField(default=False)
+    rejected_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When an editor turned the article down. Editing it submits it again."
+    )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -94,10 +226,54 @@ class Article(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ArticleQuerySet.as_manager()
+
+    # Fields whose loaded values are remembered so signal handlers can tell
+    # what a save changed.
+    tracked_fields = ('approved', 'publisher_id')
+
     class Meta:
         permissions = [
             ('can_publish_article', 'Can publish article'),
         ]
+        indexes = [
+            # Keyset pagination walks listings on (created_at, id).
+            models.Index(fields=['-created_at', '-id'], name='article_created_id_idx'),
+            # Reader listings and approved-only lookups.
+            models.Index(fields=['approved', '-created_at', '-id'], name='article_approved_created_idx'),
+            # Feed fan-out-on-read and backfill by publisher or author.
+            models.Index(fields=['approved', 'publisher', '-created_at', '-id'], name='article_approved_pub_idx'),
+            models.Index(fields=['approved', 'author', '-created_at', '-id'], name='article_approved_author_idx'),
+            # Journalist listings of their own articles.
+            models.Index(fields=['author', '-created_at', '-id'], name='article_author_created_idx'),
+            # Latest edit, the validator for conditional GETs.
+            models.Index(fields=['updated_at'], name='article_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+
+    def remember_state(self):
+        """
+        Records the current values of ``tracked_fields`` as the stored ones.
+        Deferred fields are left out.
+        """
+        self._loaded_state = {
+            name: self.__dict__[name] for name in self.tracked_fields if name in self.__dict__
+        }
+
+    def loaded_state(self):
+        """
+        Returns the stored values of ``tracked_fields`` as last loaded or
+        saved, or None when they are not all known.
+        """
+        state = getattr(self, '_loaded_state', None)
+        if state is None or len(state) < len(self.tracked_fields):
+            return None
+        return state
 
     def __str__(self):
         """
@@ -106,6 +282,18 @@ class Article(models.Model):
         return f"{self.title} by {self.author}"
 
 
+class NewsletterQuerySet(models.QuerySet):
+    """
+    Shared newsletter querysets for views.
+    """
+
+    def for_listing(self):
+        """
+        Joins author and publisher and skips the newsletter body.
+        """
+        return self.select_related('author', 'publisher').defer('content')
+
+
 class Newsletter(models.Model):
     """
     Represents a newsletter created by a journalist and associated with a publisher.
@@ -122,15 +310,311 @@ class Newsletter(models.Model):
         on_delete=models.CASCADE,
         related_name='newsletters'
     )
+    created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = NewsletterQuerySet.as_manager()
+
     class Meta:
         permissions = [
             ('can_publish_newsletter', 'Can publish newsletter'),
         ]
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='newsletter_created_id_idx'),
+            # Journalist listings of their own newsletters.
+            models.Index(fields=['author', '-created_at', '-id'], name='newsletter_author_created_idx'),
+            models.Index(fields=['updated_at'], name='newsletter_updated_idx'),
+        ]
 
     def __str__(self):
         """
         Returns the title of the newsletter.
         """
         return self.title
+
+
+class FeedEntry(models.Model):
+    """
+    Materialised timeline row: an approved article in a reader's subscribed
+    feed. Filled on approval (fan-out-on-write) and kept in step with the
+    reader's subscriptions.
+    """
+    reader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    created_at = models.DateTimeField(
+        help_text="Copy of the article's created_at, so a feed page is one index range scan."
+    )
+    added_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the article entered the feed; delta sync reports entries added since a watermark."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reader', 'article'], name='feedentry_reader_article_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['reader', '-created_at', '-article'], name='feedentry_reader_created_idx'),
+            models.Index(fields=['reader', 'added_at'], name='feedentry_reader_added_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the feed entry.
+        """
+        return f"Article {self.article_id} in feed of user {self.reader_id}"
+
+
+class ArticleTombstone(models.Model):
+    """
+    Records that an approved article was deleted or withdrawn, so delta
+    sync can tell clients to drop it. Old tombstones are pruned with
+    ``manage.py prune_tombstones``.
+    """
+    REASON_DELETED = 'deleted'
+    REASON_WITHDRAWN = 'withdrawn'
+    REASON_CHOICES = [
+        (REASON_DELETED, 'Deleted'),
+        (REASON_WITHDRAWN, 'Withdrawn'),
+    ]
+
+    article_id = models.PositiveBigIntegerField(
+        help_text="Primary key of the article; not a foreign key since the article may be gone."
+    )
+    reason = models.CharField(max_length=16, choices=REASON_CHOICES)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the tombstone.
+        """
+        return f"Article {self.article_id} {self.reason} at {self.deleted_at}"
+
+
+class PublishEvent(models.Model):
+    """
+    Records that an article has been approved and must be fanned out to
+    subscribers. Each event owns one DeliveryJob per outbound channel.
+    There is at most one event per approval of an article (see
+    ``newsapp.approval``).
+    """
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='publish_events'
+    )
+    idempotency_key = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        help_text="Identifies the approval the event announces, so it is announced once."
+    )
+    withdrawn_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the article was withdrawn after this approval."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the publish event.
+        """
+        return f"Publish event for article {self.article_id}"
+
+
+class DeliveryJob(models.Model):
+    """
+    A unit of background work that delivers a publish event over a single
+    channel (email, social). Jobs are claimed by delivery workers and retried
+    with exponential backoff until they succeed or run out of attempts.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    event = models.ForeignKey(
+        PublishEvent,
+        on_delete=models.CASCADE,
+        related_name='jobs'
+    )
+    channel = models.CharField(max_length=20)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Earliest time a worker may pick up this job."
+    )
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    cursor = models.BigIntegerField(
+        blank=True,
+        null=True,
+        help_text="Id of the last recipient handled, so a retry resumes after it."
+    )
+    metrics = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Delivery figures from the last run (sent, failed, messages/s)."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['channel', 'status', 'available_at'],
+                name='deliveryjob_claim_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the delivery job.
+        """
+        return f"{self.channel} job {self.pk} ({self.status})"
+
+
+class DeliveryChannel(models.Model):
+    """
+    One row per delivery channel. Workers lock it while claiming the
+    channel's jobs, so claims for a channel happen one at a time and never
+    exceed its concurrency limit.
+    """
+    name = models.CharField(max_length=20, unique=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the delivery channel.
+        """
+        return self.name
+
+
+class SearchTerm(models.Model):
+    """
+    Posting in the pure-Python inverted search index: one row per term per
+    searchable document (see ``newsapp.search``). Used when the database
+    has no native full-text search.
+    """
+    KIND_ARTICLE = 'article'
+    KIND_NEWSLETTER = 'newsletter'
+    KIND_CHOICES = [
+        (KIND_ARTICLE, 'Article'),
+        (KIND_NEWSLETTER, 'Newsletter'),
+    ]
+
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    weight = models.FloatField(
+        help_text="Damped, title-boosted frequency of the term in the document."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'kind', 'object_id'], name='searchterm_posting_uniq'),
+        ]
+        indexes = [
+            # Re-indexing or deleting a document drops all its postings.
+            models.Index(fields=['kind', 'object_id'], name='searchterm_document_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the posting.
+        """
+        return f"{self.term!r} in {self.kind} {self.object_id}"
+
+
+class DigestRun(models.Model):
+    """
+    One mailing of daily or weekly digests for a time window. The readers
+    are split into DigestShard ranges that are sent, and checkpointed,
+    independently. There is one run per period and window, so sending a
+    window again resumes its run instead of starting over.
+    """
+    period = models.CharField(max_length=10, choices=CustomUser.DIGEST_CHOICES[1:])
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'window_end'], name='digest_run_window_unique'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the digest run.
+        """
+        return f"{self.get_period_display()} until {self.window_end:%Y-%m-%d %H:%M}"
+
+
+class DigestShard(models.Model):
+    """
+    The readers of a DigestRun whose ids fall in ``[first_id, last_id]``.
+    ``cursor`` is the id of the last reader handled, so an interrupted
+    shard resumes after it.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    run = models.ForeignKey(
+        DigestRun,
+        on_delete=models.CASCADE,
+        related_name='shards'
+    )
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    cursor = models.BigIntegerField(
+        blank=True,
+        null=True,
+        help_text="Id of the last reader handled, so a rerun resumes after it."
+    )
+    sent = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the digest shard.
+        """
+        return f"{self.run} readers {self.first_id}-{self.last_id}"
@@ -0,0 +1,241 @@
+"""
+Keyset (cursor) pagination on ``(created_at, id)``.
+
+Listings are ordered newest first. A page is fetched with a range
+condition on the last row the client saw instead of an OFFSET, so page
+1,000 costs the same single index range scan as page 1. Cursors are
+opaque, URL-safe tokens; clients only pass them back.
+
+The DRF pagination class lives in ``newsapp.api_pagination`` so that
+importing this module, as the signal handlers do, does not load DRF.
+"""
+
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a cursor token cannot be decoded.
+    """
+
+
+def encode_cursor(created_at, pk, reverse=False):
+    """
+    Returns an opaque token pointing at a row. ``reverse`` marks a cursor
+    that walks back towards newer rows.
+    """
+    payload = {'c': created_at.isoformat(), 'i': pk}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Returns ``(created_at, pk, reverse)`` for a token from encode_cursor().
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        created_at = parse_datetime(payload['c'])
+        pk = int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid cursor: {token!r}") from exc
+    if created_at is None:
+        raise InvalidCursor(f"Invalid cursor: {token!r}")
+    return created_at, pk, bool(payload.get('r'))
+
+
+def encode_watermark(moment):
+    """
+    Returns an opaque delta-sync watermark for a point in time.
+    """
+    raw = json.dumps({'w': moment.isoformat()}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_watermark(token):
+    """
+    Returns the datetime of a token from encode_watermark().
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        moment = parse_datetime(json.loads(raw)['w'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid watermark: {token!r}") from exc
+    if moment is None:
+        raise InvalidCursor(f"Invalid watermark: {token!r}")
+    return moment
+
+
+def page_size_from(params):
+    """
+    Returns the page size requested via ``?page_size=``, clamped to
+    NEWSAPP_MAX_PAGE_SIZE, or NEWSAPP_PAGE_SIZE when absent or invalid.
+    """
+    default = getattr(settings, 'NEWSAPP_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'NEWSAPP_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    try:
+        size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+class KeysetPage:
+    """
+    One page of results plus the cursors for its neighbours.
+    """
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.object_list = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _keyset_query(queryset, cursor, page_size, id_field):
+    """
+    Returns ``(queryset, reverse)``: the slice of ``queryset`` holding the
+    page after (or with a reverse cursor, before) the cursor's row, in
+    walking order, plus one extra row to tell whether more follow.
+    """
+    reverse = False
+    if cursor:
+        created_at, pk, reverse = decode_cursor(cursor)
+        # (created_at, id) past the cursor. The plain created_at bound is
+        # redundant but gives the planner an index range to seek to instead
+        # of scanning the index from the top.
+        if reverse:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(**{f'{id_field}__gt': pk}),
+                created_at__gte=created_at,
+            )
+        else:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(**{f'{id_field}__lt': pk}),
+                created_at__lte=created_at,
+            )
+
+    ordering = ('created_at', id_field) if reverse else ('-created_at', f'-{id_field}')
+    return queryset.order_by(*ordering)[:page_size + 1], reverse
+
+
+def keyset_paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, id_field='pk'):
+    """
+    Returns the KeysetPage of ``queryset`` (newest first) that follows, or
+    with a reverse cursor precedes, the row the cursor points at.
+
+    Rows are keyed on ``(created_at, <id_field>)``; ``id_field`` must be a
+    local attribute of the row, e.g. ``article_id`` on a feed entry.
+    """
+    queryset, reverse = _keyset_query(queryset, cursor, page_size, id_field)
+    rows = list(queryset)
+    return _build_page(rows[:page_size], len(rows) > page_size, cursor, reverse,
+                       key=lambda row: (row.created_at, getattr(row, id_field)))
+
+
+async def akeyset_paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, id_field='pk'):
+    """
+    Async version of keyset_paginate().
+    """
+    queryset, reverse = _keyset_query(queryset, cursor, page_size, id_field)
+    rows = [row async for row in queryset]
+    return _build_page(rows[:page_size], len(rows) > page_size, cursor, reverse,
+                       key=lambda row: (row.created_at, getattr(row, id_field)))
+
+
+def merge_pages(pages, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Merges KeysetPages of objects keyed on ``(created_at, pk)`` that were
+    fetched from different sources with the same cursor into one page.
+    Objects present in several sources are kept once.
+    """
+    reverse = bool(cursor) and decode_cursor(cursor)[2]
+    seen = set()
+    rows = []
+    for row in sorted((row for page in pages for row in page),
+                      key=lambda row: (row.created_at, row.pk), reverse=not reverse):
+        if row.pk not in seen:
+            seen.add(row.pk)
+            rows.append(row)
+
+    has_more = len(rows) > page_size or any(
+        page.has_previous if reverse else page.has_next for page in pages
+    )
+    return _build_page(rows[:page_size], has_more, cursor, reverse,
+                       key=lambda row: (row.created_at, row.pk))
+
+
+def _build_page(rows, has_more, cursor, reverse, key):
+    """
+    Turns rows fetched in walking order into a KeysetPage in display
+    (newest first) order with neighbour cursors. ``has_more`` tells whether
+    rows remain beyond this page in the walking direction.
+    """
+    if reverse:
+        rows.reverse()
+
+    # Walking forward, more rows mean a next page and having come from a
+    # cursor means a previous one; walking back it is the other way round.
+    has_next, has_previous = (True, has_more) if reverse else (has_more, bool(cursor))
+
+    next_cursor = previous_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(*key(rows[-1]))
+    if rows and has_previous:
+        previous_cursor = encode_cursor(*key(rows[0]), reverse=True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def paginate_request(request, queryset):
+    """
+    Paginates ``queryset`` with the ``cursor`` and ``page_size`` query
+    parameters of a Django request. Raises Http404 for a bad cursor.
+    """
+    try:
+        return keyset_paginate(
+            queryset,
+            cursor=request.GET.get('cursor'),
+            page_size=page_size_from(request.GET),
+        )
+    except InvalidCursor as exc:
+        raise Http404(str(exc))
+
+
+async def apaginate_request(request, queryset):
+    """
+    Async version of paginate_request().
+    """
+    try:
+        return await akeyset_paginate(
+            queryset,
+            cursor=request.GET.get('cursor'),
+            page_size=page_size_from(request.GET),
+        )
+    except InvalidCursor as exc:
+        raise Http404(str(exc))
@@ -0,0 +1,100 @@
+"""
+Role resolution for users (Reader, Editor, Journalist).
+
+A user's group names are loaded once per request and memoised on the user
+object, which ``AuthenticationMiddleware`` shares between views and the
+``in_group`` template filter. Across requests the names are kept in the
+Django cache under a key that includes ``CustomUser.updated_at``; group
+membership changes bump ``updated_at`` (see ``newsapp.signals``), so stale
+entries are never read.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+ROLE_CACHE_ATTR = '_newsapp_role_names'
+DEFAULT_ROLE_CACHE_TIMEOUT = 300
+
+
+def _cache_key(user):
+    updated_at = user.updated_at.isoformat() if user.updated_at else ''
+    return f"newsapp:roles:{user.pk}:{updated_at}"
+
+
+def _role_cache_timeout():
+    return getattr(settings, 'NEWSAPP_ROLE_CACHE_TIMEOUT', DEFAULT_ROLE_CACHE_TIMEOUT)
+
+
+def role_names(user):
+    """
+    Returns the lower-cased names of the groups the user belongs to.
+    Anonymous users have no roles.
+    """
+    cached = getattr(user, ROLE_CACHE_ATTR, None)
+    if cached is not None:
+        return cached
+
+    if not user.is_authenticated:
+        names = frozenset()
+    else:
+        key = _cache_key(user)
+        names = cache.get(key)
+        if names is None:
+            names = frozenset(
+                name.lower() for name in user.groups.values_list('name', flat=True)
+            )
+            cache.set(key, names, _role_cache_timeout())
+
+    setattr(user, ROLE_CACHE_ATTR, names)
+    return names
+
+
+async def arole_names(user):
+    """
+    Async version of role_names().
+    """
+    cached = getattr(user, ROLE_CACHE_ATTR, None)
+    if cached is not None:
+        return cached
+
+    if not user.is_authenticated:
+        names = frozenset()
+    else:
+        key = _cache_key(user)
+        names = await cache.aget(key)
+        if names is None:
+            names = frozenset([
+                name.lower() async for name in user.groups.values_list('name', flat=True)
+            ])
+            await cache.aset(key, names, _role_cache_timeout())
+
+    setattr(user, ROLE_CACHE_ATTR, names)
+    return names
+
+
+def has_role(user, role):
+    """
+    Checks whether the user belongs to the group named ``role``
+    (case-insensitive).
+    """
+    return role.lower() in role_names(user)
+
+
+async def ahas_role(user, role):
+    """
+    Async version of has_role().
+    """
+    return role.lower() in await arole_names(user)
+
+
+def invalidate_roles(user_ids):
+    """
+    Bumps ``updated_at`` for the given users so their cached roles are no
+    longer used. Returns the new timestamp.
+    """
+    from .models import CustomUser
+
+    now = timezone.now()
+    CustomUser.objects.filter(pk__in=list(user_ids)).update(updated_at=now)
+    return now
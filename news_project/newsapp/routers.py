@@ -0,0 +1,90 @@
+"""
+Read-replica routing.
+
+When a ``replica`` database is configured (``DB_REPLICA_HOST``, see
+settings), the read-only views wrapped with read_only() in the URLconfs
+read from it and everything else uses the primary. Routing is opt-in per
+view rather than for every read because replicas lag: a page that has
+just written, or that must see its own writes, has to read the primary.
+For the same reason a write made while serving a read-only view sends
+the rest of that request's reads back to the primary.
+
+Writes, migrations and every view not wrapped use the primary.
+"""
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+
+_read_from_replica = ContextVar('newsapp_read_from_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """
+    Sends the ORM reads made inside the block to the replica, if any.
+    """
+    token = _read_from_replica.set(replica_configured())
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def read_only(view):
+    """
+    Decorates a sync or async view so its GET and HEAD requests read from
+    the replica.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            with replica_reads():
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Routes reads inside replica_reads() to the replica; everything else
+    goes to the primary. Listed in DATABASE_ROUTERS when a replica is
+    configured.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Read your own writes for the rest of the request.
+        _read_from_replica.set(False)
+        # Explicitly the primary: Django would otherwise save an instance
+        # to the database it was read from.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
@@ -0,0 +1,478 @@
+"""
+Full-text search over approved articles and newsletters.
+
+Documents are matched on their title and body and ranked by relevance,
+with title matches weighted higher. The matching is done by a pluggable
+backend chosen with NEWSAPP_SEARCH_BACKEND:
+
+- ``MySQLFulltextBackend`` uses FULLTEXT indexes, which MySQL keeps up to
+  date by itself;
+- ``SQLiteFTSBackend`` uses an FTS5 table, updated from model signals;
+- ``InvertedIndexBackend`` keeps a term -> document index in SearchTerm
+  rows, for databases with neither.
+
+The default, ``'auto'``, uses the native backend when the database has
+one. Only approved articles are indexed. ``manage.py rebuild_search_index``
+re-indexes everything, e.g. after switching backends or bulk updates that
+bypass signals.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict, namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .mailer import chunked
+from .models import Article, Newsletter, SearchTerm
+from .pagination import InvalidCursor, KeysetPage
+
+KINDS = (SearchTerm.KIND_ARTICLE, SearchTerm.KIND_NEWSLETTER)
+TITLE_WEIGHT = 3
+MAX_QUERY_TERMS = 10
+BATCH_SIZE = 1000
+FTS_TABLE = 'newsapp_search_fts'
+FTS_VOCAB_TABLE = 'newsapp_search_fts_vocab'
+
+# Terms found in more than this share of documents barely change the
+# ranking but make every query rank most of the index, so they are
+# ignored when the query also has rarer terms.
+COMMON_TERM_RATIO = 0.5
+DOCUMENT_COUNT_TIMEOUT = 300
+
+STOP_WORDS = frozenset("""
+    an and are as at be but by for from has have in is it its of on or
+    that the their this to was were will with
+""".split())
+
+# One ranked match. ``kind`` is one of KINDS.
+SearchHit = namedtuple('SearchHit', ['kind', 'object_id', 'score'])
+
+
+def tokenize(text):
+    """
+    Returns the lower-cased index terms of ``text``, in order, without
+    stop words and single characters.
+    """
+    return [
+        token[:64] for token in re.findall(r'\w+', (text or '').lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def query_terms(query):
+    """
+    Returns the distinct terms of a search query, at most MAX_QUERY_TERMS.
+    """
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def document_kind(instance):
+    """
+    Returns the search kind of an Article or Newsletter.
+    """
+    if isinstance(instance, Article):
+        return SearchTerm.KIND_ARTICLE
+    return SearchTerm.KIND_NEWSLETTER
+
+
+def searchable(kind, using=DEFAULT_DB_ALIAS):
+    """
+    Returns the queryset of documents of ``kind`` that belong in the index.
+    """
+    if kind == SearchTerm.KIND_ARTICLE:
+        return Article.objects.using(using).filter(approved=True)
+    return Newsletter.objects.using(using).all()
+
+
+class SearchBackend:
+    """
+    Base class for search backends. Subclasses implement add(), remove(),
+    clear(), is_empty() and search(), and count_documents() if their
+    search uses plan().
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    def add(self, kind, documents):
+        """
+        Indexes documents of one kind that are not in the index yet.
+        """
+        raise NotImplementedError
+
+    def remove(self, kind, object_ids):
+        """
+        Drops documents of one kind from the index.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """
+        Empties the index.
+        """
+        raise NotImplementedError
+
+    def is_empty(self):
+        """
+        Checks whether nothing has been indexed yet.
+        """
+        raise NotImplementedError
+
+    def search(self, terms, kinds, offset, limit):
+        """
+        Returns up to ``limit`` SearchHits for documents of the given kinds
+        matching any of ``terms``, best first, skipping ``offset``.
+        """
+        raise NotImplementedError
+
+    def document_count(self):
+        """
+        Returns the number of searchable documents, cached for a few minutes.
+        """
+        return cache.get_or_set(
+            f"newsapp:search:documents:{self.using}",
+            lambda: sum(searchable(kind, self.using).count() for kind in KINDS),
+            DOCUMENT_COUNT_TIMEOUT,
+        )
+
+    def count_documents(self, terms):
+        """
+        Returns ``{term: number of documents containing it}``.
+        """
+        raise NotImplementedError
+
+    def term_frequencies(self, terms):
+        """
+        Returns the document count of each term that occurs in the index.
+        Counts are cached for a few minutes; they only steer ranking.
+        """
+        prefix = f"newsapp:search:df:{self.using}:"
+        cached = cache.get_many([prefix + term for term in terms])
+        frequencies = {key[len(prefix):]: df for key, df in cached.items()}
+        missing = [term for term in terms if term not in frequencies]
+        if missing:
+            counted = {term: df for term, df in self.count_documents(missing).items() if df}
+            cache.set_many({prefix + term: df for term, df in counted.items()},
+                           DOCUMENT_COUNT_TIMEOUT)
+            frequencies.update(counted)
+        return frequencies
+
+    def plan(self, terms):
+        """
+        Returns ``(total, frequencies, ranked)``: the number of documents,
+        the ``{term: documents}`` map of the terms to match and whether to
+        rank by relevance. Common terms are dropped when the query has
+        rarer ones. A query of only common terms matches its rarest term
+        and lists the newest documents first: relevance barely separates
+        them and ranking would read most of the index.
+        """
+        frequencies = self.term_frequencies(terms)
+        if not frequencies:
+            return 0, {}, False
+        total = max(self.document_count(), *frequencies.values())
+        rare = {term: df for term, df in frequencies.items() if df <= total * COMMON_TERM_RATIO}
+        if rare:
+            return total, rare, True
+        rarest = min(frequencies, key=frequencies.get)
+        return total, {rarest: frequencies[rarest]}, False
+
+    def update(self, instance):
+        """
+        Re-indexes a saved article or newsletter, or drops it when it is no
+        longer searchable (an article that was withdrawn).
+        """
+        kind = document_kind(instance)
+        with transaction.atomic(using=self.using):
+            self.remove(kind, [instance.pk])
+            if kind == SearchTerm.KIND_NEWSLETTER or instance.approved:
+                self.add(kind, [instance])
+
+    def rebuild(self, batch_size=BATCH_SIZE):
+        """
+        Re-indexes every searchable document. Returns the number indexed.
+        """
+        self.clear()
+        indexed = 0
+        for kind in KINDS:
+            documents = searchable(kind, self.using).only('pk', 'title', 'content').order_by('pk')
+            for batch in chunked(documents.iterator(chunk_size=batch_size), batch_size):
+                with transaction.atomic(using=self.using):
+                    self.add(kind, batch)
+                indexed += len(batch)
+        return indexed
+
+
+class InvertedIndexBackend(SearchBackend):
+    """
+    Database-agnostic backend storing one SearchTerm posting per term per
+    document. Documents are ranked by the sum of their term weights times
+    each term's inverse document frequency.
+    """
+
+    @staticmethod
+    def postings(kind, document):
+        """
+        Returns the SearchTerm rows for one document.
+        """
+        counts = Counter()
+        for term in tokenize(document.title):
+            counts[term] += TITLE_WEIGHT
+        for term in tokenize(document.content):
+            counts[term] += 1
+        return [
+            SearchTerm(term=term, kind=kind, object_id=document.pk,
+                       weight=1 + math.log(count))
+            for term, count in counts.items()
+        ]
+
+    def add(self, kind, documents):
+        rows = [row for document in documents for row in self.postings(kind, document)]
+        SearchTerm.objects.using(self.using).bulk_create(rows, batch_size=BATCH_SIZE)
+
+    def remove(self, kind, object_ids):
+        SearchTerm.objects.using(self.using).filter(
+            kind=kind, object_id__in=list(object_ids)
+        ).delete()
+
+    def clear(self):
+        SearchTerm.objects.using(self.using).all().delete()
+
+    def is_empty(self):
+        return not SearchTerm.objects.using(self.using).exists()
+
+    def count_documents(self, terms):
+        return dict(
+            SearchTerm.objects.using(self.using).filter(term__in=terms)
+            .values_list('term').annotate(documents=Count('pk')).order_by()
+        )
+
+    def search(self, terms, kinds, offset, limit):
+        total, frequencies, ranked = self.plan(terms)
+        if not frequencies:
+            return []
+        postings = SearchTerm.objects.using(self.using).filter(
+            term__in=list(frequencies), kind__in=kinds
+        )
+
+        if not ranked:
+            # Newest first, straight off the (term, kind, object_id) index.
+            rows = postings.order_by('-kind', '-object_id').values_list(
+                'kind', 'object_id', 'weight')[offset:offset + limit]
+            return [SearchHit(*row) for row in rows]
+
+        idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in frequencies.items()
+        }
+        score = Sum(
+            Case(
+                *(When(term=term, then=F('weight') * Value(weight)) for term, weight in idf.items()),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+        rows = (
+            postings.values('kind', 'object_id')
+            .annotate(score=score)
+            .order_by('-score', '-object_id')[offset:offset + limit]
+        )
+        return [SearchHit(row['kind'], row['object_id'], row['score']) for row in rows]
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Backend on an SQLite FTS5 table ranked with bm25(). Both kinds share
+    the table; the rowid encodes the kind and the object id. Document
+    frequencies come from the table's fts5vocab companion.
+    """
+
+    @staticmethod
+    def rowid(kind, object_id):
+        return object_id * len(KINDS) + KINDS.index(kind)
+
+    def add(self, kind, documents):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [(self.rowid(kind, doc.pk), doc.title, doc.content) for doc in documents],
+            )
+
+    def remove(self, kind, object_ids):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                [(self.rowid(kind, object_id),) for object_id in object_ids],
+            )
+
+    def clear(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def is_empty(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM {FTS_TABLE} LIMIT 1")
+            return cursor.fetchone() is None
+
+    def count_documents(self, terms):
+        # fts5vocab only seeks for a single ``term =`` constraint.
+        frequencies = {}
+        with connections[self.using].cursor() as cursor:
+            for term in terms:
+                cursor.execute(f"SELECT doc FROM {FTS_VOCAB_TABLE} WHERE term = %s", [term])
+                row = cursor.fetchone()
+                frequencies[term] = row[0] if row else 0
+        return frequencies
+
+    def search(self, terms, kinds, offset, limit):
+        total, frequencies, ranked = self.plan(terms)
+        if not frequencies:
+            return []
+
+        # Quoted terms are matched literally, so FTS5 query syntax in user
+        # input has no effect.
+        params = [' OR '.join(f'"{term}"' for term in frequencies)]
+        kind_filter = ''
+        if set(kinds) != set(KINDS):
+            kind_filter = f"AND rowid %% {len(KINDS)} IN ({', '.join(['%s'] * len(kinds))})"
+            params += [KINDS.index(kind) for kind in kinds]
+        order = 'rank, rowid DESC' if ranked else 'rowid DESC'
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1) AS rank "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {kind_filter} "
+                f"ORDER BY {order} LIMIT %s OFFSET %s",
+                params + [limit, offset],
+            )
+            return [
+                SearchHit(KINDS[rowid % len(KINDS)], rowid // len(KINDS), -rank)
+                for rowid, rank in cursor.fetchall()
+            ]
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """
+    Backend on MySQL FULLTEXT indexes over ``(title, content)`` in natural
+    language mode. MySQL maintains the indexes and ranks the matches, so
+    there is nothing to update and plan() is not used.
+    """
+
+    def add(self, kind, documents):
+        pass
+
+    def remove(self, kind, object_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def is_empty(self):
+        return False
+
+    def search(self, terms, kinds, offset, limit):
+        query = ' '.join(terms)
+        hits = []
+        for kind in kinds:
+            queryset = searchable(kind, self.using)
+            table = queryset.model._meta.db_table
+            relevance = RawSQL(
+                f"MATCH ({table}.title, {table}.content) AGAINST (%s IN NATURAL LANGUAGE MODE)",
+                (query,),
+                output_field=FloatField(),
+            )
+            rows = (
+                queryset.annotate(score=relevance)
+                .filter(score__gt=0)
+                .order_by('-score', '-pk')
+                .values_list('pk', 'score')[:offset + limit]
+            )
+            hits += [SearchHit(kind, pk, score) for pk, score in rows]
+        hits.sort(key=lambda hit: (hit.score, hit.object_id), reverse=True)
+        return hits[offset:offset + limit]
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(using, name):
+    return FTS_TABLE in connections[using].introspection.table_names()
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    """
+    Returns the search backend for a database alias, as configured by
+    NEWSAPP_SEARCH_BACKEND: ``'auto'`` or the dotted path of a
+    SearchBackend subclass.
+    """
+    path = getattr(settings, 'NEWSAPP_SEARCH_BACKEND', 'auto')
+    if path != 'auto':
+        return import_string(path)(using)
+
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        return MySQLFulltextBackend(using)
+    if connection.vendor == 'sqlite' and _has_fts_table(using, connection.settings_dict['NAME']):
+        return SQLiteFTSBackend(using)
+    return InvertedIndexBackend(using)
+
+
+def _decode_offset(cursor):
+    if not cursor:
+        return 0
+    try:
+        offset = int(cursor)
+    except ValueError:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from None
+    if offset < 0:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return offset
+
+
+def _load(hits, using):
+    """
+    Returns the articles and newsletters behind ``hits`` in hit order, each
+    with ``search_kind`` and ``search_score`` set. Documents deleted or
+    withdrawn since they were indexed are left out.
+    """
+    ids = defaultdict(list)
+    for hit in hits:
+        ids[hit.kind].append(hit.object_id)
+    loaded = {
+        kind: searchable(kind, using).for_listing().in_bulk(object_ids)
+        for kind, object_ids in ids.items()
+    }
+
+    documents = []
+    for hit in hits:
+        document = loaded[hit.kind].get(hit.object_id)
+        if document is not None:
+            document.search_kind = hit.kind
+            document.search_score = hit.score
+            documents.append(document)
+    return documents
+
+
+def search_page(query, cursor=None, page_size=20, kinds=None, using=None):
+    """
+    Returns a KeysetPage of the articles and newsletters matching
+    ``query``, best match first. ``kinds`` limits the result to some of
+    KINDS. The cursors are opaque positions in the ranking. ``using``
+    defaults to the database the routers read articles from, e.g. the
+    replica inside read-only views.
+    """
+    if using is None:
+        using = router.db_for_read(Article)
+    offset = _decode_offset(cursor)
+    terms = query_terms(query)
+    if not terms:
+        return KeysetPage([])
+
+    kinds = [kind for kind in KINDS if kind in (kinds or KINDS)] or list(KINDS)
+    hits = get_backend(using).search(terms, kinds, offset, page_size + 1)
+    next_cursor = str(offset + page_size) if len(hits) > page_size else None
+    previous_cursor = str(max(offset - page_size, 0)) if offset else None
+    return KeysetPage(_load(hits[:page_size], using), next_cursor, previous_cursor)
@@ -1,13 +1,142 @@
 # newsapp/serializers.py
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from .approval import MAX_BATCH
 from .models import Article
+from .subscriptions import clean_journalist_ids, clean_publisher_ids
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients ask for a subset of a serializer's fields with
+    ``?fields=title,created_at``. Unknown names are ignored; an empty or
+    missing parameter keeps every field.
+
+    ``model_fields`` maps each serializer field to the model fields (or
+    related lookups) it reads, so views can load only those with
+    ``queryset.only(*serializer_class.load_fields(names))``.
+    """
+    model_fields = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            request = self.context.get('request')
+            fields = self.requested_fields(request.query_params if request else {})
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @staticmethod
+    def requested_fields(params):
+        """
+        Returns the field names listed in ``?fields=``, or None.
+        """
+        raw = params.get('fields')
+        if not raw:
+            return None
+        return [name.strip() for name in raw.split(',') if name.strip()]
+
+    @classmethod
+    def load_fields(cls, names=None):
+        """
+        Returns the model fields needed to render ``names`` (all fields when
+        ``names`` is empty).
+        """
+        names = [n for n in (names or cls.model_fields) if n in cls.model_fields] or cls.model_fields
+        loaded = []
+        for name in names:
+            for field in cls.model_fields[name]:
+                if field not in loaded:
+                    loaded.append(field)
+        return loaded
+
+
+class ArticleListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact representation for article listings and feeds. Leaves out the
+    article body; fetch it from the detail endpoint.
+    """
+    author_name = serializers.CharField(source='author.username', read_only=True)
+    publisher_name = serializers.CharField(source='publisher.name', read_only=True)
+
+    model_fields = {
+        'id': ['id'],
+        'title': ['title'],
+        'summary': ['summary'],
+        'author_name': ['author__username'],
+        'publisher_name': ['publisher__name'],
+        'created_at': ['created_at'],
+        'updated_at': ['updated_at'],
+    }
+
+    class Meta:
+        model = Article
+        fields = ['id', 'title', 'summary', 'author_name', 'publisher_name',
+                  'created_at', 'updated_at']
+        read_only_fields = fields
 
 
 class ArticleSerializer(serializers.ModelSerializer):
-    related = serializers.PrimaryKeyRelatedField(read_only=True)
-    # Or, if you want nested data:
-    # related = ArticleSerializer(read_only=True)
+    """
+    Full article representation, including the body.
+    """
+    author_name = serializers.CharField(source='author.username', read_only=True)
+    publisher_name = serializers.CharField(source='publisher.name', read_only=True)
 
     class Meta:
         model = Article
         fields = '__all__'
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """
+    One search hit: an article or newsletter with its relevance score.
+    """
+    type = serializers.CharField(source='search_kind', read_only=True)
+    id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(read_only=True)
+    author_name = serializers.CharField(source='author.username', read_only=True)
+    publisher_name = serializers.CharField(source='publisher.name', read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    score = serializers.FloatField(source='search_score', read_only=True)
+
+
+def _validated_ids(clean, ids):
+    try:
+        return clean(ids)
+    except DjangoValidationError as exc:
+        raise serializers.ValidationError(exc.messages)
+
+
+class SubscriptionsSerializer(serializers.Serializer):
+    """
+    A reader's subscriptions as lists of ids. On input either list may be
+    left out to keep that relation as it is; only the submitted ids are
+    looked up.
+    """
+    publishers = serializers.ListField(child=serializers.IntegerField(), required=False)
+    journalists = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate_publishers(self, value):
+        return _validated_ids(clean_publisher_ids, value)
+
+    def validate_journalists(self, value):
+        return _validated_ids(clean_journalist_ids, value)
+
+
+class BulkSubscribeSerializer(serializers.Serializer):
+    """
+    Reader ids to subscribe to a publisher in one call.
+    """
+    reader_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class ReviewSerializer(serializers.Serializer):
+    """
+    A bulk decision on articles in the review queue.
+    """
+    action = serializers.ChoiceField(choices=['approve', 'reject'])
+    article_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=MAX_BATCH,
+    )
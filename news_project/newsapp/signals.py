@@ -1,99 +1,261 @@
 """
-This module handles signal-based notifications and permission assignments
-for the Django News Publishing application. It includes:
+This module handles signal-based notifications for the Django News
+Publishing application. It includes:
 
-- Assigning appropriate permissions to the Editor group.
-- Sending email notifications and optional social media updates
-  when an article is approved.
+- Queueing email notifications and optional social media updates
+  when an article becomes approved.
+- Invalidating cached user roles when group membership changes.
+- Keeping precomputed reader feeds in step with approvals and
+  subscription changes.
+- Keeping the search index in step with saved and deleted articles and
+  newsletters.
+- Invalidating cached page fragments when articles, newsletters or
+  publishers change.
+- Maintaining the subscriber, article and follower counters.
 """
 
-import requests
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.db import transaction
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
-from django.apps import apps
+from django.utils import timezone
 
-from .models import Article, CustomUser
+from . import approval, caching, counters, feed, live, search
+from .models import Article, ArticleTombstone, CustomUser, FeedEntry, Newsletter, Publisher
+from .roles import ROLE_CACHE_ATTR, invalidate_roles
 
 
-def assign_editor_permissions():
+@receiver(pre_save, sender=Article)
+def article_approval_before_save(sender, instance, **kwargs):
     """
-    Assigns view, change, and delete permissions for both Article and Newsletter
-    models to the 'Editor' group. Creates the group if it doesn't exist.
+    Signal handler that notes whether the save approves or withdraws the
+    article, before the stored approval is overwritten.
     """
-    editor_group, created = Group.objects.get_or_create(name='Editor')
+    instance._approval_change = approval.approval_change(instance)
 
-    Article = apps.get_model('newsapp', 'Article')
-    Newsletter = apps.get_model('newsapp', 'Newsletter')
 
-    article_ct = ContentType.objects.get_for_model(Article)
-    newsletter_ct = ContentType.objects.get_for_model(Newsletter)
+@receiver(post_save, sender=Article)
+def article_approved_signal(sender, instance, created, **kwargs):
+    """
+    Signal handler that queues subscriber notifications when an article
+    becomes approved.
 
-    # Permissions for Article
-    article_perms = Permission.objects.filter(
-        content_type=article_ct,
-        codename__in=['view_article', 'change_article', 'delete_article']
-    )
-    # Permissions for Newsletter
-    newsletter_perms = Permission.objects.filter(
-        content_type=newsletter_ct,
-        codename__in=['view_newsletter', 'change_newsletter', 'delete_newsletter']
-    )
+    Saves of an article that was already approved notify nobody. The
+    email and X (formerly Twitter) fan-out runs in the delivery workers in
+    ``newsapp.delivery``: a PublishEvent is recorded once the approval
+    commits, at most once per approval (see ``newsapp.approval``), and
+    connected live streams get the article at the same time.
+    """
+    change = getattr(instance, '_approval_change', None)
+    instance._approval_change = None
+    if change == 'approved':
+        approval.article_approved(instance)
+    elif change == 'withdrawn':
+        approval.article_withdrawn(instance)
+        # Withdrawn articles leave every feed straight away; delta sync
+        # learns about it from a tombstone.
+        removed, _ = FeedEntry.objects.filter(article=instance).delete()
+        if removed or Publisher.objects.filter(pk=instance.publisher_id, fan_out_on_read=True).exists():
+            feed.record_tombstones([instance.pk], ArticleTombstone.REASON_WITHDRAWN)
 
-    # Add all permissions to the group
-    for perm in list(article_perms) + list(newsletter_perms):
-        editor_group.permissions.add(perm)
+
+@receiver(post_delete, sender=Article)
+def article_deleted_signal(sender, instance, **kwargs):
+    """
+    Signal handler that records a tombstone for a deleted approved article
+    so delta-syncing clients drop it.
+    """
+    if instance.approved:
+        feed.record_tombstones([instance.pk], ArticleTombstone.REASON_DELETED)
 
 
 @receiver(post_save, sender=Article)
-def article_approved_signal(sender, instance, created, **kwargs):
+@receiver(post_save, sender=Newsletter)
+def search_document_saved(sender, instance, using, update_fields, **kwargs):
+    """
+    Signal handler that re-indexes an article or newsletter for search
+    when its text or approval changes. Withdrawn articles leave the index.
+    """
+    if update_fields is not None and not {'title', 'content', 'approved'} & set(update_fields):
+        return
+    search.get_backend(using).update(instance)
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Newsletter)
+def search_document_deleted(sender, instance, using, **kwargs):
+    """
+    Signal handler that drops a deleted article or newsletter from the
+    search index.
+    """
+    search.get_backend(using).remove(search.document_kind(instance), [instance.pk])
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def article_changed(sender, instance, using, **kwargs):
+    """
+    Signal handler that invalidates the cached page and listings showing
+    a saved or deleted article, once the change commits.
+    """
+    caching.bump_on_commit(f'article:{instance.pk}', 'articles', using=using)
+
+
+@receiver(post_save, sender=Newsletter)
+@receiver(post_delete, sender=Newsletter)
+def newsletter_changed(sender, instance, using, **kwargs):
+    """
+    Signal handler that invalidates cached newsletter listings once the
+    change commits.
+    """
+    caching.bump_on_commit('newsletters', using=using)
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def publisher_changed(sender, instance, using, **kwargs):
+    """
+    Signal handler that invalidates every cached fragment showing
+    publisher details once the change commits.
+    """
+    caching.bump_on_commit('publishers', using=using)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal handler that invalidates cached roles for every user whose
+    group membership changed, from either side of the relation.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        instance.__dict__.pop(ROLE_CACHE_ATTR, None)
+        instance.updated_at = invalidate_roles([instance.pk])
+    elif action == 'pre_clear':
+        invalidate_roles(instance.user_set.values_list('pk', flat=True))
+    else:
+        invalidate_roles(pk_set)
+
+
+def _subscription_change(instance, reverse, pk_set):
+    """
+    Normalises an m2m_changed call into ``(reader_ids, target_ids)``.
+    """
+    if reverse:
+        return list(pk_set or ()), [instance.pk]
+    return [instance.pk], list(pk_set) if pk_set is not None else None
+
+
+def _touch_readers(instance, reverse, reader_ids):
+    """
+    Bumps ``updated_at`` for readers whose subscriptions changed, which
+    changes the validators of their feed for conditional GETs and resets
+    delta sync, and resets their live streams.
+    """
+    now = timezone.now()
+    CustomUser.objects.filter(pk__in=reader_ids).update(updated_at=now)
+    if not reverse:
+        instance.updated_at = now
+    # Open live streams reconnect to pick up the new channels.
+    transaction.on_commit(lambda: live.reset_readers(reader_ids), robust=True)
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_publishers.through)
+def publisher_subscriptions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal handler that backfills or prunes feeds when readers subscribe to
+    or unsubscribe from publishers.
+    """
+    if action == 'post_add':
+        reader_ids, publisher_ids = _subscription_change(instance, reverse, pk_set)
+        feed.backfill(reader_ids, publisher_ids=publisher_ids)
+    elif action == 'post_remove':
+        reader_ids, publisher_ids = _subscription_change(instance, reverse, pk_set)
+        feed.prune_publishers(reader_ids, publisher_ids)
+    elif action == 'pre_clear' and reverse:
+        reader_ids = list(instance.subsubers.values_list('pk', flat=True))
+        feed.prune_publishers(reader_ids, [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        reader_ids = [instance.pk]
+        feed.prune_publishers(reader_ids)
+    else:
+        return
+    _touch_readers(instance, reverse, reader_ids)
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_journalists.through)
+def journalist_subscriptions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal handler that backfills or prunes feeds when readers follow or
+    unfollow journalists.
+    """
+    if action == 'post_add':
+        reader_ids, journalist_ids = _subscription_change(instance, reverse, pk_set)
+        feed.backfill(reader_ids, journalist_ids=journalist_ids)
+    elif action == 'post_remove':
+        reader_ids, journalist_ids = _subscription_change(instance, reverse, pk_set)
+        feed.prune_journalists(reader_ids, journalist_ids)
+    elif action == 'pre_clear' and reverse:
+        reader_ids = list(instance.journalist_followers.values_list('pk', flat=True))
+        feed.prune_journalists(reader_ids, [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        reader_ids = [instance.pk]
+        feed.prune_journalists(reader_ids)
+    else:
+        return
+    _touch_readers(instance, reverse, reader_ids)
+
+
+@receiver(pre_save, sender=Article)
+def article_counts_before_save(sender, instance, **kwargs):
+    """
+    Signal handler that makes sure the article's stored approval and
+    publisher are known, so the save can be counted.
+    """
+    counters.load_article_state(instance)
+
+
+@receiver(post_save, sender=Article)
+def article_counts_saved(sender, instance, created, **kwargs):
+    """
+    Signal handler that updates publishers' article counts when an
+    article is approved, withdrawn or moved to another publisher.
+    """
+    counters.article_saved(instance, created)
+
+
+@receiver(post_delete, sender=Article)
+def article_counts_deleted(sender, instance, **kwargs):
+    """
+    Signal handler that uncounts a deleted approved article.
+    """
+    counters.article_deleted(instance)
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_publishers.through)
+def publisher_subscriber_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal handler that keeps publishers' subscriber counts in step with
+    subscriptions.
+    """
+    counters.subscriptions_changed(sender, 'customuser_id', 'publisher_id', 'subscriber_count',
+                                   instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=CustomUser.subscribed_journalists.through)
+def journalist_follower_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal handler that keeps journalists' follower counts in step with
+    follows.
+    """
+    counters.subscriptions_changed(sender, 'from_customuser_id', 'to_customuser_id', 'follower_count',
+                                   instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def user_counts_deleted(sender, instance, **kwargs):
+    """
+    Signal handler that uncounts a deleted user's subscriptions.
     """
-    Signal handler that sends email notifications to subscribers and posts
-    to X (formerly Twitter) when an article is approved.
-
-    This function:
-    - Finds all Readers subscribed to the article's publisher.
-    - Finds all Journalists subscribed to the article's author.
-    - Sends email notifications to all subscriber emails.
-    - Posts to X if TWITTER_BEARER_TOKEN is configured.
-    """
-    if instance.approved and not created:
-        # Get all subscribers (Readers subscribed to publisher + Journalists)
-        reader_subs = CustomUser.objects.filter(
-            role='Reader',
-            subscribed_publishers=instance.publisher
-        )
-        journalist_subs = CustomUser.objects.filter(
-            role='Journalist',
-            subscribed_journalists=instance.author
-        )
-        subscribers = reader_subs.union(journalist_subs).distinct()
-
-        recipient_list = [user.email for user in subscribers if user.email]
-
-        if recipient_list:
-            subject = f"New Article Published: {instance.title}"
-            message = f"{instance.title}\n\n{instance.content}"
-            from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "news@example.com")
-
-            send_mail(subject, message, from_email, recipient_list)
-
-        # Optional: Post to X (Twitter)
-        try:
-            x_post = {
-                "text": f"New article published: {instance.title} by {instance.author.username}"
-            }
-            bearer_token = getattr(settings, "TWITTER_BEARER_TOKEN", None)
-
-            if bearer_token:
-                response = requests.post(
-                    "https://api.twitter.com/2/tweets",
-                    json=x_post,
-                    headers={"Authorization": f"Bearer {bearer_token}"}
-                )
-                response.raise_for_status()
-        except Exception as e:
-            print(f"[X] Failed to post: {e}")
+    counters.user_deleted(instance)
@@ -0,0 +1,322 @@
+"""
+Outbound client for posting approved articles to X (formerly Twitter).
+
+The delivery workers post through one SocialClient per process:
+
+- requests go through a pooled ``requests.Session``, so consecutive posts
+  reuse a kept-alive TLS connection instead of handshaking each time;
+- every request has strict connect and read timeouts, so a slow API can
+  hold a delivery thread for seconds, never indefinitely;
+- 429 and 5xx responses and connection errors are retried a few times
+  with jittered exponential backoff. A 429 waits for the ``Retry-After``
+  or ``x-rate-limit-reset`` time the API asks for; a wait longer than the
+  backoff cap is handed back to the caller as Unavailable instead of
+  sleeping;
+- a circuit breaker counts consecutive failures. Once it opens, posts fail
+  fast with Unavailable until the reset timeout has passed, then a single
+  trial request decides whether to close it again.
+
+``requests`` is only imported when the first post is made, so processes
+that never post do not pay for it.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCIAL_SETTINGS = {
+    'API_URL': 'https://api.twitter.com/2/tweets',
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 30,
+    'POOL_SIZE': 4,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 60,
+}
+
+
+def social_setting(name):
+    """
+    Returns a social posting setting, falling back to
+    DEFAULT_SOCIAL_SETTINGS.
+    """
+    configured = getattr(settings, 'NEWSAPP_SOCIAL', {})
+    return configured.get(name, DEFAULT_SOCIAL_SETTINGS[name])
+
+
+class SocialError(Exception):
+    """
+    A post that failed, after any retries the client makes itself.
+    """
+
+
+class Rejected(SocialError):
+    """
+    The API refused the post itself (bad token, duplicate post, ...);
+    retrying it unchanged will not help.
+    """
+
+
+class Unavailable(SocialError):
+    """
+    The API cannot take posts right now: the circuit is open or the rate
+    limit resets later than we are willing to wait. ``retry_after`` is the
+    number of seconds after which to try again.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of a remote service. After
+    ``failure_threshold`` of them the circuit opens and allow() refuses
+    calls for ``reset_timeout`` seconds; then one trial call is let
+    through (half-open), and its outcome closes or reopens the circuit.
+    Thread-safe.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def retry_after(self):
+        """
+        Returns the seconds until the open circuit lets a trial call
+        through.
+        """
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def allow(self):
+        """
+        Returns whether a call may be made now. In the half-open state only
+        one caller at a time is allowed.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+
+class SocialClient:
+    """
+    Posts to the X API over a pooled session, with timeouts, retries and a
+    circuit breaker (see the module docstring). ``metrics`` counts what
+    happened to the posts this client made, across every thread using it.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, bearer_token, api_url=None, breaker=None, sleep=time.sleep):
+        self.bearer_token = bearer_token
+        self.api_url = api_url or social_setting('API_URL')
+        self.timeout = (social_setting('CONNECT_TIMEOUT'), social_setting('READ_TIMEOUT'))
+        self.max_retries = social_setting('MAX_RETRIES')
+        self.backoff_base = social_setting('BACKOFF_BASE')
+        self.backoff_max = social_setting('BACKOFF_MAX')
+        self.breaker = breaker or CircuitBreaker(
+            social_setting('FAILURE_THRESHOLD'), social_setting('RESET_TIMEOUT'),
+        )
+        self.sleep = sleep
+        self.metrics = Counter()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Returns the pooled session, creating it on first use.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=social_setting('POOL_SIZE'))
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['Authorization'] = f"Bearer {self.bearer_token}"
+                    self._session = session
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def backoff(self, attempt):
+        """
+        Returns the delay before retry number ``attempt`` (from 1):
+        exponential, capped, with full jitter.
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def post(self, text, metrics=None):
+        """
+        Posts ``text`` and returns the API's JSON response. Raises
+        Unavailable when the API should be tried again later, Rejected when
+        the API refused the post and SocialError when it kept failing.
+        Pass a Counter as ``metrics`` to get the counts of this call alone.
+        """
+        import requests
+
+        calls = (self.metrics,) if metrics is None else (self.metrics, metrics)
+
+        def count(name):
+            for counter in calls:
+                counter[name] += 1
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                count('short_circuited')
+                raise Unavailable("Circuit open; not posting.", self.breaker.retry_after())
+
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.api_url, json={'text': text}, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                status, delay, error = None, None, f"{type(exc).__name__}: {exc}"
+            else:
+                status, error = response.status_code, f"HTTP {response.status_code}"
+                delay = retry_after(response) if status == 429 else None
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            if status is not None and status < 400:
+                self.breaker.record_success()
+                count('posted')
+                logger.info("Posted to X", extra={
+                    'status': status, 'attempt': attempt + 1, 'elapsed_ms': elapsed_ms,
+                })
+                return response.json() if response.content else {}
+
+            if status is not None and status not in self.RETRY_STATUSES:
+                # The request itself is wrong (bad token, duplicate post):
+                # the API is up, so this is no reason to open the circuit.
+                self.breaker.record_success()
+                count('rejected')
+                logger.error("X rejected the post", extra={
+                    'status': status, 'attempt': attempt + 1, 'elapsed_ms': elapsed_ms,
+                })
+                raise Rejected(f"X rejected the post: {error}")
+
+            if status == 429:
+                # Rate limiting means the API is up; it never opens the
+                # circuit.
+                self.breaker.record_success()
+                count('rate_limited')
+            else:
+                self.breaker.record_failure()
+                count('failed_attempts')
+            logger.warning("Posting to X failed", extra={
+                'status': status, 'error': error, 'attempt': attempt + 1,
+                'elapsed_ms': elapsed_ms, 'circuit': self.breaker.state,
+            })
+
+            if delay is None:
+                delay = self.backoff(attempt + 1)
+            if delay > self.backoff_max:
+                raise Unavailable(f"Rate limited by X for {delay:.0f}s.", delay)
+            if attempt < self.max_retries:
+                count('retries')
+                self.sleep(delay)
+
+        if status == 429:
+            raise Unavailable("Still rate limited by X.", delay)
+        raise SocialError(f"Posting to X failed after {self.max_retries + 1} attempts: {error}")
+
+
+def retry_after(response):
+    """
+    Returns the seconds a 429 response asks us to wait, from its
+    ``Retry-After`` header (seconds or an HTTP date) or X's
+    ``x-rate-limit-reset`` epoch timestamp, or None if it does not say.
+    """
+    header = response.headers.get('Retry-After')
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = response.headers.get('x-rate-limit-reset')
+    if reset:
+        try:
+            return max(0.0, float(reset) - time.time())
+        except ValueError:
+            pass
+    return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns this process's SocialClient, or None if no
+    ``TWITTER_BEARER_TOKEN`` is configured. The client, its connection
+    pool and its circuit breaker are shared by every delivery thread.
+    """
+    global _client
+    bearer_token = getattr(settings, "TWITTER_BEARER_TOKEN", None)
+    if not bearer_token:
+        return None
+    with _client_lock:
+        if _client is None or (_client.bearer_token, _client.api_url) != (
+                bearer_token, social_setting('API_URL')):
+            if _client is not None:
+                _client.close()
+            _client = SocialClient(bearer_token)
+        return _client
@@ -0,0 +1,138 @@
+// Type-ahead picker for <select multiple data-autocomplete-url="...">.
+// The select keeps the chosen options (and is what the form submits);
+// it is hidden behind a list of removable badges and a search box that
+// asks the autocomplete endpoint for matching names as the user types.
+(function () {
+    'use strict';
+
+    var DELAY = 200;
+    var PAGE_SIZE = 10;
+
+    function enhance(select) {
+        var wrapper = document.createElement('div');
+        var chosen = document.createElement('div');
+        var input = document.createElement('input');
+        var results = document.createElement('div');
+        var more = null;
+        var timer = null;
+        var request = 0;
+
+        chosen.className = 'mb-2';
+        input.type = 'search';
+        input.className = 'form-control';
+        input.placeholder = 'Type a name…';
+        input.autocomplete = 'off';
+        input.setAttribute('aria-label', select.getAttribute('aria-label') || 'Search');
+        results.className = 'list-group mt-1';
+
+        select.hidden = true;
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.appendChild(chosen);
+        wrapper.appendChild(input);
+        wrapper.appendChild(results);
+        wrapper.appendChild(select);
+
+        function renderChosen() {
+            chosen.textContent = '';
+            Array.prototype.forEach.call(select.options, function (option) {
+                if (!option.selected) {
+                    return;
+                }
+                var badge = document.createElement('span');
+                var remove = document.createElement('button');
+                badge.className = 'badge bg-secondary me-1 mb-1';
+                badge.textContent = option.text + ' ';
+                remove.type = 'button';
+                remove.className = 'btn-close btn-close-white btn-sm';
+                remove.setAttribute('aria-label', 'Remove ' + option.text);
+                remove.addEventListener('click', function () {
+                    option.remove();
+                    renderChosen();
+                });
+                badge.appendChild(remove);
+                chosen.appendChild(badge);
+            });
+        }
+
+        function choose(item) {
+            var exists = Array.prototype.some.call(select.options, function (option) {
+                return option.value === String(item.id);
+            });
+            if (!exists) {
+                select.add(new Option(item.text, item.id, true, true));
+            }
+            renderChosen();
+            input.value = '';
+            results.textContent = '';
+            input.focus();
+        }
+
+        function show(data, append) {
+            if (!append) {
+                results.textContent = '';
+            }
+            if (more) {
+                more.remove();
+                more = null;
+            }
+            data.results.forEach(function (item) {
+                var button = document.createElement('button');
+                button.type = 'button';
+                button.className = 'list-group-item list-group-item-action';
+                button.textContent = item.text;
+                button.addEventListener('click', function () { choose(item); });
+                results.appendChild(button);
+            });
+            if (data.next) {
+                more = document.createElement('button');
+                more.type = 'button';
+                more.className = 'list-group-item list-group-item-action text-muted';
+                more.textContent = 'More…';
+                more.addEventListener('click', function () { fetchPage(data.next, true); });
+                results.appendChild(more);
+            }
+        }
+
+        function fetchPage(url, append) {
+            var current = ++request;
+            fetch(url, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+                .then(function (response) { return response.ok ? response.json() : null; })
+                .then(function (data) {
+                    // Drop answers to queries the user has typed past.
+                    if (data && current === request) {
+                        show(data, append);
+                    }
+                });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            var query = input.value.trim();
+            if (!query) {
+                request++;
+                results.textContent = '';
+                return;
+            }
+            timer = setTimeout(function () {
+                var url = new URL(select.dataset.autocompleteUrl, window.location.href);
+                url.searchParams.set('q', query);
+                url.searchParams.set('page_size', PAGE_SIZE);
+                fetchPage(url.toString(), false);
+            }, DELAY);
+        });
+        input.addEventListener('keydown', function (event) {
+            // Enter picks the first match instead of submitting the form.
+            if (event.key === 'Enter') {
+                event.preventDefault();
+                var first = results.querySelector('button');
+                if (first) {
+                    first.click();
+                }
+            }
+        });
+
+        renderChosen();
+    }
+
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(enhance);
+}());
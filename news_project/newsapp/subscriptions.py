@@ -0,0 +1,127 @@
+"""
+Set-based subscription updates.
+
+A reader's subscriptions are changed by diffing the wanted ids against
+the current through-table rows and applying only the difference: one
+bulk INSERT for the additions and one ``DELETE ... IN`` for the removals,
+through the related managers so the ``m2m_changed`` handlers in
+``newsapp.signals`` keep feeds, caches and live streams in step. Nothing
+is written, and no signal fires, when nothing changed.
+"""
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .feed import deferred_backfill, fanout_limit
+from .models import CustomUser, Publisher
+
+BATCH_SIZE = 1_000
+
+
+def _clean_ids(ids, queryset, label):
+    """
+    Returns the submitted ids as a set of ints, raising ValidationError
+    for any id ``queryset`` does not contain. Only the submitted ids are
+    looked up.
+    """
+    try:
+        wanted = {int(pk) for pk in ids}
+    except (TypeError, ValueError):
+        raise ValidationError(f"{label} must be a list of ids.")
+    found = set(queryset.filter(pk__in=wanted).values_list('pk', flat=True))
+    unknown = sorted(wanted - found)
+    if unknown:
+        raise ValidationError(f"Unknown {label.lower()}: {', '.join(map(str, unknown))}.")
+    return wanted
+
+
+def clean_publisher_ids(ids):
+    """
+    Returns the given publisher ids as a set, validating that they exist.
+    """
+    return _clean_ids(ids, Publisher.objects.all(), "Publishers")
+
+
+def clean_journalist_ids(ids):
+    """
+    Returns the given user ids as a set, validating that they belong to
+    journalists.
+    """
+    return _clean_ids(ids, CustomUser.objects.filter(role='journalist'), "Journalists")
+
+
+def subscription_ids(user):
+    """
+    Returns ``{'publishers': [...], 'journalists': [...]}`` with the ids
+    the user subscribes to, read from the through tables only.
+    """
+    return {
+        'publishers': sorted(user.subscribed_publishers.through.objects.filter(
+            customuser_id=user.pk).values_list('publisher_id', flat=True)),
+        'journalists': sorted(user.subscribed_journalists.through.objects.filter(
+            from_customuser_id=user.pk).values_list('to_customuser_id', flat=True)),
+    }
+
+
+def _apply_diff(relation, current, wanted):
+    added, removed = wanted - current, current - wanted
+    if removed:
+        relation.remove(*removed)
+    if added:
+        relation.add(*added)
+    return sorted(added), sorted(removed)
+
+
+def update_subscriptions(user, publisher_ids=None, journalist_ids=None):
+    """
+    Makes the user's subscriptions exactly ``publisher_ids`` and
+    ``journalist_ids`` (``None`` leaves a relation alone). Ids must be
+    validated already. Returns ``{'added': {...}, 'removed': {...}}``
+    keyed by ``'publishers'`` and ``'journalists'``.
+    """
+    current = subscription_ids(user)
+    added, removed = {}, {}
+    with transaction.atomic():
+        if publisher_ids is not None:
+            added['publishers'], removed['publishers'] = _apply_diff(
+                user.subscribed_publishers, set(current['publishers']), set(publisher_ids))
+        if journalist_ids is not None:
+            added['journalists'], removed['journalists'] = _apply_diff(
+                user.subscribed_journalists, set(current['journalists']), set(journalist_ids))
+    return {'added': added, 'removed': removed}
+
+
+def subscribe_readers(publisher, reader_ids, batch_size=BATCH_SIZE):
+    """
+    Subscribes many readers to one publisher, e.g. for an onboarding
+    import: per batch, one lookup of the existing rows and one bulk
+    INSERT of the missing ones. Journalists and unknown ids are skipped.
+    An import that would take the publisher past the fan-out limit
+    switches it to fan-out-on-read first, so no feeds are backfilled.
+    Otherwise the new subscribers' feeds are backfilled once the batches
+    have committed, reading the publisher's recent articles once rather
+    than per batch inside the import's transactions. Returns the number
+    of new subscriptions.
+    """
+    reader_ids = sorted({int(pk) for pk in reader_ids})
+    through = CustomUser.subscribed_publishers.through
+    if not publisher.fan_out_on_read:
+        subscribers = through.objects.filter(publisher_id=publisher.pk).count()
+        if subscribers + len(reader_ids) > fanout_limit():
+            Publisher.objects.filter(pk=publisher.pk).update(fan_out_on_read=True)
+            publisher.fan_out_on_read = True
+    added = 0
+    with deferred_backfill():
+        for start in range(0, len(reader_ids), batch_size):
+            batch = reader_ids[start:start + batch_size]
+            with transaction.atomic():
+                eligible = set(CustomUser.objects.filter(pk__in=batch).exclude(
+                    role='journalist').values_list('pk', flat=True))
+                existing = set(through.objects.filter(
+                    publisher_id=publisher.pk, customuser_id__in=eligible
+                ).values_list('customuser_id', flat=True))
+                missing = eligible - existing
+                if missing:
+                    publisher.subsubers.add(*missing)
+                    added += len(missing)
+    return added
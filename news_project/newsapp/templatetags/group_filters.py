@@ -1,8 +1,10 @@
 from django import template
 
+from newsapp.roles import has_role
+
 register = template.Library()
 
 
 @register.filter
 def in_group(user, group_name):
-    return user.groups.filter(name=group_name.lower()).exists()
+    return has_role(user, group_name)
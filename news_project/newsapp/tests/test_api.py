@@ -42,8 +42,8 @@ class SubscribedArticlesAPITestCase(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Approved Article')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Approved Article')
 
     def test_unauthenticated_access(self):
         url = reverse('subscribed_articles')
@@ -54,5 +54,5 @@ class SubscribedArticlesAPITestCase(APITestCase):
         self.client.login(username='reader1', password='readerpass')
         url = reverse('subscribed_articles')
         response = self.client.get(url)
-        titles = [article['title'] for article in response.data]
+        titles = [article['title'] for article in response.data['results']]
         self.assertNotIn('Hidden Article', titles)
@@ -0,0 +1,238 @@
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp import approval, delivery, search
+from newsapp.models import Article, CustomUser, DeliveryJob, PublishEvent, Publisher
+
+
+class ApprovalTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.article = Article.objects.create(
+            title="Harbour fire", content="Crews attended.",
+            author=self.journalist, publisher=self.publisher,
+        )
+
+    def save(self, article, **changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in changes.items():
+                setattr(article, name, value)
+            article.save()
+
+    def test_only_the_approval_transition_notifies(self):
+        self.save(self.article, approved=True)
+        self.save(self.article, title="Harbour fire: update")
+        self.save(Article.objects.get(pk=self.article.pk), content="Typo fixed.")
+
+        event = PublishEvent.objects.get()
+        self.assertEqual(event.idempotency_key, f"article:{self.article.pk}:approval:1")
+        self.assertEqual(DeliveryJob.objects.count(), len(delivery.CHANNEL_HANDLERS))
+
+    def test_rolled_back_approval_notifies_nobody(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.article.approved = True
+                self.article.save()
+                transaction.set_rollback(True)
+
+        self.assertFalse(PublishEvent.objects.exists())
+
+    def test_same_approval_is_announced_once(self):
+        # A second process approving the same stale copy of the article.
+        stale = Article.objects.get(pk=self.article.pk)
+        self.save(self.article, approved=True)
+        self.save(stale, approved=True)
+
+        self.assertEqual(PublishEvent.objects.count(), 1)
+
+    def test_approving_again_after_withdrawal_is_a_new_approval(self):
+        self.save(self.article, approved=True)
+        self.save(self.article, approved=False)
+        self.save(self.article, approved=True)
+
+        keys = list(PublishEvent.objects.order_by('pk').values_list('idempotency_key', 'withdrawn_at'))
+        self.assertEqual([key for key, _ in keys], [
+            f"article:{self.article.pk}:approval:1", f"article:{self.article.pk}:approval:2",
+        ])
+        self.assertIsNotNone(keys[0][1])
+        self.assertIsNone(keys[1][1])
+
+    def test_approve_returns_whether_it_approved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(approval.approve(self.article))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(approval.approve(Article.objects.get(pk=self.article.pk)))
+
+        self.assertTrue(Article.objects.get(pk=self.article.pk).approved)
+        self.assertEqual(PublishEvent.objects.count(), 1)
+
+
+class ApproveViewTestCase(TestCase):
+    def setUp(self):
+        publisher = Publisher.objects.create(name='Hyperion News')
+        journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.article = Article.objects.create(
+            title="Harbour fire", content="Crews attended.", author=journalist, publisher=publisher,
+        )
+        self.editor = CustomUser.objects.create_user(username='editor1', password='pass', role='editor')
+        self.editor.groups.add(Group.objects.get_or_create(name='Editor')[0])
+        self.url = reverse('approve_article', args=[self.article.pk])
+
+    def test_editor_approves_once(self):
+        self.client.force_login(self.editor)
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url)
+            self.assertRedirects(response, reverse('article_list'), fetch_redirect_response=False)
+
+        self.article.refresh_from_db()
+        self.assertTrue(self.article.approved)
+        self.assertEqual(PublishEvent.objects.count(), 1)
+
+    def test_only_editors_approve_with_post(self):
+        self.client.force_login(self.article.author)
+        self.client.post(self.url)
+        self.client.force_login(self.editor)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+        self.article.refresh_from_db()
+        self.assertFalse(self.article.approved)
+
+
+class BulkApprovalTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+
+    def articles(self, count, **fields):
+        return [
+            Article.objects.create(title=f"Harbour fire {i}", content="Crews attended.",
+                                   author=self.journalist, publisher=self.publisher, **fields)
+            for i in range(count)
+        ]
+
+    def approve_many(self, articles):
+        with self.captureOnCommitCallbacks(execute=True):
+            return approval.approve_many([article.pk for article in articles])
+
+    def test_approves_pending_articles_like_single_approvals(self):
+        articles = self.articles(3)
+        already = Article.objects.create(title="Old news", content="Body", approved=True,
+                                         author=self.journalist, publisher=self.publisher)
+
+        with mock.patch('newsapp.live.publish_article') as publish:
+            approved = self.approve_many([*articles, already])
+
+        self.assertEqual(approved, sorted(article.pk for article in articles))
+        self.assertEqual(Article.objects.filter(approved=True).count(), 4)
+        self.assertEqual(
+            set(PublishEvent.objects.values_list('idempotency_key', flat=True)),
+            {approval.approval_key(article) for article in articles},
+        )
+        self.assertEqual(DeliveryJob.objects.count(), 3 * len(delivery.CHANNEL_HANDLERS))
+        self.assertEqual(publish.call_count, 3)
+        self.publisher.refresh_from_db()
+        self.assertEqual(self.publisher.article_count, 4)
+        self.assertEqual(len(search.search_page("harbour")), 3)
+
+    def test_approving_again_announces_nothing(self):
+        articles = self.articles(2)
+        self.approve_many(articles)
+
+        self.assertEqual(self.approve_many(articles), [])
+        self.assertEqual(PublishEvent.objects.count(), 2)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        counts = []
+        for size in (2, 20):
+            articles = self.articles(size)
+            with CaptureQueriesContext(connection) as queries:
+                self.approve_many(articles)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_rejected_articles_leave_the_queue_until_edited(self):
+        first, second = self.articles(2)
+
+        self.assertEqual(approval.reject_many([first.pk, second.pk]), [first.pk, second.pk])
+        self.assertEqual(approval.reject_many([first.pk]), [])
+        self.assertFalse(Article.objects.pending_review().exists())
+
+        self.client.force_login(self.journalist)
+        self.client.post(reverse('article_update', args=[first.pk]), {
+            'title': "Harbour fire: update", 'content': "Body", 'publisher': self.publisher.pk,
+        })
+        self.assertEqual(list(Article.objects.pending_review()), [first])
+
+        self.approve_many([second])
+        second.refresh_from_db()
+        self.assertTrue(second.approved)
+        self.assertIsNone(second.rejected_at)
+
+
+class ReviewQueueTestCase(APITestCase):
+    def setUp(self):
+        publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.articles = [
+            Article.objects.create(title=f"Harbour fire {i}", content="Crews attended.",
+                                   author=self.journalist, publisher=publisher)
+            for i in range(3)
+        ]
+        self.editor = CustomUser.objects.create_user(username='editor1', password='pass', role='editor')
+        self.editor.groups.add(Group.objects.get_or_create(name='Editor')[0])
+
+    def test_page_approves_and_rejects_selected_articles(self):
+        self.client.force_login(self.editor)
+        url = reverse('review_queue')
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['pending_articles']), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {
+                'action': 'approve', 'article_ids': [self.articles[0].pk, self.articles[1].pk],
+            })
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.client.post(url, {'action': 'reject', 'article_ids': [self.articles[2].pk]})
+
+        self.assertEqual(Article.objects.filter(approved=True).count(), 2)
+        self.assertIsNotNone(Article.objects.get(pk=self.articles[2].pk).rejected_at)
+        self.assertEqual(len(self.client.get(url).context['pending_articles']), 0)
+
+    def test_api_lists_and_approves_the_queue(self):
+        self.client.force_authenticate(self.editor)
+        url = reverse('api_review_queue')
+
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual([row['id'] for row in response.data['results']],
+                         [self.articles[2].pk, self.articles[1].pk])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [self.articles[0].pk])
+
+        ids = [article.pk for article in self.articles]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'action': 'approve', 'article_ids': ids}, format='json')
+        self.assertEqual(response.data, {'approved': ids})
+        self.assertEqual(PublishEvent.objects.count(), 3)
+
+    def test_only_editors_review(self):
+        self.client.force_authenticate(self.journalist)
+        response = self.client.post(reverse('api_review_queue'),
+                                    {'action': 'approve', 'article_ids': [self.articles[0].pk]}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(self.journalist)
+        self.assertEqual(self.client.get(reverse('review_queue')).status_code, 302)
+        self.assertFalse(Article.objects.filter(approved=True).exists())
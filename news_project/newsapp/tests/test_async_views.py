@@ -0,0 +1,107 @@
+import importlib
+import inspect
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+
+import news_project.urls
+import newsapp.api_urls
+import newsapp.urls
+from newsapp import async_views, feed
+from newsapp.models import Article, CustomUser, Newsletter, Publisher
+
+
+def reload_urls():
+    for module in (newsapp.api_urls, newsapp.urls, news_project.urls):
+        importlib.reload(module)
+    clear_url_caches()
+
+
+class AsyncViewsTestCase(TestCase):
+    """
+    The async views must render what the sync ones do, once
+    NEWSAPP_ASYNC_VIEWS routes the URLs to them.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.journalist.groups.add(Group.objects.get_or_create(name='Journalist')[0])
+        self.reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.article = Article.objects.create(
+            title="Harbour fire", content="Crews attended.", approved=True,
+            author=self.journalist, publisher=self.publisher,
+        )
+        self.draft = Article.objects.create(
+            title="Embargoed", content="Secret", author=self.journalist, publisher=self.publisher,
+        )
+        Newsletter.objects.create(title="Weekly roundup", content="News.",
+                                  author=self.journalist, publisher=self.publisher)
+        feed.rebuild_feed(self.reader.pk)
+
+        self.settings_override = override_settings(NEWSAPP_ASYNC_VIEWS=True)
+        self.settings_override.enable()
+        reload_urls()
+        self.addCleanup(reload_urls)
+        self.addCleanup(self.settings_override.disable)
+
+    def test_urls_route_to_async_views(self):
+        # The read-only views are wrapped for replica routing.
+        self.assertIs(inspect.unwrap(resolve(reverse('article_list')).func),
+                      async_views.article_list_view)
+        self.assertIs(inspect.unwrap(resolve(reverse('subscribed_articles')).func),
+                      async_views.subscribed_articles_view)
+
+    async def test_reader_pages(self):
+        await self.async_client.aforce_login(self.reader)
+
+        response = await self.async_client.get(reverse('article_list'))
+        self.assertContains(response, "Harbour fire")
+        self.assertNotContains(response, "Embargoed")
+
+        response = await self.async_client.get(reverse('newsletter_list'))
+        self.assertContains(response, "Weekly roundup")
+
+        response = await self.async_client.get(reverse('article_detail', args=[self.article.pk]))
+        self.assertContains(response, "Crews attended.")
+
+        response = await self.async_client.get(reverse('article_detail', args=[self.draft.pk]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        response = await self.async_client.get(reverse('article_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_journalist_sees_own_drafts(self):
+        await self.async_client.aforce_login(self.journalist)
+        response = await self.async_client.get(reverse('article_list'))
+        self.assertContains(response, "Embargoed")
+
+    async def test_anonymous_users_are_forbidden(self):
+        response = await self.async_client.get(reverse('article_list'))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse('subscribed_articles'))
+        self.assertEqual(response.status_code, 403)
+
+    async def test_subscribed_feed_pages_and_validates(self):
+        await self.async_client.aforce_login(self.reader)
+
+        response = await self.async_client.get(reverse('subscribed_articles'),
+                                               {'fields': 'id,title'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'id': self.article.pk, 'title': "Harbour fire"}])
+
+        response = await self.async_client.get(
+            reverse('subscribed_articles'), {'fields': 'id,title'},
+            headers={'if_none_match': response['ETag']},
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = await self.async_client.get(reverse('subscribed_articles'), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
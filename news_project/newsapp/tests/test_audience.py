@@ -0,0 +1,85 @@
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from newsapp import audience, delivery, feed
+from newsapp.models import Article, CustomUser, FeedEntry, Publisher
+
+
+class AudienceTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.other_publisher = Publisher.objects.create(name='Daily Planet')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.article = Article.objects.create(
+            title="Harbour fire", content="Crews attended.",
+            author=self.journalist, publisher=self.publisher,
+        )
+
+    def reader(self, name, publishers=(), journalists=(), role='reader', email=None):
+        user = CustomUser.objects.create_user(
+            username=name, password='pass', role=role,
+            email=f"{name}@example.com" if email is None else email,
+        )
+        user.subscribed_publishers.add(*publishers)
+        user.subscribed_journalists.add(*journalists)
+        return user
+
+    def test_readers_of_publisher_and_author_each_once(self):
+        both = self.reader('both', [self.publisher], [self.journalist])
+        by_publisher = self.reader('by_publisher', [self.publisher, self.other_publisher])
+        by_author = self.reader('by_author', journalists=[self.journalist])
+        self.reader('elsewhere', [self.other_publisher])
+        self.reader('editor', [self.publisher], role='editor')
+
+        recipients = list(audience.email_recipients(self.article))
+
+        self.assertEqual([r.id for r in recipients], sorted([both.pk, by_publisher.pk, by_author.pk]))
+        self.assertEqual(recipients[0].email, 'both@example.com')
+        self.assertEqual(recipients[0].name, 'both')
+
+    def test_readers_without_email_are_skipped(self):
+        self.reader('no_email', [self.publisher], email='')
+        reader = self.reader('reader', [self.publisher])
+
+        self.assertEqual([r.id for r in audience.email_recipients(self.article)], [reader.pk])
+        self.assertEqual(len(list(audience.subscriber_ids(self.article))), 2)
+
+    def test_streams_in_bounded_pages_and_resumes(self):
+        readers = [self.reader(f'reader{i}', [self.publisher]) for i in range(5)]
+        ids = [reader.pk for reader in readers]
+
+        # Three pages of two; the last one is short so no fourth query runs.
+        with self.assertNumQueries(3):
+            self.assertEqual(list(audience.subscriber_ids(self.article, chunk_size=2)), ids)
+        self.assertEqual(list(audience.subscriber_ids(self.article, after=ids[2], chunk_size=2)), ids[3:])
+
+    @override_settings(NEWSAPP_DELIVERY={'WORKER': 'db'})
+    def test_approval_emails_subscribed_readers(self):
+        self.reader('reader', [self.publisher])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.approved = True
+            self.article.save()
+
+        delivery.run_pending()
+
+        self.assertEqual([message.to for message in mail.outbox], [['reader@example.com']])
+
+    @override_settings(NEWSAPP_DELIVERY={'WORKER': 'db'})
+    def test_feeds_reach_the_same_audience_as_email(self):
+        reader = self.reader('reader', journalists=[self.journalist])
+        editor = self.reader('editor', [self.other_publisher], [self.journalist], role='editor')
+        Publisher.objects.filter(pk=self.other_publisher.pk).update(fan_out_on_read=True)
+        Article.objects.create(title="Flood warning", content="Rivers rising.", approved=True,
+                               author=self.journalist, publisher=self.other_publisher)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.approved = True
+            self.article.save()
+
+        delivery.run_pending()
+        feed.backfill([reader.pk, editor.pk], journalist_ids=[self.journalist.pk])
+
+        self.assertEqual([message.to for message in mail.outbox], [['reader@example.com']])
+        self.assertEqual(list(FeedEntry.objects.values_list('reader_id', flat=True).distinct()),
+                         [reader.pk])
+        self.assertEqual(list(feed.feed_page(editor)), [])
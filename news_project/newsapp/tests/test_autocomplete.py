@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp import autocomplete
+from newsapp.forms import SubscriptionForm
+from newsapp.models import CustomUser, Publisher
+
+
+class LookupTestCase(TestCase):
+    def setUp(self):
+        for name in ('Daily Planet', 'daily bugle', 'Dairy Times', 'Hyperion News'):
+            Publisher.objects.create(name=name)
+        CustomUser.objects.create_user(username='Dana', password='pass', role='journalist')
+        CustomUser.objects.create_user(username='dave', password='pass', role='journalist')
+        CustomUser.objects.create_user(username='daniel', password='pass', role='reader')
+
+    def texts(self, page):
+        return [item['text'] for item in page]
+
+    def test_prefix_match_ignores_case(self):
+        self.assertEqual(self.texts(autocomplete.lookup('publishers', 'DAIL')),
+                         ['daily bugle', 'Daily Planet'])
+        self.assertEqual(self.texts(autocomplete.lookup('publishers', 'zz')), [])
+
+    def test_journalists_only(self):
+        self.assertEqual(self.texts(autocomplete.lookup('journalists', 'da')), ['Dana', 'dave'])
+
+    def test_pages_follow_the_cursor(self):
+        page = autocomplete.lookup('publishers', 'da', page_size=2)
+        self.assertEqual(self.texts(page), ['daily bugle', 'Daily Planet'])
+        page = autocomplete.lookup('publishers', 'da', page.next_cursor, page_size=2)
+        self.assertEqual(self.texts(page), ['Dairy Times'])
+        self.assertIsNone(page.next_cursor)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(LookupError):
+            autocomplete.lookup('readers', 'da')
+
+
+class AutocompleteAPITestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.client.login(username='reader1', password='pass')
+
+    def test_results(self):
+        response = self.client.get(reverse('api_autocomplete', args=['publishers']), {'q': 'hyp'})
+        self.assertEqual(response.data['results'], [{'id': self.publisher.pk, 'text': 'Hyperion News'}])
+        self.assertIsNone(response.data['next'])
+
+        self.assertEqual(self.client.get(reverse('api_autocomplete', args=['readers'])).status_code, 404)
+        response = self.client.get(reverse('api_autocomplete', args=['publishers']), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_autocomplete', args=['publishers']), {'q': 'hyp'})
+        self.assertEqual(response.status_code, 403)
+
+
+class SubscriptionFormTestCase(TestCase):
+    def setUp(self):
+        self.publishers = [Publisher.objects.create(name=f'Publisher {i}') for i in range(20)]
+        self.reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.reader.subscribed_publishers.add(self.publishers[3])
+
+    def test_renders_only_current_subscriptions(self):
+        html = str(SubscriptionForm(instance=self.reader)['subscribed_publishers'])
+        self.assertIn('Publisher 3', html)
+        self.assertNotIn('Publisher 4', html)
+        self.assertIn(reverse('api_autocomplete', args=['publishers']), html)
+
+    def test_validation_looks_up_submitted_ids_only(self):
+        form = SubscriptionForm({'subscribed_publishers': [self.publishers[5].pk]}, instance=self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(form.is_valid())
+        publisher_queries = [q['sql'] for q in queries.captured_queries if 'newsapp_publisher' in q['sql']]
+        self.assertEqual(len(publisher_queries), 1)
+        self.assertIn(' IN (', publisher_queries[0])
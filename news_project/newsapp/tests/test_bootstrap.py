@@ -0,0 +1,53 @@
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from newsapp.bootstrap import ROLE_PERMISSIONS, ROLES, bootstrap_roles
+
+
+def group_permissions(name):
+    return {f'{app_label}.{codename}' for app_label, codename in Group.objects.get(
+        name=name).permissions.values_list('content_type__app_label', 'codename')}
+
+
+class BootstrapTestCase(TestCase):
+    def test_migrate_creates_roles_with_permissions(self):
+        for role, permissions in ROLE_PERMISSIONS.items():
+            self.assertEqual(group_permissions(role), set(permissions))
+
+    def test_bootstrap_is_idempotent(self):
+        self.assertFalse(bootstrap_roles())
+        self.assertEqual(Group.objects.filter(name__in=ROLES).count(), len(ROLES))
+
+    def test_fresh_bootstrap_takes_a_fixed_number_of_queries(self):
+        Group.objects.filter(name__in=ROLES).delete()
+        with CaptureQueriesContext(connection) as queries:
+            changes = bootstrap_roles()
+        writes = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(writes), 2)
+        self.assertLessEqual(len(queries.captured_queries), 8)
+        self.assertEqual(changes.created_groups, list(ROLES))
+        self.assertEqual(len(changes.granted['Journalist']), 10)
+
+    def test_dry_run_reports_the_difference(self):
+        editor = Group.objects.get(name='Editor')
+        editor.permissions.remove(Permission.objects.get(codename='delete_article'))
+        editor.permissions.add(Permission.objects.get(codename='add_publisher'))
+
+        out = StringIO()
+        call_command('bootstrap_roles', dry_run=True, stdout=out)
+        self.assertIn("+ Editor: newsapp.delete_article", out.getvalue())
+        self.assertIn("- Editor: newsapp.add_publisher", out.getvalue())
+        self.assertNotIn('newsapp.delete_article', group_permissions('Editor'))
+
+        call_command('bootstrap_roles', stdout=StringIO())
+        self.assertEqual(group_permissions('Editor'), set(ROLE_PERMISSIONS['Editor']))
+
+    def test_ready_does_no_database_work(self):
+        with self.assertNumQueries(0):
+            apps.get_app_config('newsapp').ready()
@@ -0,0 +1,144 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from newsapp import caching
+from newsapp.models import Article, CustomUser, Newsletter, Publisher
+
+
+def article_queries(queries):
+    return [q['sql'] for q in queries.captured_queries if 'newsapp_article' in q['sql']]
+
+
+class FragmentCacheViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='pass', role='reader')
+        self.reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+        self.article = Article.objects.create(
+            title="Harbour fire", content="Crews attended.", approved=True,
+            author=self.journalist, publisher=self.publisher,
+        )
+        self.client.login(username='reader1', password='pass')
+
+    def test_article_detail_is_served_from_cache(self):
+        url = reverse('article_detail', args=[self.article.pk])
+        self.assertContains(self.client.get(url), "Crews attended.")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(url), "Crews attended.")
+        self.assertEqual(article_queries(queries), [])
+
+        self.article.content = "The fire is out."
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+        self.assertContains(self.client.get(url), "The fire is out.")
+
+    def test_cached_detail_still_checks_permissions(self):
+        draft = Article.objects.create(title="Draft", content="Secret",
+                                       author=self.journalist, publisher=self.publisher)
+        url = reverse('article_detail', args=[draft.pk])
+        self.client.login(username='journalist1', password='pass')
+        self.assertContains(self.client.get(url), "Secret")
+
+        self.client.login(username='reader1', password='pass')
+        self.assertRedirects(self.client.get(url), reverse('dashboard'))
+        self.assertEqual(self.client.get(reverse('article_detail', args=[999])).status_code, 404)
+
+    def test_reader_listing_is_invalidated_by_changes(self):
+        url = reverse('article_list')
+        self.assertContains(self.client.get(url), "Harbour fire")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertEqual(article_queries(queries), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(title="Flood warning", content="Rain.", approved=True,
+                                   author=self.journalist, publisher=self.publisher)
+        self.assertContains(self.client.get(url), "Flood warning")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.delete()
+        self.assertNotContains(self.client.get(url), "Harbour fire")
+
+    def test_newsletter_and_publisher_changes_invalidate_listings(self):
+        url = reverse('newsletter_list')
+        self.assertContains(self.client.get(url), "No newsletters available.")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Newsletter.objects.create(title="Weekly roundup", content="News.",
+                                      author=self.journalist, publisher=self.publisher)
+        self.assertContains(self.client.get(url), "Weekly roundup")
+
+        before = caching.versions('publishers')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.publisher.name = "Hyperion Daily"
+            self.publisher.save()
+        self.assertNotEqual(caching.versions('publishers'), before)
+
+    def test_versions_move_only_when_the_change_commits(self):
+        url = reverse('article_detail', args=[self.article.pk])
+        self.assertContains(self.client.get(url), "Crews attended.")
+        before = caching.versions(f'article:{self.article.pk}', 'articles', 'publishers')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.article.content = "The fire is out."
+            self.article.save()
+            self.publisher.save()
+            self.assertEqual(
+                caching.versions(f'article:{self.article.pk}', 'articles', 'publishers'), before)
+
+        for callback in callbacks:
+            callback()
+        after = caching.versions(f'article:{self.article.pk}', 'articles', 'publishers')
+        self.assertTrue(all(new > old for new, old in zip(after, before)))
+        self.assertContains(self.client.get(url), "The fire is out.")
+
+    def test_hits_and_misses_are_counted(self):
+        url = reverse('article_detail', args=[self.article.pk])
+        for _ in range(3):
+            self.client.get(url)
+
+        stats = caching.cache_stats()['article']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+        staff = CustomUser.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('api_cache_stats'))
+        self.assertEqual(response.data['article']['hits'], 2)
+
+
+@mock.patch.object(caching, 'LOCK_POLL', 0.01)
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.key = 'newsapp:fragment:article:1:2'
+        cache.add(f'{self.key}:lock', 1)
+
+    def test_waiter_reuses_result_of_the_render_in_flight(self):
+        render = mock.Mock(return_value='rendered twice')
+        timer = threading.Timer(0.05, cache.set, args=(self.key, 'rendered once'))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(caching.cached_fragment('article', (1, 2), render), 'rendered once')
+        render.assert_not_called()
+        self.assertEqual(caching.cache_stats()['article']['waits'], 1)
+
+    @mock.patch.object(caching, 'LOCK_WAIT', 0.05)
+    def test_waiter_renders_itself_when_the_lock_holder_is_too_slow(self):
+        render = mock.Mock(return_value='rendered')
+
+        self.assertEqual(caching.cached_fragment('article', (1, 2), render), 'rendered')
+        render.assert_called_once()
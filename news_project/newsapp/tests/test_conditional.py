@@ -0,0 +1,128 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp import delivery
+from newsapp.models import Article, CustomUser, Publisher
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.other_publisher = Publisher.objects.create(name='Daily Planet')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.article = self.publish("First")
+        self.client.login(username='reader1', password='readerpass')
+        self.url = reverse('subscribed_articles')
+
+    def publish(self, title, publisher=None):
+        article = Article.objects.create(
+            title=title, content="Body", author=self.journalist,
+            publisher=publisher or self.publisher,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            article.approved = True
+            article.save()
+        delivery.run_pending(['feed'])
+        return article
+
+    def assertNotModified(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        loaded = [q['sql'] for q in queries.captured_queries if '"newsapp_article"."title"' in q['sql']]
+        self.assertEqual(loaded, [], "304 must be answered before articles are loaded")
+        return response
+
+    def test_unchanged_feed_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+        self.assertNotModified(self.url, if_none_match=response['ETag'])
+        self.assertNotModified(self.url, if_modified_since=response['Last-Modified'])
+
+    def test_etag_covers_query_parameters(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'fields': 'title'}, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_approval_busts_the_tag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.publish("Second")
+
+        response = self.client.get(self.url, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_subscription_change_busts_the_tag(self):
+        self.publish("Elsewhere", publisher=self.other_publisher)
+        etag = self.client.get(self.url)['ETag']
+        self.reader.subscribed_publishers.add(self.other_publisher)
+
+        response = self.client.get(self.url, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_edits_outside_the_page_keep_the_tag(self):
+        elsewhere = self.publish("Elsewhere", publisher=self.other_publisher)
+        older = self.publish("Second")
+        self.publish("Third")
+        url = f'{self.url}?page_size=2'
+        etag = self.client.get(url)['ETag']
+
+        for article in (elsewhere, self.article):
+            article.content = "Corrected"
+            article.save()
+        response = self.assertNotModified(url, if_none_match=etag)
+        self.assertEqual(response['ETag'], etag)
+
+        older.content = "Corrected"
+        older.save()
+        self.assertEqual(self.client.get(url, headers={'if_none_match': etag}).status_code, 200)
+
+    def test_removal_from_the_page_busts_the_tag(self):
+        second = self.publish("Second")
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            second.approved = False
+            second.save()
+
+        response = self.client.get(self.url, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.article.pk])
+
+    def test_validators_do_not_count_the_feed(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertNotModified(self.url, if_none_match=etag)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_article_detail(self):
+        url = reverse('api_article_detail', args=[self.article.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, if_none_match=etag)
+
+        self.article.title = "First, updated"
+        self.article.save()
+        self.assertEqual(self.client.get(url, headers={'if_none_match': etag}).status_code, 200)
+
+    def test_unpublished_article_is_not_revealed_by_a_304(self):
+        draft = Article.objects.create(title="Draft", content="Secret", author=self.journalist,
+                                       publisher=self.publisher)
+        url = reverse('api_article_detail', args=[draft.pk])
+        self.client.login(username='journalist1', password='journalistpass')
+        etag = self.client.get(url)['ETag']
+
+        self.client.login(username='reader1', password='readerpass')
+        response = self.client.get(url, headers={'if_none_match': etag})
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('ETag', response)
@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from newsapp import counters
+from newsapp.models import Article, CustomUser, Publisher
+
+
+class CountersTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.other = Publisher.objects.create(name='Daily Planet')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.readers = [
+            CustomUser.objects.create_user(username=f'reader{i}', password='pass', role='reader')
+            for i in range(3)
+        ]
+
+    def counts(self):
+        self.publisher.refresh_from_db()
+        self.journalist.refresh_from_db()
+        return self.publisher.subscriber_count, self.journalist.follower_count
+
+    def test_subscriptions_from_either_side(self):
+        self.readers[0].subscribed_publishers.add(self.publisher, self.other)
+        self.publisher.subsubers.add(*self.readers)
+        self.journalist.journalist_followers.add(self.readers[0], self.readers[1])
+        self.assertEqual(self.counts(), (3, 2))
+
+        # Removing a subscription that does not exist changes nothing.
+        self.readers[2].subscribed_journalists.remove(self.journalist)
+        self.readers[1].subscribed_journalists.remove(self.journalist)
+        self.publisher.subsubers.remove(self.readers[0], self.readers[1])
+        self.assertEqual(self.counts(), (1, 1))
+
+        self.readers[2].subscribed_publishers.clear()
+        self.journalist.journalist_followers.clear()
+        self.assertEqual(self.counts(), (0, 0))
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.subscriber_count, 1)
+
+    def test_deleting_a_user_uncounts_their_subscriptions(self):
+        self.readers[0].subscribed_publishers.add(self.publisher)
+        self.readers[0].subscribed_journalists.add(self.journalist)
+        self.readers[0].delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_approved_articles_are_counted(self):
+        article = Article.objects.create(title="Draft", content="Body",
+                                         author=self.journalist, publisher=self.publisher)
+        self.publisher.refresh_from_db()
+        self.assertEqual(self.publisher.article_count, 0)
+
+        article.approved = True
+        article.save()
+        article.save()
+        self.publisher.refresh_from_db()
+        self.assertEqual(self.publisher.article_count, 1)
+
+        # Loaded without its approval; the stored state is looked up.
+        moved = Article.objects.only('title').get(pk=article.pk)
+        moved.publisher = self.other
+        moved.save()
+        self.publisher.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.publisher.article_count, self.other.article_count), (0, 1))
+
+        Article.objects.get(pk=article.pk).delete()
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.article_count, 0)
+
+    def test_saving_a_stale_instance_keeps_the_counters(self):
+        stale = Publisher.objects.get(pk=self.publisher.pk)
+        self.publisher.subsubers.add(self.readers[0])
+        stale.name = 'Hyperion Daily'
+        stale.save()
+        self.publisher.refresh_from_db()
+        self.assertEqual((self.publisher.name, self.publisher.subscriber_count), ('Hyperion Daily', 1))
+
+    def test_reconcile_fixes_drift(self):
+        self.publisher.subsubers.add(*self.readers)
+        self.journalist.journalist_followers.add(self.readers[0])
+        Article.objects.create(title="Approved", content="Body", approved=True,
+                               author=self.journalist, publisher=self.publisher)
+        Publisher.objects.update(subscriber_count=7, article_count=0)
+        CustomUser.objects.filter(pk=self.readers[1].pk).update(follower_count=4)
+
+        self.assertEqual(counters.reconcile(dry_run=True), {
+            'publisher subscribers': 2, 'publisher articles': 1, 'journalist followers': 1,
+        })
+        out = StringIO()
+        call_command('reconcile_counters', batch_size=1, stdout=out)
+        self.assertIn("4 counters fixed", out.getvalue())
+
+        self.publisher.refresh_from_db()
+        self.assertEqual((self.publisher.subscriber_count, self.publisher.article_count), (3, 1))
+        self.assertEqual(CustomUser.objects.get(pk=self.readers[1].pk).follower_count, 0)
+        self.assertEqual(sum(counters.reconcile().values()), 0)
@@ -0,0 +1,157 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.db import connection
+from django.db.models import F, QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from newsapp import delivery
+from newsapp.mailer import MailReport
+from newsapp.models import (
+    Article, CustomUser, DeliveryChannel, DeliveryJob, PublishEvent, Publisher,
+)
+
+
+@override_settings(NEWSAPP_DELIVERY={'WORKER': 'db', 'MAX_ATTEMPTS': 2})
+class DeliveryQueueTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.article = Article.objects.create(
+            title="Queued Article",
+            content="Body",
+            author=self.journalist,
+            publisher=self.publisher,
+        )
+
+    def approve(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.approved = True
+            self.article.save()
+
+    def test_approval_only_enqueues_jobs(self):
+        with mock.patch.object(delivery.MassMailer, 'send') as send:
+            self.approve()
+            send.assert_not_called()
+
+        self.assertEqual(PublishEvent.objects.filter(article=self.article).count(), 1)
+        channels = set(DeliveryJob.objects.values_list('channel', flat=True))
+        self.assertEqual(channels, set(delivery.CHANNEL_HANDLERS))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_run_pending_completes_jobs(self):
+        self.approve()
+        processed = delivery.run_pending()
+
+        self.assertEqual(processed, len(delivery.CHANNEL_HANDLERS))
+        self.assertFalse(DeliveryJob.objects.exclude(status=DeliveryJob.STATUS_DONE).exists())
+        self.assertGreaterEqual(delivery.queue_stats()['email']['avg_latency_seconds'], 0)
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        self.approve()
+        failing = mock.Mock(side_effect=RuntimeError("smtp down"))
+
+        with mock.patch.dict(delivery.CHANNEL_HANDLERS, {'email': failing}):
+            delivery.run_pending(['email'])
+            job = DeliveryJob.objects.get(channel='email')
+            self.assertEqual(job.status, DeliveryJob.STATUS_PENDING)
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.available_at, timezone.now())
+            self.assertIn("smtp down", job.last_error)
+
+            DeliveryJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+            delivery.run_pending(['email'])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeliveryJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(NEWSAPP_DELIVERY={'CONCURRENCY': {'email': 1}})
+    def test_claim_respects_channel_concurrency(self):
+        for _ in range(3):
+            delivery.enqueue_publish_event(self.article)
+
+        self.assertEqual(len(delivery.claim_jobs('email')), 1)
+        self.assertEqual(delivery.claim_jobs('email'), [])
+
+    @override_settings(NEWSAPP_DELIVERY={'CONCURRENCY': {'email': 2}})
+    def test_claim_locks_the_channel_not_the_backlog(self):
+        delivery.enqueue_publish_events({self.article.pk: 'first'})
+        event = PublishEvent.objects.get()
+        DeliveryJob.objects.bulk_create([DeliveryJob(event=event, channel='email') for _ in range(500)])
+        locked = []
+        select_for_update = QuerySet.select_for_update
+
+        def record(queryset, *args, **kwargs):
+            locked.append(select_for_update(queryset, *args, **kwargs))
+            return locked[-1]
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=record), \
+                CaptureQueriesContext(connection) as queries:
+            claimed = delivery.claim_jobs('email')
+
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(locked[0].model, DeliveryChannel)
+        job_selects = [q['sql'] for q in queries
+                       if q['sql'].startswith('SELECT') and 'newsapp_deliveryjob"."id' in q['sql']]
+        self.assertEqual(len(job_selects), 1)
+        self.assertIn('LIMIT 2', job_selects[0])
+        self.assertLessEqual(len(queries), 6)
+
+    def test_queue_stats_reports_depth(self):
+        self.approve()
+        stats = delivery.queue_stats()
+        self.assertEqual(stats['email']['pending'], 1)
+        self.assertGreaterEqual(stats['email']['oldest_pending_seconds'], 0)
+
+    def claim_email_job_started(self, seconds_ago):
+        self.approve()
+        job = delivery.claim_jobs('email')[0]
+        job.started_at = timezone.now() - timedelta(seconds=seconds_ago)
+        DeliveryJob.objects.filter(pk=job.pk).update(started_at=job.started_at)
+        return job
+
+    @override_settings(NEWSAPP_DELIVERY={'LEASE_SECONDS': 300})
+    def test_checkpoints_renew_the_lease_of_a_long_send(self):
+        job = self.claim_email_job_started(seconds_ago=250)
+        requeued = []
+
+        def send(mailer, recipients, render, cursor=None, checkpoint=None, report=None):
+            for cursor in (10, 20):
+                # Each chunk takes longer than a lease.
+                DeliveryJob.objects.filter(pk=job.pk).update(
+                    started_at=F('started_at') - timedelta(seconds=301))
+                job.started_at -= timedelta(seconds=301)
+                checkpoint(cursor)
+                requeued.append(delivery.requeue_expired_jobs())
+            return MailReport(cursor)
+
+        with mock.patch.object(delivery.MassMailer, 'send', autospec=True, side_effect=send):
+            delivery.run_job(job)
+
+        self.assertEqual(requeued, [0, 0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeliveryJob.STATUS_DONE)
+        self.assertEqual(job.cursor, 20)
+
+    @override_settings(NEWSAPP_DELIVERY={'LEASE_SECONDS': 300})
+    def test_requeued_job_is_left_to_its_new_run(self):
+        job = self.claim_email_job_started(seconds_ago=400)
+
+        def send(mailer, recipients, render, cursor=None, checkpoint=None, report=None):
+            delivery.requeue_expired_jobs()
+            checkpoint(10)
+
+        with mock.patch.object(delivery.MassMailer, 'send', autospec=True, side_effect=send), \
+                self.assertLogs('newsapp.delivery', 'WARNING'):
+            delivery.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeliveryJob.STATUS_PENDING)
+        self.assertIsNone(job.cursor)
+        self.assertEqual(job.last_error, '')
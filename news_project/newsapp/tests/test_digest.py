@@ -0,0 +1,135 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from newsapp import digest
+from newsapp.models import Article, CustomUser, DigestRun, DigestShard, Newsletter, Publisher
+
+
+@override_settings(NEWSAPP_EMAIL_CHUNK_SIZE=2)
+class DigestTestCase(TestCase):
+    def setUp(self):
+        self.end = timezone.now().replace(microsecond=0)
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.other_publisher = Publisher.objects.create(name='Daily Planet')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+
+    def reader(self, name, publishers=(), journalists=(), period='daily'):
+        user = CustomUser.objects.create_user(
+            username=name, password='pass', role='reader', email=f"{name}@example.com", digest=period,
+        )
+        user.subscribed_publishers.add(*publishers)
+        user.subscribed_journalists.add(*journalists)
+        return user
+
+    def article(self, title, publisher, approved=True, age=timedelta(hours=1)):
+        article = Article.objects.create(
+            title=title, content=f"{title} body.", approved=approved,
+            author=self.journalist, publisher=publisher,
+        )
+        Article.objects.filter(pk=article.pk).update(created_at=self.end - age)
+        return article
+
+    def send(self, **kwargs):
+        return digest.send_digests('daily', self.end, **kwargs)
+
+    def test_digest_lists_the_window_from_followed_sources_once(self):
+        self.reader('reader', [self.publisher], [self.journalist])
+        self.article("Harbour fire", self.publisher)
+        self.article("Flood warning", self.other_publisher)
+        self.article("Embargoed", self.publisher, approved=False)
+        self.article("Last week", self.publisher, age=timedelta(days=3))
+        newsletter = Newsletter.objects.create(title="Weekly roundup", content="News.",
+                                               author=self.journalist, publisher=self.publisher)
+        Newsletter.objects.filter(pk=newsletter.pk).update(created_at=self.end - timedelta(hours=2))
+
+        run, _ = self.send()
+
+        self.assertIsNotNone(run.finished_at)
+        [message] = mail.outbox
+        self.assertEqual(message.to, ['reader@example.com'])
+        self.assertEqual(message.subject, "Your daily digest: 3 new")
+        self.assertEqual(message.body.count("* Harbour fire"), 1)
+        self.assertIn("Flood warning", message.body)
+        self.assertIn("Weekly roundup", message.body)
+        self.assertNotIn("Embargoed", message.body)
+        self.assertNotIn("Last week", message.body)
+
+    @override_settings(NEWSAPP_DIGEST_MAX_ITEMS=1)
+    def test_long_digests_list_the_newest_items(self):
+        self.reader('reader', [self.publisher])
+        self.article("Older", self.publisher, age=timedelta(hours=2))
+        self.article("Newer", self.publisher)
+
+        self.send()
+
+        [message] = mail.outbox
+        self.assertIn("Newer", message.body)
+        self.assertNotIn("Older", message.body)
+        self.assertIn("...and 1 more", message.body)
+
+    def test_only_digest_readers_with_news_are_mailed(self):
+        self.reader('daily', [self.publisher])
+        self.reader('weekly', [self.publisher], period='weekly')
+        self.reader('nothing_new', [self.other_publisher])
+        self.article("Harbour fire", self.publisher)
+
+        self.send()
+
+        self.assertEqual([message.to for message in mail.outbox], [['daily@example.com']])
+
+    def test_shards_cover_every_reader_once(self):
+        readers = [self.reader(f'reader{i}', [self.publisher]) for i in range(7)]
+        self.article("Harbour fire", self.publisher)
+
+        run, results = self.send(shards=3)
+
+        self.assertEqual(run.shards.count(), 3)
+        self.assertEqual(sum(result['sent'] for result in results), 7)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         sorted(reader.email for reader in readers))
+
+    def test_interrupted_run_resumes_after_checkpoint(self):
+        readers = [self.reader(f'reader{i}', [self.publisher]) for i in range(5)]
+        self.article("Harbour fire", self.publisher)
+        listing = digest.DigestContent.listing
+        calls = []
+
+        def crash_on_fourth(content, *args):
+            calls.append(1)
+            if len(calls) == 4:
+                raise RuntimeError("worker killed")
+            return listing(content, *args)
+
+        with mock.patch.object(digest.DigestContent, 'listing', crash_on_fourth), \
+                self.assertLogs('newsapp.digest', 'ERROR'):
+            run, _ = self.send(shards=1)
+        shard = run.shards.get()
+        self.assertEqual(shard.status, DigestShard.STATUS_FAILED)
+        self.assertEqual(shard.cursor, readers[1].pk)
+        self.assertIsNone(run.finished_at)
+
+        run, _ = self.send()
+
+        self.assertEqual(DigestRun.objects.count(), 1)
+        self.assertEqual(run.shards.get().sent, 5)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         sorted(reader.email for reader in readers))
+
+    def test_command_reports_shards(self):
+        self.reader('reader', [self.publisher])
+        Article.objects.create(title="Harbour fire", content="Body", approved=True,
+                               author=self.journalist, publisher=self.publisher)
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        out = StringIO()
+
+        call_command('send_digests', 'daily', '--end', tomorrow.isoformat(), '--processes', '1', stdout=out)
+
+        self.assertIn("sent=1", out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,123 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp import delivery
+from newsapp.models import Article, CustomUser, FeedEntry, Publisher
+
+
+class FeedTestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.other_publisher = Publisher.objects.create(name='Daily Planet')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        self.client.login(username='reader1', password='readerpass')
+
+    def publish(self, title, publisher=None):
+        article = Article.objects.create(
+            title=title, content="Body", author=self.journalist,
+            publisher=publisher or self.publisher,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            article.approved = True
+            article.save()
+        delivery.run_pending(['feed'])
+        return article
+
+    def feed_titles(self):
+        response = self.client.get(reverse('subscribed_articles'))
+        return [article['title'] for article in response.data['results']]
+
+    def test_approval_fans_out_to_subscribers(self):
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.publish("Fresh")
+        self.publish("Elsewhere", publisher=self.other_publisher)
+
+        self.assertEqual(FeedEntry.objects.filter(reader=self.reader).count(), 1)
+        self.assertEqual(self.feed_titles(), ["Fresh"])
+
+    def test_subscription_changes_backfill_and_prune(self):
+        self.publish("Older")
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.assertEqual(self.feed_titles(), ["Older"])
+
+        self.reader.subscribed_journalists.add(self.journalist)
+        self.reader.subscribed_publishers.remove(self.publisher)
+        self.assertEqual(self.feed_titles(), ["Older"])
+
+        self.reader.subscribed_journalists.clear()
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_clearing_a_publisher_prunes_every_reader_in_one_delete(self):
+        self.publish("Older")
+        readers = [self.reader] + [
+            CustomUser.objects.create_user(username=f'reader{i}', password='pass', role='reader')
+            for i in range(2, 5)
+        ]
+        self.publisher.subsubers.add(*readers)
+        readers[1].subscribed_journalists.add(self.journalist)
+        self.assertEqual(FeedEntry.objects.count(), 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.publisher.subsubers.clear()
+
+        deletes = [q['sql'] for q in queries.captured_queries
+                   if q['sql'].startswith('DELETE') and 'newsapp_feedentry' in q['sql']]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(list(FeedEntry.objects.values_list('reader_id', flat=True)), [readers[1].pk])
+
+    def test_unapproved_article_leaves_feeds(self):
+        self.reader.subscribed_publishers.add(self.publisher)
+        article = self.publish("Withdrawn")
+        article.approved = False
+        article.save()
+        self.assertEqual(self.feed_titles(), [])
+
+    @override_settings(NEWSAPP_FEED_FANOUT_LIMIT=0)
+    def test_large_publisher_falls_back_to_fan_out_on_read(self):
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.publish("Popular")
+
+        self.publisher.refresh_from_db()
+        self.assertTrue(self.publisher.fan_out_on_read)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), ["Popular"])
+
+    def test_rebuild_command_recreates_entries(self):
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.publish("Rebuilt")
+        FeedEntry.objects.all().delete()
+
+        call_command('rebuild_feed', stdout=StringIO())
+        self.assertEqual(self.feed_titles(), ["Rebuilt"])
+
+    def test_merged_feed_pages_forward_and_back(self):
+        self.publisher.fan_out_on_read = True
+        self.publisher.save()
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.reader.subscribed_journalists.add(self.journalist)
+        for i in range(3):
+            self.publish(f"Read-time {i}")
+            self.publish(f"Written {i}", publisher=self.other_publisher)
+
+        url = reverse('subscribed_articles')
+        pages = [self.client.get(url, {'page_size': 4}).data]
+        pages.append(self.client.get(pages[0]['next']).data)
+        titles = [a['title'] for page in pages for a in page['results']]
+
+        expected = list(Article.objects.order_by('-created_at', '-pk').values_list('title', flat=True))
+        self.assertEqual(titles, expected)
+        self.assertIsNone(pages[1]['next'])
+
+        back = self.client.get(pages[1]['previous']).data
+        self.assertEqual(back['results'], pages[0]['results'])
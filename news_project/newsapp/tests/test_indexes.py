@@ -0,0 +1,92 @@
+import json
+import re
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from newsapp import autocomplete
+from newsapp.models import Article, CustomUser, DeliveryJob, FeedEntry, Newsletter, Publisher
+
+
+class QueryPlanMixin:
+    """
+    Fails when a query's plan reads a whole table instead of an index.
+    """
+
+    def full_scans(self, queryset):
+        """
+        Returns the tables the query scans without using an index.
+        """
+        if connection.vendor == 'sqlite':
+            plan = queryset.explain()
+            return re.findall(r'\bSCAN (\w+)(?! USING)\s*$', plan, re.MULTILINE)
+        if connection.vendor == 'mysql':
+            plan = json.loads(queryset.explain(format='json'))
+            return re.findall(r'"table_name": "(\w+)", "access_type": "ALL"',
+                              json.dumps(plan))
+        self.skipTest(f"No plan checks for {connection.vendor}")
+
+    def assertUsesIndex(self, queryset):
+        scans = self.full_scans(queryset)
+        self.assertFalse(scans, f"Full table scan of {scans}: {queryset.query}")
+
+
+class HotPathIndexTestCase(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='pass', role='reader')
+        Article.objects.create(title="Article", content="Body", approved=True,
+                               author=self.journalist, publisher=self.publisher)
+
+    def test_reader_listing(self):
+        self.assertUsesIndex(
+            Article.objects.filter(approved=True).order_by('-created_at', '-id')[:21]
+        )
+
+    def test_journalist_listing(self):
+        self.assertUsesIndex(
+            Article.objects.filter(author=self.journalist).order_by('-created_at', '-id')[:21]
+        )
+        self.assertUsesIndex(
+            Newsletter.objects.filter(author=self.journalist).order_by('-created_at', '-id')[:21]
+        )
+
+    def test_feed_sources(self):
+        self.assertUsesIndex(
+            Article.objects.filter(approved=True, publisher_id__in=[self.publisher.pk])
+            .order_by('-created_at', '-id')[:21]
+        )
+        self.assertUsesIndex(
+            Article.objects.filter(approved=True, author_id__in=[self.journalist.pk])
+            .order_by('-created_at', '-id')[:21]
+        )
+        self.assertUsesIndex(
+            FeedEntry.objects.filter(reader=self.reader).order_by('-created_at', '-article_id')[:21]
+        )
+
+    def test_subscriber_lookup(self):
+        self.assertUsesIndex(
+            CustomUser.objects.filter(role='reader', subscribed_publishers=self.publisher)
+            .values_list('pk', 'email')
+        )
+        self.assertUsesIndex(CustomUser.objects.filter(role='journalist').values_list('pk'))
+
+    def test_subscription_picker_prefix_lookup(self):
+        for kind in autocomplete.KINDS:
+            queryset, field = autocomplete.matches(kind, 'hyp')
+            self.assertUsesIndex(queryset.values_list('pk', field)[:21])
+            cursor = autocomplete.encode_key('hyperion', 1)
+            queryset, field = autocomplete.matches(kind, 'hyp', cursor)
+            self.assertUsesIndex(queryset.values_list('pk', field)[:21])
+
+    def test_delivery_claim(self):
+        self.assertUsesIndex(
+            DeliveryJob.objects.filter(
+                channel='email', status=DeliveryJob.STATUS_PENDING,
+                available_at__lte=timezone.now(),
+            ).order_by('available_at', 'pk')[:10]
+        )
@@ -0,0 +1,126 @@
+import asyncio
+from contextlib import suppress
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from newsapp import live
+from newsapp.api_views import subscribed_articles_stream
+from newsapp.models import Article, CustomUser, Publisher
+
+
+class BrokerTestCase(TestCase):
+    async def test_message_reaches_each_subscription_once(self):
+        broker = live.InMemoryBroker()
+        both = broker.subscribe(['publisher:1', 'author:2'])
+        other = broker.subscribe(['publisher:3'])
+
+        self.assertEqual(broker.publish(['publisher:1', 'author:2'], b'hello'), 1)
+        self.assertEqual(await both.get(1), b'hello')
+        self.assertIsNone(await both.get(0.01))
+        self.assertIsNone(await other.get(0.01))
+
+        both.close()
+        other.close()
+        self.assertEqual(broker.publish(['publisher:1'], b'gone'), 0)
+        self.assertEqual(broker.stats()['connections'], 0)
+
+    async def test_slow_subscription_is_reset_instead_of_buffering(self):
+        broker = live.InMemoryBroker()
+        subscription = broker.subscribe(['publisher:1'], maxsize=2)
+        for i in range(5):
+            broker.publish(['publisher:1'], f'{i}'.encode())
+        await asyncio.sleep(0)
+
+        self.assertTrue(subscription.overflowed)
+        self.assertEqual(subscription.queue.qsize(), 2)
+        self.assertEqual(await subscription.get(1), b'1')
+        self.assertTrue((await subscription.get(1)).startswith(b'event: reset\n'))
+        subscription.close()
+        self.assertEqual(broker.stats()['overflows'], 1)
+
+
+@mock.patch.object(live, '_broker', None)
+class StreamTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        self.reader.subscribed_publishers.add(self.publisher)
+
+    async def open_stream(self, user):
+        request = AsyncRequestFactory().get(reverse('subscribed_articles_stream'))
+
+        async def auser():
+            return user
+        request.auser = auser
+        response = await subscribed_articles_stream(request)
+        return response, aiter(response.streaming_content)
+
+    async def disconnect(self, events):
+        # ASGI servers cancel the response task when the client goes away.
+        pending = asyncio.ensure_future(anext(events))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with suppress(asyncio.CancelledError):
+            await pending
+
+    def committed(self, func, *args):
+        """
+        Runs ``func`` in the ORM's thread and executes its on_commit hooks.
+        """
+        def run():
+            with self.captureOnCommitCallbacks(execute=True):
+                return func(*args)
+        return sync_to_async(run)()
+
+    def approve(self, title):
+        article = Article.objects.create(
+            title=title, content="Body", author=self.journalist, publisher=self.publisher,
+        )
+        article.approved = True
+        article.save()
+        return article
+
+    async def test_stream_pushes_approved_articles(self):
+        response, events = await self.open_stream(self.reader)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue((await anext(events)).startswith(b'event: ready\n'))
+
+        next_event = asyncio.ensure_future(anext(events))
+        await self.committed(self.approve, "Harbour fire")
+
+        event = await asyncio.wait_for(next_event, 1)
+        self.assertTrue(event.startswith(b'event: article\n'))
+        self.assertIn(b'"title":"Harbour fire"', event)
+        await self.disconnect(events)
+
+    async def test_subscription_change_resets_the_stream(self):
+        response, events = await self.open_stream(self.reader)
+        await anext(events)
+
+        other = await Publisher.objects.acreate(name='Daily Planet')
+        await self.committed(self.reader.subscribed_publishers.add, other)
+
+        event = await asyncio.wait_for(anext(events), 1)
+        self.assertTrue(event.startswith(b'event: reset\n'))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(events)
+
+    @override_settings(NEWSAPP_LIVE={'HEARTBEAT': 0.01})
+    async def test_idle_stream_sends_heartbeats(self):
+        response, events = await self.open_stream(self.reader)
+        await anext(events)
+        self.assertEqual(await anext(events), live.KEEPALIVE)
+        await self.disconnect(events)
+        self.assertEqual(live.get_broker().stats()['connections'], 0)
+
+    def test_stream_requires_asgi(self):
+        self.client.login(username='reader1', password='readerpass')
+        self.assertEqual(self.client.get(reverse('subscribed_articles_stream')).status_code, 501)
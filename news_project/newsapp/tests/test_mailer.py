@@ -0,0 +1,72 @@
+from smtplib import SMTPRecipientsRefused
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase
+
+from newsapp.mailer import MassMailer, Recipient
+
+
+def render(recipient):
+    return "New Article Published", f"Hi {recipient.name}"
+
+
+def synthetic_recipients(count):
+    return (Recipient(i, f"reader{i}@example.com", f"reader{i}") for i in range(1, count + 1))
+
+
+class RefusingBackend(EmailBackend):
+    """
+    Locmem backend that refuses a fixed set of addresses and counts opens.
+    """
+    refused = set()
+    opens = 0
+
+    def open(self):
+        RefusingBackend.opens += 1
+        return True
+
+    def send_messages(self, messages):
+        sent = 0
+        for message in messages:
+            if message.to[0] in self.refused:
+                raise SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+            mail.outbox.append(message)
+            sent += 1
+        return sent
+
+
+class MassMailerTestCase(TestCase):
+    def test_one_message_per_recipient(self):
+        report = MassMailer(chunk_size=4).send(synthetic_recipients(10), render)
+
+        self.assertEqual(report.sent, 10)
+        self.assertEqual(report.chunks, 3)
+        self.assertEqual(report.cursor, 10)
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertTrue(all(len(message.to) == 1 for message in mail.outbox))
+        self.assertEqual(mail.outbox[0].body, "Hi reader1")
+
+    def test_bad_address_only_fails_its_own_message(self):
+        RefusingBackend.refused = {"reader3@example.com", "reader4@example.com"}
+        RefusingBackend.opens = 0
+        mailer = MassMailer(chunk_size=5, connection=RefusingBackend())
+
+        report = mailer.send(synthetic_recipients(10), render)
+
+        self.assertEqual(report.sent, 8)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.failed_recipients, ["reader3@example.com", "reader4@example.com"])
+        self.assertEqual(len({m.to[0] for m in mail.outbox}), 8)
+        self.assertEqual(RefusingBackend.opens, 1)
+
+    def test_resumes_after_cursor_and_checkpoints_each_chunk(self):
+        checkpoints = []
+        report = MassMailer(chunk_size=3).send(
+            synthetic_recipients(10), render, cursor=4, checkpoint=checkpoints.append
+        )
+
+        self.assertEqual(report.sent, 6)
+        self.assertEqual(checkpoints, [7, 10])
+        self.assertEqual(mail.outbox[0].to, ["reader5@example.com"])
+        self.assertGreater(report.messages_per_second, 0)
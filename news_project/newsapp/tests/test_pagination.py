@@ -0,0 +1,86 @@
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp.models import Article, CustomUser, Publisher
+from newsapp.pagination import keyset_paginate
+
+
+def make_articles(count, author, publisher):
+    # Identical timestamps make the id tie-breaker do the work.
+    return Article.objects.bulk_create([
+        Article(title=f"Article {i}", content="Body", author=author,
+                publisher=publisher, approved=True)
+        for i in range(count)
+    ])
+
+
+class KeysetPaginateTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        make_articles(25, self.journalist, self.publisher)
+
+    def test_walks_forward_and_back_without_gaps_or_duplicates(self):
+        queryset = Article.objects.all()
+        expected = list(queryset.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+        first = keyset_paginate(queryset, page_size=10)
+        second = keyset_paginate(queryset, first.next_cursor, page_size=10)
+        third = keyset_paginate(queryset, second.next_cursor, page_size=10)
+
+        seen = [a.pk for page in (first, second, third) for a in page]
+        self.assertEqual(seen, expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        back = keyset_paginate(queryset, third.previous_cursor, page_size=10)
+        self.assertEqual([a.pk for a in back], [a.pk for a in second])
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+
+        home = keyset_paginate(queryset, back.previous_cursor, page_size=10)
+        self.assertEqual([a.pk for a in home], [a.pk for a in first])
+        self.assertFalse(home.has_previous)
+
+
+@override_settings(NEWSAPP_PAGE_SIZE=10)
+class PaginatedListingsTestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        self.reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+        make_articles(15, self.journalist, self.publisher)
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.client.login(username='reader1', password='readerpass')
+
+    def test_html_list_shows_one_page_with_next_link(self):
+        response = self.client.get(reverse('article_list'))
+        self.assertEqual(len(response.context['articles']), 10)
+        self.assertContains(response, 'Older')
+
+        response = self.client.get(reverse('article_list'), {'cursor': response.context['page'].next_cursor})
+        self.assertEqual(len(response.context['articles']), 5)
+
+    def test_api_returns_cursor_links(self):
+        response = self.client.get(reverse('subscribed_articles'), {'page_size': 4})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse('subscribed_articles'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('article_list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
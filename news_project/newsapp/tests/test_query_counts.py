@@ -0,0 +1,85 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from newsapp.models import Article, CustomUser, Newsletter, Publisher
+
+
+class QueryCountScalingMixin:
+    """
+    Fails when the number of queries a page runs grows with the number of
+    rows it shows.
+    """
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertLess(response.status_code, 400, url)
+        return len(queries.captured_queries)
+
+    def assertConstantQueries(self, url, add_rows, params=None):
+        self.count_queries(url, params)  # warm caches (roles, sessions)
+        before = self.count_queries(url, params)
+        add_rows()
+        after = self.count_queries(url, params)
+        self.assertEqual(
+            before, after,
+            f"{url} ran {before} queries before adding rows and {after} after",
+        )
+
+
+# Fragment caching is off so every request renders from the database.
+@override_settings(NEWSAPP_PAGE_SIZE=50, NEWSAPP_FRAGMENT_CACHE_TIMEOUT=0)
+class ListingQueryCountTestCase(QueryCountScalingMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalists = [
+            CustomUser.objects.create_user(username=f'journalist{i}', password='pass', role='journalist')
+            for i in range(5)
+        ]
+        self.journalists[0].groups.add(Group.objects.get_or_create(name='Journalist')[0])
+        self.editor = CustomUser.objects.create_user(username='editor1', password='pass', role='editor')
+        self.editor.groups.add(Group.objects.get_or_create(name='Editor')[0])
+        self.reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+        self.add_rows(2)
+        self.reader.subscribed_publishers.add(self.publisher)
+
+    def add_rows(self, count=10):
+        for i in range(count):
+            author = self.journalists[i % len(self.journalists)]
+            Article.objects.create(title=f"Article {i}", content="Body", approved=True,
+                                   author=author, publisher=self.publisher)
+            Newsletter.objects.create(title=f"Newsletter {i}", content="Body",
+                                      author=author, publisher=self.publisher)
+
+    def add_feed_rows(self):
+        self.add_rows()
+        self.reader.subscribed_publishers.remove(self.publisher)
+        self.reader.subscribed_publishers.add(self.publisher)
+
+    def test_article_list_for_each_role(self):
+        for username in ('reader1', 'editor1', 'journalist0'):
+            with self.subTest(username=username):
+                self.client.login(username=username, password='pass')
+                self.assertConstantQueries(reverse('article_list'), self.add_rows)
+
+    def test_newsletter_list(self):
+        self.client.login(username='editor1', password='pass')
+        self.assertConstantQueries(reverse('newsletter_list'), self.add_rows)
+
+    def test_subscribed_articles_api(self):
+        self.client.login(username='reader1', password='pass')
+        self.assertConstantQueries(reverse('subscribed_articles'), self.add_feed_rows)
+
+    def test_article_detail(self):
+        self.client.login(username='reader1', password='pass')
+        article = Article.objects.first()
+        for url in (reverse('article_detail', args=[article.pk]),
+                    reverse('api_article_detail', args=[article.pk])):
+            with self.subTest(url=url):
+                self.assertConstantQueries(url, self.add_rows)
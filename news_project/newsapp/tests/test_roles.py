@@ -0,0 +1,59 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from newsapp.models import CustomUser
+from newsapp.roles import has_role, role_names
+
+
+def group_queries(queries):
+    return [q for q in queries if 'auth_group' in q['sql']]
+
+
+class RoleCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.journalist_group, _ = Group.objects.get_or_create(name='Journalist')
+        self.editor_group, _ = Group.objects.get_or_create(name='Editor')
+        self.user = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.user.groups.add(self.journalist_group)
+
+    def test_roles_resolved_once_per_instance(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(has_role(user, 'Journalist'))
+            self.assertTrue(has_role(user, 'journalist'))
+            self.assertFalse(has_role(user, 'Editor'))
+            self.assertFalse(has_role(user, 'Reader'))
+
+    def test_dashboard_runs_at_most_one_group_query_per_page(self):
+        self.client.login(username='journalist1', password='journalistpass')
+
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Welcome, <strong>Journalist</strong>')
+        self.assertLessEqual(len(group_queries(first.captured_queries)), 1)
+
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(group_queries(second.captured_queries), [])
+        self.assertLessEqual(len(second.captured_queries), 2)
+
+    def test_group_change_invalidates_cached_roles(self):
+        role_names(CustomUser.objects.get(pk=self.user.pk))
+
+        self.user.groups.add(self.editor_group)
+        self.assertTrue(has_role(CustomUser.objects.get(pk=self.user.pk), 'Editor'))
+
+        self.editor_group.user_set.remove(self.user)
+        self.assertFalse(has_role(CustomUser.objects.get(pk=self.user.pk), 'Editor'))
+
+    def test_anonymous_user_has_no_roles(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('article_list'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,46 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.test import RequestFactory, SimpleTestCase
+
+from newsapp import routers
+from newsapp.models import Article
+
+
+@mock.patch.object(routers, 'replica_configured', return_value=True)
+class ReplicaRouterTestCase(SimpleTestCase):
+    router = routers.ReplicaRouter()
+
+    def test_reads_use_the_replica_only_inside_read_only_views(self, configured):
+        self.assertIsNone(self.router.db_for_read(Article))
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Article), 'replica')
+            self.assertEqual(self.router.db_for_write(Article), 'default')
+            # Read your own writes.
+            self.assertIsNone(self.router.db_for_read(Article))
+        self.assertIsNone(self.router.db_for_read(Article))
+
+    def test_no_replica_configured(self, configured):
+        configured.return_value = False
+        with routers.replica_reads():
+            self.assertIsNone(self.router.db_for_read(Article))
+
+    def test_read_only_decorator(self, configured):
+        def view(request):
+            return self.router.db_for_read(Article)
+
+        wrapped = routers.read_only(view)
+        self.assertEqual(wrapped(RequestFactory().get('/')), 'replica')
+        self.assertIsNone(wrapped(RequestFactory().post('/')))
+
+    async def test_read_only_async_view(self, configured):
+        async def view(request):
+            return self.router.db_for_read(Article)
+
+        wrapped = routers.read_only(view)
+        self.assertTrue(iscoroutinefunction(wrapped))
+        self.assertEqual(await wrapped(RequestFactory().get('/')), 'replica')
+
+    def test_replica_is_never_migrated(self, configured):
+        self.assertFalse(self.router.allow_migrate('replica', 'newsapp'))
+        self.assertTrue(self.router.allow_migrate('default', 'newsapp'))
@@ -0,0 +1,186 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp import routers, search
+from newsapp.models import Article, CustomUser, Newsletter, Publisher, SearchTerm
+
+
+class SearchBackendTestMixin:
+    """
+    Search behaviour every backend must share. Subclasses set ``backend``.
+    """
+    backend = None
+
+    def setUp(self):
+        cache.clear()
+        self.settings_override = override_settings(NEWSAPP_SEARCH_BACKEND=self.backend)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        for i in range(5):
+            self.article(f"Filler {i}", "Nothing to see in this one.")
+        self.client.login(username='reader1', password='readerpass')
+
+    def article(self, title, content, approved=True):
+        return Article.objects.create(title=title, content=content, approved=approved,
+                                      author=self.journalist, publisher=self.publisher)
+
+    def titles(self, query, **kwargs):
+        return [result.title for result in search.search_page(query, **kwargs)]
+
+    def test_title_matches_rank_first(self):
+        self.article("Budget cuts", "The council met on Tuesday.")
+        self.article("Council meeting", "Budget cuts were discussed.")
+
+        self.assertEqual(self.titles("budget"), ["Budget cuts", "Council meeting"])
+
+    def test_common_terms_list_newest_first(self):
+        self.assertEqual(self.titles("nothing"), [f"Filler {i}" for i in reversed(range(5))])
+
+    def test_only_approved_articles_are_found(self):
+        draft = self.article("Embargoed election result", "Secret", approved=False)
+        self.assertEqual(self.titles("embargoed"), [])
+
+        draft.approved = True
+        draft.save()
+        self.assertEqual(self.titles("embargoed"), ["Embargoed election result"])
+
+        draft.approved = False
+        draft.save()
+        self.assertEqual(self.titles("embargoed"), [])
+
+    def test_edits_and_deletes_update_the_index(self):
+        article = self.article("Harbour fire", "Crews attended.")
+        article.title = "Harbour blaze"
+        article.save()
+        self.assertEqual(self.titles("fire"), [])
+        self.assertEqual(self.titles("blaze"), ["Harbour blaze"])
+
+        article.delete()
+        self.assertEqual(self.titles("blaze"), [])
+
+    def test_newsletters_are_searchable_by_kind(self):
+        self.article("Weekly roundup", "Articles.")
+        Newsletter.objects.create(title="Weekly roundup", content="Newsletter.",
+                                  author=self.journalist, publisher=self.publisher)
+
+        self.assertEqual(len(self.titles("roundup")), 2)
+        results = list(search.search_page("roundup", kinds=['newsletter']))
+        self.assertEqual([r.search_kind for r in results], ['newsletter'])
+
+    def test_results_are_paginated(self):
+        for i in range(5):
+            self.article(f"Election update {i}", "Votes.")
+
+        first = search.search_page("election", page_size=3)
+        second = search.search_page("election", cursor=first.next_cursor, page_size=3)
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(second.has_next)
+        self.assertTrue(second.has_previous)
+        self.assertFalse({a.pk for a in first} & {a.pk for a in second})
+
+    def test_rebuild_restores_index(self):
+        self.article("Storm warning", "Wind.")
+        Article.objects.filter(title="Storm warning").update(title="Flood warning")
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertIn("Indexed 6 documents", out.getvalue())
+        self.assertEqual(self.titles("flood"), ["Flood warning"])
+
+    def test_api_and_html_views(self):
+        self.article("Election night", "Results.")
+
+        response = self.client.get(reverse('api_search'), {'q': 'election'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['title'], "Election night")
+        self.assertEqual(response.data['results'][0]['type'], 'article')
+
+        response = self.client.get(reverse('search'), {'q': 'election'})
+        self.assertContains(response, "Election night")
+
+        response = self.client.get(reverse('api_search'), {'q': 'election', 'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+
+class InvertedIndexSearchTestCase(SearchBackendTestMixin, APITestCase):
+    backend = 'newsapp.search.InvertedIndexBackend'
+
+    def test_postings_are_stored_per_document(self):
+        article = self.article("Budget budget", "Budget.")
+
+        postings = SearchTerm.objects.filter(kind='article', object_id=article.pk)
+        self.assertEqual(sorted(postings.values_list('term', flat=True)), ['budget'])
+
+
+class SQLiteFTSSearchTestCase(SearchBackendTestMixin, APITestCase):
+    backend = 'newsapp.search.SQLiteFTSBackend'
+
+
+@override_settings(DATABASE_ROUTERS=['newsapp.routers.ReplicaRouter'])
+@mock.patch.object(routers, 'replica_configured', return_value=True)
+class ReplicaSearchTestCase(APITestCase):
+    """
+    Search in read-only views reads the replica. The replica here is a
+    separate SQLite database holding different rows from the primary, so
+    a result shows which one was read.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases[routers.REPLICA_ALIAS] = {
+            **connections.databases['default'], 'NAME': cls.replica_path,
+            'TEST': {**connections.databases['default']['TEST'], 'NAME': cls.replica_path},
+        }
+        call_command('migrate', database=routers.REPLICA_ALIAS, verbosity=0)
+        # Set only now: the runner checks the databases of every test
+        # class before any of them is set up.
+        cls.databases = {'default', routers.REPLICA_ALIAS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[routers.REPLICA_ALIAS].close()
+        del connections[routers.REPLICA_ALIAS]
+        del connections.databases[routers.REPLICA_ALIAS]
+        os.remove(cls.replica_path)
+
+    def article(self, title, using):
+        publisher = Publisher.objects.using(using).create(name='Hyperion News')
+        journalist = CustomUser.objects.db_manager(using).create_user(
+            username=f'journalist_{using}', password='pass', role='journalist')
+        return Article.objects.using(using).create(
+            title=title, content="Body.", approved=True, author=journalist, publisher=publisher,
+        )
+
+    def test_read_only_search_reads_the_replica(self, configured):
+        self.article("Harbour fire", 'default')
+        self.article("Harbour flood", routers.REPLICA_ALIAS)
+        reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.client.force_authenticate(reader)
+
+        response = self.client.get(reverse('api_search'), {'q': 'harbour'})
+        self.assertEqual([row['title'] for row in response.data['results']], ["Harbour flood"])
+        self.assertEqual([article.title for article in search.search_page("harbour")], ["Harbour fire"])
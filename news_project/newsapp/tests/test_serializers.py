@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp.models import Article, CustomUser, Publisher
+
+
+class FeedSerializationTestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        self.article = Article.objects.create(
+            title="Approved Article", summary="Short", content="Long body " * 100,
+            author=self.journalist, publisher=self.publisher, approved=True,
+        )
+        self.draft = Article.objects.create(
+            title="Draft", content="Secret", author=self.journalist, publisher=self.publisher,
+        )
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.client.login(username='reader1', password='readerpass')
+
+    def test_feed_uses_compact_representation(self):
+        response = self.client.get(reverse('subscribed_articles'))
+        item = response.data['results'][0]
+
+        self.assertNotIn('content', item)
+        self.assertEqual(item['author_name'], 'journalist1')
+        self.assertEqual(item['publisher_name'], 'Hyperion News')
+        self.assertEqual(item['summary'], 'Short')
+
+    def test_sparse_fieldset_loads_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('subscribed_articles'), {'fields': 'id,title'})
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+        feed_sql = next(q['sql'] for q in queries.captured_queries if 'newsapp_feedentry' in q['sql'])
+        self.assertNotIn('"newsapp_article"."content"', feed_sql)
+        self.assertNotIn('newsapp_customuser', feed_sql)
+
+    def test_author_and_publisher_are_joined_not_queried_per_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('subscribed_articles'))
+        name_queries = [
+            q for q in queries.captured_queries if '"newsapp_publisher"."name"' in q['sql']
+        ]
+        self.assertEqual(len(name_queries), 1)
+        self.assertIn('INNER JOIN "newsapp_publisher"', name_queries[0]['sql'])
+
+    def test_detail_endpoint_returns_full_body(self):
+        response = self.client.get(reverse('api_article_detail', args=[self.article.pk]))
+        self.assertEqual(response.data['content'], self.article.content)
+
+        response = self.client.get(reverse('api_article_detail', args=[self.draft.pk]))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,218 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from newsapp import delivery, social
+from newsapp.models import Article, CustomUser, DeliveryJob, Publisher
+
+
+class StubXHandler(BaseHTTPRequestHandler):
+    """
+    Answers each POST with the next scripted ``(status, headers, delay)``
+    of the server, recording the request and the client port it came from.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((self.headers['Authorization'], json.loads(body)))
+        self.server.ports.add(self.client_address[1])
+        status, headers, delay = self.server.responses.pop(0) if self.server.responses else (201, {}, 0)
+        if delay:
+            threading.Event().wait(delay)
+        payload = json.dumps({'data': {'id': str(len(self.server.requests))}}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out and hung up.
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServerMixin:
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubXHandler)
+        self.server.requests, self.server.responses, self.server.ports = [], [], set()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/2/tweets'
+
+    def respond(self, *responses):
+        self.server.responses.extend(
+            (response, {}, 0) if isinstance(response, int) else response for response in responses
+        )
+
+
+@override_settings(NEWSAPP_SOCIAL={'READ_TIMEOUT': 0.5, 'MAX_RETRIES': 2, 'FAILURE_THRESHOLD': 3})
+class SocialClientTestCase(StubServerMixin, SimpleTestCase):
+    def client_for_stub(self, **kwargs):
+        self.sleeps = []
+        client = social.SocialClient('token', self.url, sleep=self.sleeps.append, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_posts_over_one_pooled_connection(self):
+        client = self.client_for_stub()
+        with self.assertLogs('newsapp.social', 'INFO'):
+            client.post("First")
+            client.post("Second")
+
+        self.assertEqual(self.server.requests, [
+            ('Bearer token', {'text': "First"}), ('Bearer token', {'text': "Second"}),
+        ])
+        self.assertEqual(len(self.server.ports), 1)
+        self.assertEqual(client.metrics['posted'], 2)
+
+    def test_metrics_of_one_call(self):
+        self.respond(201, 503)
+        client = self.client_for_stub()
+        calls = Counter()
+        with self.assertLogs('newsapp.social', 'INFO'):
+            client.post("First")
+            client.post("Second", metrics=calls)
+
+        self.assertEqual(calls, {'failed_attempts': 1, 'retries': 1, 'posted': 1})
+        self.assertEqual(client.metrics['posted'], 2)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        self.respond(503, 502)
+        client = self.client_for_stub()
+        with self.assertLogs('newsapp.social', 'WARNING'):
+            client.post("Harbour fire")
+
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(all(0 <= delay <= client.backoff_max for delay in self.sleeps))
+        self.assertEqual(client.metrics['retries'], 2)
+
+    def test_rate_limit_waits_for_retry_after(self):
+        self.respond((429, {'Retry-After': '2'}, 0))
+        client = self.client_for_stub()
+        with self.assertLogs('newsapp.social', 'WARNING'):
+            client.post("Harbour fire")
+
+        self.assertEqual(self.sleeps, [2.0])
+        self.assertEqual(client.breaker.state, social.CircuitBreaker.CLOSED)
+
+    def test_long_rate_limit_is_handed_back(self):
+        self.respond((429, {'Retry-After': '900'}, 0))
+        client = self.client_for_stub()
+        with self.assertLogs('newsapp.social', 'WARNING'), self.assertRaises(social.Unavailable) as caught:
+            client.post("Harbour fire")
+
+        self.assertEqual(caught.exception.retry_after, 900)
+        self.assertEqual(self.sleeps, [])
+
+    def test_rejected_post_is_not_retried(self):
+        self.respond(403)
+        client = self.client_for_stub()
+        with self.assertLogs('newsapp.social', 'ERROR'), self.assertRaises(social.Rejected):
+            client.post("Harbour fire")
+
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_slow_api_times_out(self):
+        self.respond((201, {}, 2), (201, {}, 2), (201, {}, 2))
+        client = self.client_for_stub()
+        with self.assertLogs('newsapp.social', 'WARNING'), self.assertRaises(social.SocialError) as caught:
+            client.post("Harbour fire")
+
+        self.assertNotIsInstance(caught.exception, social.Rejected)
+        self.assertEqual(client.metrics['failed_attempts'], 3)
+
+    def test_circuit_opens_after_failures_and_recovers(self):
+        now = [0.0]
+        breaker = social.CircuitBreaker(3, 60, clock=lambda: now[0])
+        self.respond(500, 500, 500)
+        client = self.client_for_stub(breaker=breaker)
+        with self.assertLogs('newsapp.social', 'WARNING'), self.assertRaises(social.SocialError):
+            client.post("Harbour fire")
+        self.assertEqual(breaker.state, social.CircuitBreaker.OPEN)
+
+        with self.assertRaises(social.Unavailable) as caught:
+            client.post("Flood warning")
+        self.assertEqual(caught.exception.retry_after, 60)
+        self.assertEqual(len(self.server.requests), 3)
+
+        now[0] = 61
+        with self.assertLogs('newsapp.social', 'INFO'):
+            client.post("Flood warning")
+        self.assertEqual(breaker.state, social.CircuitBreaker.CLOSED)
+
+
+@override_settings(NEWSAPP_DELIVERY={'WORKER': 'db', 'MAX_ATTEMPTS': 2})
+class SocialDeliveryTestCase(StubServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        journalist = CustomUser.objects.create_user(username='journalist1', password='pass', role='journalist')
+        self.article = Article.objects.create(
+            title="Harbour fire", content="Body", author=journalist,
+            publisher=Publisher.objects.create(name='Hyperion News'),
+        )
+        self.article.approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+        self.settings_override = override_settings(
+            TWITTER_BEARER_TOKEN='token', NEWSAPP_SOCIAL={'API_URL': self.url, 'MAX_RETRIES': 0},
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(lambda: social.get_client() and social.get_client().close())
+
+    def test_job_posts_article(self):
+        with self.assertLogs('newsapp.social', 'INFO'):
+            delivery.run_pending(['social'])
+
+        job = DeliveryJob.objects.get(channel='social')
+        self.assertEqual(job.status, DeliveryJob.STATUS_DONE)
+        self.assertEqual(job.metrics, {'posted': 1})
+        self.assertEqual(self.server.requests[0][1]['text'],
+                         "New article published: Harbour fire by journalist1")
+
+    def test_rate_limited_job_is_deferred_without_using_an_attempt(self):
+        self.respond((429, {'Retry-After': '900'}, 0))
+        with self.assertLogs('newsapp', 'INFO'):
+            delivery.run_pending(['social'])
+
+        job = DeliveryJob.objects.get(channel='social')
+        self.assertEqual(job.status, DeliveryJob.STATUS_PENDING)
+        self.assertEqual(job.attempts, 0)
+        self.assertGreater((job.available_at - job.updated_at).total_seconds(), 899)
+
+    def test_rejected_post_fails_the_job_after_one_post(self):
+        self.respond(403)
+        with self.assertLogs('newsapp', 'WARNING'):
+            delivery.run_pending(['social'])
+            delivery.run_pending(['social'])
+
+        job = DeliveryJob.objects.get(channel='social')
+        self.assertEqual(job.status, DeliveryJob.STATUS_FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_post_failing_after_retries_is_retried_later(self):
+        self.respond(503)
+        with self.assertLogs('newsapp', 'WARNING'):
+            delivery.run_pending(['social'])
+
+        job = DeliveryJob.objects.get(channel='social')
+        self.assertEqual(job.status, DeliveryJob.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.available_at, job.updated_at)
+        self.assertEqual(job.metrics, {'failed_attempts': 1})
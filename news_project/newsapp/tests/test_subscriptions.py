@@ -0,0 +1,156 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from newsapp import feed, subscriptions
+from newsapp.models import Article, CustomUser, FeedEntry, Publisher
+
+
+def writes(queries):
+    return [q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith(('INSERT', 'DELETE', 'UPDATE'))]
+
+
+class UpdateSubscriptionsTestCase(TestCase):
+    def setUp(self):
+        self.publishers = [Publisher.objects.create(name=f'Publisher {i}') for i in range(3)]
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.reader.subscribed_publishers.add(self.publishers[0], self.publishers[1])
+
+    def test_only_the_difference_is_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            changes = subscriptions.update_subscriptions(
+                self.reader, [self.publishers[1].pk, self.publishers[2].pk], [self.journalist.pk])
+
+        self.assertEqual(changes['added'], {'publishers': [self.publishers[2].pk],
+                                            'journalists': [self.journalist.pk]})
+        self.assertEqual(changes['removed'], {'publishers': [self.publishers[0].pk],
+                                              'journalists': []})
+        deletes = [sql for sql in writes(queries) if 'customuser_subscribed_publishers' in sql
+                   and sql.startswith('DELETE')]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(subscriptions.subscription_ids(self.reader)['publishers'],
+                         [self.publishers[1].pk, self.publishers[2].pk])
+
+    def test_unchanged_subscriptions_write_nothing(self):
+        current = subscriptions.subscription_ids(self.reader)
+        with CaptureQueriesContext(connection) as queries:
+            subscriptions.update_subscriptions(self.reader, current['publishers'], current['journalists'])
+        self.assertEqual(writes(queries), [])
+
+    def test_saving_a_journalist_skips_empty_clears(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.journalist.save()
+        self.assertEqual([sql for sql in writes(queries) if sql.startswith('DELETE')], [])
+
+    def test_only_journalists_can_be_followed(self):
+        with self.assertRaisesMessage(Exception, f"Unknown journalists: {self.reader.pk}."):
+            subscriptions.clean_journalist_ids([self.reader.pk])
+
+    def test_bulk_subscribe_backfills_feeds(self):
+        Article.objects.create(title="Old news", content="Body", approved=True,
+                               author=self.journalist, publisher=self.publishers[2])
+        readers = [
+            CustomUser.objects.create_user(username=f'bulk{i}', password='pass', role='reader')
+            for i in range(5)
+        ]
+        ids = [reader.pk for reader in readers] + [self.journalist.pk, 999]
+
+        self.assertEqual(subscriptions.subscribe_readers(self.publishers[2], ids, batch_size=2), 5)
+        self.assertEqual(subscriptions.subscribe_readers(self.publishers[2], ids), 0)
+        self.assertEqual(FeedEntry.objects.filter(reader__in=readers).count(), 5)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as handle:
+            handle.write(f"{self.reader.pk}\n")
+            handle.flush()
+            call_command('import_subscribers', self.publishers[2].pk, handle.name, verbosity=0)
+        self.assertIn(self.publishers[2].pk, subscriptions.subscription_ids(self.reader)['publishers'])
+
+    def test_bulk_subscribe_backfills_once_after_the_batches_commit(self):
+        Article.objects.create(title="Old news", content="Body", approved=True,
+                               author=self.journalist, publisher=self.publishers[2])
+        readers = [
+            CustomUser.objects.create_user(username=f'bulk{i}', password='pass', role='reader')
+            for i in range(5)
+        ]
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def write_entries(pairs):
+            depths.append(len(connection.atomic_blocks))
+            return write(pairs)
+
+        write = feed._write_entries
+        with mock.patch.object(feed, '_write_entries', write_entries):
+            subscriptions.subscribe_readers(self.publishers[2], [r.pk for r in readers], batch_size=2)
+
+        self.assertEqual(depths, [depth])
+        self.assertEqual(FeedEntry.objects.filter(reader__in=readers).count(), 5)
+
+    def test_large_import_switches_publisher_to_fan_out_on_read(self):
+        Article.objects.create(title="Old news", content="Body", approved=True,
+                               author=self.journalist, publisher=self.publishers[2])
+        readers = [
+            CustomUser.objects.create_user(username=f'bulk{i}', password='pass', role='reader')
+            for i in range(3)
+        ]
+        with self.settings(NEWSAPP_FEED_FANOUT_LIMIT=2):
+            subscriptions.subscribe_readers(self.publishers[2], [r.pk for r in readers])
+
+        self.publishers[2].refresh_from_db()
+        self.assertTrue(self.publishers[2].fan_out_on_read)
+        self.assertFalse(FeedEntry.objects.filter(reader__in=readers).exists())
+
+
+class SubscriptionsAPITestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='pass', role='journalist')
+        self.reader = CustomUser.objects.create_user(username='reader1', password='pass', role='reader')
+        self.reader.groups.add(Group.objects.get_or_create(name='Reader')[0])
+        self.client.login(username='reader1', password='pass')
+
+    def test_put_sets_subscriptions(self):
+        url = reverse('api_subscriptions')
+        response = self.client.put(url, {'publishers': [self.publisher.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['publishers'], [self.publisher.pk])
+        self.assertEqual(response.data['added'], {'publishers': [self.publisher.pk]})
+
+        response = self.client.put(url, {'journalists': [self.reader.pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).data,
+                         {'publishers': [self.publisher.pk], 'journalists': []})
+
+    def test_bulk_subscribe_is_staff_only(self):
+        url = reverse('api_publisher_subscribers', args=[self.publisher.pk])
+        self.assertEqual(self.client.post(url, {'reader_ids': [self.reader.pk]}, format='json').status_code, 403)
+
+        staff = CustomUser.objects.create_user(username='admin', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post(url, {'reader_ids': [self.reader.pk]}, format='json')
+        self.assertEqual(response.data, {'added': 1})
+
+    def test_html_form_applies_the_difference(self):
+        url = reverse('subscriptions')
+        # Only current subscriptions are rendered; others come from type-ahead.
+        self.assertNotContains(self.client.get(url), 'Hyperion News')
+
+        response = self.client.post(url, {'subscribed_publishers': [self.publisher.pk]})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(list(self.reader.subscribed_publishers.all()), [self.publisher])
+        self.assertContains(self.client.get(url), 'Hyperion News')
+
+        response = self.client.post(url, {'subscribed_journalists': [self.reader.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.reader.subscribed_journalists.exists())
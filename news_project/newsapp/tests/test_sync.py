@@ -0,0 +1,120 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from newsapp import delivery, feed
+from newsapp.models import Article, ArticleTombstone, CustomUser, Publisher
+from newsapp.pagination import encode_watermark
+
+
+@mock.patch.object(feed, 'SYNC_OVERLAP', timedelta(0))
+class FeedSyncTestCase(APITestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Hyperion News')
+        self.other_publisher = Publisher.objects.create(name='Daily Planet')
+        self.journalist = CustomUser.objects.create_user(
+            username='journalist1', password='journalistpass', role='journalist'
+        )
+        self.reader = CustomUser.objects.create_user(
+            username='reader1', password='readerpass', role='reader'
+        )
+        self.reader.subscribed_publishers.add(self.publisher)
+        self.article = self.publish("First")
+        self.client.login(username='reader1', password='readerpass')
+        self.url = reverse('subscribed_articles_sync')
+        self.watermark = self.sync()['watermark']
+
+    def publish(self, title, publisher=None):
+        article = Article.objects.create(
+            title=title, content="Body", author=self.journalist,
+            publisher=publisher or self.publisher,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            article.approved = True
+            article.save()
+        delivery.run_pending(['feed'])
+        return article
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_first_sync_asks_for_a_full_fetch(self):
+        data = self.client.get(self.url).data
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['articles'], [])
+
+    def test_unchanged_feed_has_no_changes(self):
+        data = self.sync(self.watermark)
+        self.assertFalse(data['reset'])
+        self.assertEqual((data['articles'], data['deleted']), ([], []))
+
+    def test_new_and_edited_articles_are_returned(self):
+        second = self.publish("Second")
+        self.publish("Elsewhere", publisher=self.other_publisher)
+        self.article.title = "First, updated"
+        self.article.save()
+
+        data = self.sync(self.watermark, fields='id,title')
+        self.assertFalse(data['reset'])
+        self.assertEqual(data['articles'], [
+            {'id': second.pk, 'title': "Second"},
+            {'id': self.article.pk, 'title': "First, updated"},
+        ])
+        self.assertEqual(self.sync(data['watermark'])['articles'], [])
+
+    def test_deleted_and_withdrawn_articles_are_tombstoned(self):
+        second = self.publish("Second")
+        second_pk = second.pk
+        self.article.approved = False
+        self.article.save()
+        second.delete()
+
+        data = self.sync(self.watermark)
+        self.assertEqual(data['articles'], [])
+        self.assertEqual(sorted(data['deleted']), sorted([self.article.pk, second_pk]))
+        self.assertEqual(
+            set(ArticleTombstone.objects.values_list('reason', flat=True)),
+            {ArticleTombstone.REASON_DELETED, ArticleTombstone.REASON_WITHDRAWN},
+        )
+
+    def test_fan_out_on_read_publishers_are_synced(self):
+        Publisher.objects.filter(pk=self.publisher.pk).update(fan_out_on_read=True)
+        article = Article.objects.create(title="Merged", content="Body", approved=True,
+                                         author=self.journalist, publisher=self.publisher)
+
+        data = self.sync(self.watermark)
+        self.assertEqual([a['id'] for a in data['articles']], [article.pk])
+
+    def test_resets(self):
+        with self.settings(NEWSAPP_SYNC_MAX_CHANGES=1):
+            self.publish("Second")
+            self.publish("Third")
+            self.assertTrue(self.sync(self.watermark)['reset'])
+
+        watermark = self.sync(self.watermark)['watermark']
+        self.reader.subscribed_publishers.add(self.other_publisher)
+        self.assertTrue(self.sync(watermark)['reset'])
+
+        expired = encode_watermark(timezone.now() - timedelta(days=365))
+        self.assertTrue(self.sync(expired)['reset'])
+        self.assertEqual(self.client.get(self.url, {'since': 'bogus'}).status_code, 404)
+
+    def test_old_tombstones_are_pruned(self):
+        self.article.delete()
+        ArticleTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=365))
+        ArticleTombstone.objects.create(article_id=999, reason=ArticleTombstone.REASON_DELETED)
+
+        out = StringIO()
+        call_command('prune_tombstones', stdout=out)
+        self.assertIn("Deleted 1 tombstones", out.getvalue())
+        self.assertEqual(list(ArticleTombstone.objects.values_list('article_id', flat=True)), [999])
+        self.assertEqual(feed.prune_tombstones(), 0)
@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 #from django.contrib.auth import views as auth_views
 from newsapp.views import home_view
 from django.urls import path
-from . import views
+from . import async_views, views
+from .routers import read_only
 from .views import some_view
 from django.contrib.auth.views import LogoutView
 from django.contrib.auth.views import LoginView
-from .views import article_list_view
+
+# Read-heavy pages come in sync (WSGI) and async (ASGI) versions. Views
+# wrapped in read_only() read from the replica database when there is one.
+read_views = async_views if getattr(settings, 'NEWSAPP_ASYNC_VIEWS', False) else views
 
 urlpatterns = [
     path('', home_view, name='home'),  # Landing/home page
@@ -24,17 +29,21 @@ urlpatterns = [
 
     # Article URLs
     # path('news/articles/', views.article_list_view, name='article_list'),
-    path('news/articles/', article_list_view, name='article_list'),
+    path('news/articles/', read_only(read_views.article_list_view), name='article_list'),
 
-    path('articles/<int:pk>/', views.article_detail_view, name='article_detail'),
+    path('articles/<int:pk>/', read_only(read_views.article_detail_view), name='article_detail'),
     path('news/articles/create/', views.article_create_view, name='article_create'),
     path('news/articles/<int:pk>/delete/', views.article_delete_view, name='article_delete'),
     path('news/articles/<int:pk>/edit/', views.article_update_view, name='article_update'),
     path('news/articles/<int:article_id>/approve/', views.article_approve_view, name='approve_article'),
+    path('news/articles/review/', views.review_queue_view, name='review_queue'),
 
     # Newsletter URLs
     path('newsletters/create/', views.newsletter_create_view, name='newsletter_create'),
     path('newsletters/<int:pk>/update/', views.newsletter_update_view, name='newsletter_update'),
     path('newsletters/<int:pk>/delete/', views.newsletter_delete_view, name='newsletter_delete'),
-    path('newsletters/', views.newsletter_list_view, name='newsletter_list'),
+    path('newsletters/', read_only(read_views.newsletter_list_view), name='newsletter_list'),
+
+    # Search
+    path('search/', read_only(views.search_view), name='search'),
 ]
@@ -3,8 +3,12 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import Group
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponseForbidden
+from django.template.defaultfilters import pluralize
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.views.decorators.http import require_POST
+from .approval import MAX_BATCH, approve, approve_many, reject_many
 from .models import Article, Newsletter, CustomUser, Publisher
 from .forms import (
     CustomUserCreationForm,
@@ -14,22 +18,26 @@ from .forms import (
 )
 from django.contrib.auth import logout
 from django.contrib import messages
+from .caching import cached_fragment, versions
+from .pagination import InvalidCursor, KeysetPage, page_size_from, paginate_request
+from .roles import has_role
+from .search import search_page
 
 
 # Role check helpers
 def is_journalist(user):
     """Check if the user is in the Journalist group."""
-    return user.groups.filter(name='Journalist').exists()
+    return has_role(user, 'Journalist')
 
 
 def is_editor(user):
     """Check if the user is in the Editor group."""
-    return user.groups.filter(name='Editor').exists()
+    return has_role(user, 'Editor')
 
 
 def is_reader(user):
     """Check if the user is in the Reader group."""
-    return user.groups.filter(name='Reader').exists()
+    return has_role(user, 'Reader')
 
 
 # Home Page
@@ -65,8 +73,7 @@ def some_view(request):
     """
     Example view to demonstrate template rendering with user role context.
     """
-    is_journalist = request.user.groups.filter(name='Journalist').exists()
-    return render(request, 'newsapp/some_template.html', {'is_journalist': is_journalist})
+    return render(request, 'newsapp/some_template.html', {'is_journalist': is_journalist(request.user)})
 
 
 # Login
@@ -112,36 +119,84 @@ def manage_subscriptions(request):
         form = SubscriptionForm(request.POST, instance=user)
         if form.is_valid():
             form.save()
-            messages.success(request, "Subscriptions updated successfully.")
+            if any(form.changes['added'].values()) or any(form.changes['removed'].values()):
+                messages.success(request, "Subscriptions updated successfully.")
+            else:
+                messages.info(request, "Your subscriptions are unchanged.")
             return redirect('dashboard')
     else:
         form = SubscriptionForm(instance=user)
     return render(request, 'newsapp/subscriptions.html', {'form': form})
 
 
+# Listings shared by every user who may see them
+def cached_listing(request, fragment, queryset, template, context_name, depends_on):
+    """
+    Returns ``(page, html)`` for a listing page that looks the same to
+    every user allowed to see it: a KeysetPage of primary keys and the
+    rendered items, from the fragment cache when possible. ``depends_on``
+    names the data versions that invalidate it.
+    """
+    def render_page():
+        page = paginate_request(request, queryset)
+        return {
+            'page': KeysetPage([obj.pk for obj in page], page.next_cursor, page.previous_cursor),
+            'html': render_to_string(template, {context_name: page}),
+        }
+
+    parts = (*versions(*depends_on), page_size_from(request.GET), request.GET.get('cursor', ''))
+    entry = cached_fragment(fragment, parts, render_page)
+    return entry['page'], entry['html']
+
+
 # Article Views
 def article_list_view(request):
     """
-    List articles based on user role (Reader, Editor, or Journalist).
+    List articles based on user role (Reader, Editor, or Journalist),
+    one keyset-paginated page at a time. Readers all see the same approved
+    articles, so their pages are served from the fragment cache.
     """
-    if is_reader(request.user):
-        articles = Article.objects.filter(approved=True)
-    elif is_editor(request.user):
-        articles = Article.objects.all()
-    elif is_journalist(request.user):
-        articles = Article.objects.filter(author=request.user)
+    user = request.user
+    if is_reader(user) and not (is_editor(user) or is_journalist(user)):
+        page, html = cached_listing(
+            request, 'article_list', Article.objects.filter(approved=True).for_listing(),
+            'newsapp/article_items.html', 'articles', ('articles', 'publishers'),
+        )
+        return render(request, 'newsapp/article_list.html',
+                      {'articles': page, 'page': page, 'articles_html': html})
+
+    if is_reader(user) or is_editor(user):
+        articles = Article.objects.visible_to(user)
+    elif is_journalist(user):
+        articles = Article.objects.filter(author=user)
     else:
         return HttpResponseForbidden()
-    return render(request, 'newsapp/article_list.html', {'articles': articles})
+    page = paginate_request(request, articles.for_listing())
+    return render(request, 'newsapp/article_list.html', {'articles': page, 'page': page})
 
 
 def article_detail_view(request, pk):
     """
-    Display article detail page if user is authorized.
+    Display article detail page if user is authorized. The rendered
+    article is served from the fragment cache.
     """
-    article = get_object_or_404(Article, pk=pk)
-    if article.approved or is_editor(request.user) or article.author == request.user:
-        return render(request, 'newsapp/article_detail.html', {'article': article})
+    def render_article():
+        article = Article.objects.select_related('author', 'publisher').filter(pk=pk).first()
+        if article is None:
+            return {}
+        return {
+            'title': article.title,
+            'approved': article.approved,
+            'author_id': article.author_id,
+            'html': render_to_string('newsapp/article_body.html', {'article': article}),
+        }
+
+    entry = cached_fragment('article', (pk, *versions(f'article:{pk}', 'publishers')), render_article)
+    if not entry:
+        raise Http404("No Article matches the given query.")
+    if entry['approved'] or is_editor(request.user) or entry['author_id'] == request.user.pk:
+        return render(request, 'newsapp/article_detail.html',
+                      {'article_title': entry['title'], 'article_html': entry['html']})
     messages.error(request, "You do not have permission to access this page.")
     return redirect('dashboard')
 
@@ -172,6 +227,9 @@ def article_update_view(request, pk):
         if request.method == 'POST':
             form = ArticleForm(request.POST, instance=article)
             if form.is_valid():
+                if request.user == article.author:
+                    # A rejected article goes back into the review queue.
+                    article.rejected_at = None
                 form.save()
                 return redirect('article_list')
         else:
@@ -196,16 +254,50 @@ def article_delete_view(request, pk):
         return redirect('article_list')
 
 
-def article_approve_view(request, pk):
+@require_POST
+@user_passes_test(is_editor)
+def article_approve_view(request, article_id):
     """
-    Allow editors to approve an article.
+    Allow editors to approve an article. Approving an article that is
+    already approved changes nothing and notifies nobody.
     """
-    article = get_object_or_404(Article, pk=pk)
-    article.approved = True
-    article.save()
+    article = get_object_or_404(Article, pk=article_id)
+    approve(article)
     return redirect('article_list')
 
 
+@user_passes_test(is_editor)
+def review_queue_view(request):
+    """
+    The editors' review queue: articles waiting for approval, newest
+    first, one keyset-paginated page at a time. Posting ``action``
+    (``approve`` or ``reject``) with the checked ``article_ids`` handles
+    them all at once and comes back to the same page.
+    """
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        try:
+            article_ids = sorted({int(pk) for pk in request.POST.getlist('article_ids')})
+        except ValueError:
+            article_ids = None
+        if action not in ('approve', 'reject') or article_ids is None or len(article_ids) > MAX_BATCH:
+            messages.error(request, "Invalid review request.")
+        elif not article_ids:
+            messages.info(request, "No articles selected.")
+        elif action == 'approve':
+            approved = approve_many(article_ids)
+            messages.success(request, f"Approved {len(approved)} article{pluralize(len(approved))}.")
+        else:
+            rejected = reject_many(article_ids)
+            messages.success(request, f"Rejected {len(rejected)} article{pluralize(len(rejected))}.")
+        return redirect(request.get_full_path())
+
+    page = paginate_request(request, Article.objects.pending_review().for_listing())
+    return render(request, 'newsapp/article_approve.html', {
+        'pending_articles': page, 'page': page, 'max_batch': MAX_BATCH,
+    })
+
+
 @user_passes_test(is_journalist)
 def newsletter_create_view(request):
     """
@@ -226,17 +318,38 @@ def newsletter_create_view(request):
 # Newsletter Views
 def newsletter_list_view(request):
     """
-    List newsletters based on user role (Reader, Editor, or Journalist).
+    List newsletters based on user role (Reader, Editor, or Journalist),
+    one keyset-paginated page at a time. Readers and editors see every
+    newsletter, so their pages are served from the fragment cache.
     """
-    if is_reader(request.user):
-        newsletters = Newsletter.objects.filter(published=True)
-    elif is_editor(request.user):
-        newsletters = Newsletter.objects.all()
-    elif is_journalist(request.user):
+    if is_reader(request.user) or is_editor(request.user):
+        page, html = cached_listing(
+            request, 'newsletter_list', Newsletter.objects.for_listing(),
+            'newsapp/newsletter_items.html', 'newsletters', ('newsletters', 'publishers'),
+        )
+        return render(request, 'newsapp/newsletter_list.html',
+                      {'newsletters': page, 'page': page, 'newsletters_html': html})
+
+    if is_journalist(request.user):
         newsletters = Newsletter.objects.filter(author=request.user)
     else:
         return HttpResponseForbidden()
-    return render(request, 'newsapp/newsletter_list.html', {'newsletters': newsletters})
+    page = paginate_request(request, newsletters.for_listing())
+    return render(request, 'newsapp/newsletter_list.html', {'newsletters': page, 'page': page})
+
+
+@login_required
+def search_view(request):
+    """
+    Full-text search over approved articles and newsletters, best match
+    first, one page at a time.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = search_page(query, request.GET.get('cursor'), page_size_from(request.GET))
+    except InvalidCursor as exc:
+        raise Http404(str(exc))
+    return render(request, 'newsapp/search.html', {'query': query, 'results': page, 'page': page})
 
 
 @login_required